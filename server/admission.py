@@ -0,0 +1,272 @@
+"""In-process admission control for write-heavy endpoints.
+
+When a game update ships, every client calls ``/login`` and ``/sync`` at the
+same moment. Without a limit, Flask workers queue requests until they time
+out and the process stops serving anyone. :func:`admission_control` sheds
+that load early with cheap responses instead:
+
+- a per-client token bucket (the user for authenticated routes, the remote
+  address plus the requested nickname otherwise) answers
+  ``429 Too Many Requests``;
+- a global token bucket per policy answers ``503 Service Unavailable``;
+- a concurrency gate bounds how many expensive handlers run at once and
+  answers ``503`` when full.
+
+Every rejection carries ``Retry-After`` and is counted (see
+:meth:`AdmissionController.stats`, exported by :mod:`server.metrics`).
+
+Policies:
+    ``"sync"``: ``/sync``, ``/sync/batch``, ``/sync/delta``
+    (``ADMISSION_SYNC_*``).
+
+    ``"auth"``: ``/register``, ``/login`` (``ADMISSION_AUTH_*``).
+
+Notes:
+    Limits are per process; with N workers the effective global rate is N
+    times the configured one.
+
+    Auth buckets are keyed on address plus nickname, so players behind one
+    carrier-grade NAT or office proxy do not throttle each other's logins.
+    The price is that one address trying many nicknames (password spraying)
+    is only bounded by the server-wide ``ADMISSION_AUTH_RATE``. Per-client buckets live in a bounded
+    :class:`server.cache.TTLCache` and expire once they would be full again.
+    Behind a reverse proxy, configure ``werkzeug.middleware.proxy_fix`` so
+    ``request.remote_addr`` is the client address.
+"""
+
+import math
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Flask, current_app, jsonify, request
+
+from .cache import TTLCache
+from .models import normalize_nickname
+
+POLICIES = ("sync", "auth")
+
+
+class TokenBucket:
+    """Classic token bucket.
+
+    Args:
+        rate: Tokens added per second.
+        burst: Bucket capacity.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Try to take one token (callers serialize access).
+
+        Returns:
+            float: ``0.0`` if a token was taken, otherwise the seconds until
+            one becomes available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class ConcurrencyGate:
+    """Non-blocking bound on concurrently running handlers.
+
+    Args:
+        limit: Maximum number of holders.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        """Enter the gate if a slot is free.
+
+        Returns:
+            bool: ``True`` when entered (call :meth:`leave` afterwards).
+        """
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def leave(self) -> None:
+        """Release a slot taken by :meth:`try_enter`."""
+        with self._lock:
+            self.active -= 1
+
+
+class AdmissionController:
+    """Token buckets and the concurrency gate of one app.
+
+    Args:
+        config: App config with the ``ADMISSION_*`` settings.
+    """
+
+    def __init__(self, config):
+        self.enabled = bool(config["ADMISSION_ENABLED"])
+        self._lock = threading.Lock()
+        self._global: Dict[str, TokenBucket] = {}
+        self._client_limits: Dict[str, Tuple[float, float]] = {}
+        self._clients: Dict[str, TTLCache] = {}
+        for policy in POLICIES:
+            prefix = f"ADMISSION_{policy.upper()}"
+            self._global[policy] = TokenBucket(config[f"{prefix}_RATE"], config[f"{prefix}_BURST"])
+            self._client_limits[policy] = (config[f"{prefix}_CLIENT_RATE"], config[f"{prefix}_CLIENT_BURST"])
+            self._clients[policy] = TTLCache(config["ADMISSION_MAX_CLIENTS"])
+        self.gate = ConcurrencyGate(config["ADMISSION_MAX_CONCURRENT"])
+        self.rejected: Dict[str, int] = {"client": 0, "global": 0, "concurrency": 0}
+
+    def _reject(self, reason: str) -> None:
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def check(self, policy: str, client: str) -> Optional[Tuple[int, float]]:
+        """Decide whether a request may proceed to the handler.
+
+        Args:
+            policy: Policy name from :data:`POLICIES`.
+            client: Client key (see :func:`client_key`).
+
+        Returns:
+            Optional[Tuple[int, float]]: ``None`` when admitted, otherwise the
+            status code (``429`` or ``503``) and the suggested retry delay.
+        """
+        rate, burst = self._client_limits[policy]
+        clients = self._clients[policy]
+        with self._lock:
+            bucket = clients.get(client)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst)
+            wait = bucket.take()
+            # A bucket untouched for burst / rate seconds is full again, so it
+            # can be forgotten and recreated on the next request.
+            clients.set(client, bucket, expires_at=time.time() + (burst / rate if rate > 0 else 60.0))
+            if wait:
+                self.rejected["client"] += 1
+                return 429, wait
+            wait = self._global[policy].take()
+            if wait:
+                self.rejected["global"] += 1
+                return 503, wait
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """Return rejection counters and gate usage.
+
+        Returns:
+            Dict[str, int]: ``rejectedClient``, ``rejectedGlobal``,
+            ``rejectedConcurrency``, ``active`` and ``maxConcurrent``.
+        """
+        return {
+            "rejectedClient": self.rejected["client"],
+            "rejectedGlobal": self.rejected["global"],
+            "rejectedConcurrency": self.rejected["concurrency"],
+            "active": self.gate.active,
+            "maxConcurrent": self.gate.limit,
+        }
+
+
+def client_key(user=None) -> str:
+    """Return the per-client bucket key of the current request.
+
+    Args:
+        user: Authenticated identity, if the route requires one.
+
+    Returns:
+        str: ``"user:<id>"`` for authenticated requests, otherwise
+        ``"addr:<remote address>:<nickname>"`` with the lowercased
+        ``nickname`` of the JSON body (empty when absent).
+    """
+    if user is not None:
+        return f"user:{user.id}"
+    payload = request.get_json(silent=True)
+    nickname = payload.get("nickname") if isinstance(payload, dict) else None
+    nickname = normalize_nickname(nickname)[:64] if isinstance(nickname, str) else ""
+    return f"addr:{request.remote_addr}:{nickname}"
+
+
+def _retry_after(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def admission_control(policy: str) -> Callable:
+    """Decorator applying admission control to a view.
+
+    Place it below :func:`server.auth.token_required` so that the
+    per-client bucket is keyed on the authenticated user; on public routes
+    the remote address plus the requested nickname is used.
+
+    Args:
+        policy: Policy name from :data:`POLICIES`.
+
+    Returns:
+        Callable: Decorator.
+
+    Examples:
+        >>> @api_bp.route("/sync", methods=["POST"])
+        ... @token_required
+        ... @admission_control("sync")
+        ... def sync(user):
+        ...     ...
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            controller = get_admission()
+            if not controller.enabled:
+                return fn(*args, **kwargs)
+            user = args[0] if args and hasattr(args[0], "id") else None
+            verdict = controller.check(policy, client_key(user))
+            if verdict is not None:
+                status, wait = verdict
+                message = "Too many requests" if status == 429 else "Server is busy, try again later"
+                return jsonify({"message": message}), status, _retry_after(wait)
+            if not controller.gate.try_enter():
+                controller._reject("concurrency")
+                return jsonify({"message": "Server is busy, try again later"}), 503, _retry_after(1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                controller.gate.leave()
+
+        return wrapper
+
+    return decorator
+
+
+def init_admission(app: Flask) -> AdmissionController:
+    """Create the admission controller of an app from its config.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        AdmissionController: Controller stored in ``app.extensions["admission"]``.
+    """
+    controller = AdmissionController(app.config)
+    app.extensions["admission"] = controller
+    return controller
+
+
+def get_admission() -> AdmissionController:
+    """Return the admission controller of the current Flask app.
+
+    Returns:
+        AdmissionController: Controller created by :func:`init_admission`.
+    """
+    return current_app.extensions["admission"]
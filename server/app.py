@@ -4,6 +4,16 @@ This module wires together the backend components:
 
 - Loads configuration from :class:`server.config.Config`.
 - Initializes the database via :func:`server.database.init_db`.
+- Loads the leaderboard rank index via :func:`server.leaderboard.init_rank_index`.
+- Configures the shared leaderboard snapshot via
+  :func:`server.leaderboard_snapshot.init_leaderboard_snapshot`.
+- Creates the compressed-body cache via :func:`server.compression.init_compression`.
+- Creates the admission controller via :func:`server.admission.init_admission`.
+- Creates the ``Idempotency-Key`` replay store via
+  :func:`server.idempotency.init_idempotency`.
+- Configures the score rollup thread via :func:`server.score_events.init_score_rollups`.
+- Creates the ``/sync`` write-behind queue via :func:`server.write_behind.init_write_behind`.
+- Registers request/SQL instrumentation via :func:`server.metrics.init_metrics`.
 - Registers the REST API blueprint from :mod:`server.routes` under the ``/api`` prefix.
 
 The module exposes :func:`create_app` for WSGI servers and a module-level
@@ -27,6 +37,7 @@ from __future__ import annotations
 
 import os
 import sys
+from typing import Any, Mapping, Optional
 
 from flask import Flask
 from flask_cors import CORS
@@ -37,27 +48,63 @@ if __package__ in (None, ""):
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
 
+from server.admission import init_admission
+from server.compression import init_compression
 from server.config import Config
 from server.database import init_db
+from server.idempotency import init_idempotency
+from server.leaderboard import init_rank_index
+from server.leaderboard_snapshot import init_leaderboard_snapshot
+from server.metrics import init_metrics
 from server.routes import api_bp
+from server.score_events import init_score_rollups
+from server.write_behind import init_write_behind
 
 
-def create_app() -> Flask:
+def create_app(config: Optional[Mapping[str, Any]] = None) -> Flask:
     """Create and configure the Flask application.
 
+    Args:
+        config: Optional overrides applied on top of
+            :class:`server.config.Config` (e.g. a temporary
+            ``SQLALCHEMY_DATABASE_URI`` for benchmarks).
+
     Returns:
         Flask: Configured Flask application.
 
     Side Effects:
         - Initializes the SQLAlchemy extension and creates DB tables (see
           :func:`server.database.init_db`).
+        - Loads every profile into the in-memory rank index.
+        - Configures the shared leaderboard snapshot when
+          ``LEADERBOARD_SNAPSHOT_PATH`` is set (the refresher thread starts
+          on the first leaderboard request of each worker).
+        - Creates the admission controller (rate limits of ``/sync*`` and
+          the auth routes).
+        - Creates the cache of compressed response bodies.
+        - Creates the replay store of requests with an ``Idempotency-Key``.
+        - Configures the score rollup thread (started on the first profile
+          write of each worker) unless ``SCORE_ROLLUP_INTERVAL`` is ``0``.
+        - Creates the write-behind queue of ``/sync`` when
+          ``WRITE_BEHIND_ENABLED`` is set (drained at exit).
+        - Installs request and SQL metrics hooks (``GET /api/metrics``).
         - Enables CORS for routes under ``/api/*``.
         - Registers the API blueprint.
     """
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
     init_db(app)
+    init_rank_index(app)
+    init_leaderboard_snapshot(app)
+    init_admission(app)
+    init_idempotency(app)
+    init_compression(app)
+    init_score_rollups(app)
+    init_write_behind(app)
+    init_metrics(app)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     app.register_blueprint(api_bp, url_prefix="/api")
 
@@ -2,7 +2,8 @@
 
 The backend uses:
 
-- Password hashing via Werkzeug (PBKDF2 by default).
+- Password hashing via Werkzeug, run in a bounded process pool (see
+  :mod:`server.hashing`).
 - Stateless signed tokens via :class:`itsdangerous.URLSafeTimedSerializer`.
 
 Tokens are expected in the ``Authorization`` header using the Bearer scheme:
@@ -13,21 +14,62 @@ Notes:
     Token payload currently contains ``{"user_id": <int>}``.
 
     The token salt is hard-coded to ``"mobile-dev-game"``.
+
+    The serializer is built once per app. Verified tokens are remembered in a
+    bounded :class:`server.cache.TTLCache` until the token itself expires
+    (``issued_at + TOKEN_MAX_AGE``), so protected routes normally resolve the
+    caller without querying the ``users`` table.
 """
 
+import time
+from datetime import datetime
 from functools import wraps
-from typing import Callable, Optional
+from typing import Any, Callable, Mapping, NamedTuple, Optional, Sequence
 
 from flask import current_app, jsonify, request
 from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+
+from .cache import TTLCache
+from .database import db, get_read_session
+from .hashing import get_password_hasher
+from .leaderboard import get_rank_index
+from .models import Profile, ProfileSnapshot, User
+from .score_events import record_score_event
+
+
+SNAPSHOT_WRITE_ATTEMPTS = 3
+
+
+class ProfileVersionConflict(Exception):
+    """Raised when a delta sync is based on an outdated profile version.
+
+    Attributes:
+        profile: Current persisted profile state.
+    """
+
+    def __init__(self, profile: ProfileSnapshot):
+        super().__init__(f"profile version is {profile.version}")
+        self.profile = profile
 
-from .database import db
-from .models import Profile, User
+
+class AuthenticatedUser(NamedTuple):
+    """Identity of a verified caller.
+
+    Attributes:
+        id: Database identifier of the user.
+        nickname: User nickname.
+    """
+    id: int
+    nickname: str
 
 
 def _get_serializer() -> URLSafeTimedSerializer:
-    """Build a serializer bound to the current Flask app config.
+    """Return the serializer bound to the current Flask app config.
+
+    The serializer is created on first use and stored in
+    ``current_app.extensions["token_serializer"]``.
 
     Returns:
         URLSafeTimedSerializer: Serializer configured with ``SECRET_KEY`` and salt.
@@ -38,45 +80,83 @@ def _get_serializer() -> URLSafeTimedSerializer:
     Side Effects:
         Reads :data:`flask.current_app` configuration.
     """
-    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="mobile-dev-game")
+    serializer = current_app.extensions.get("token_serializer")
+    if serializer is None:
+        serializer = URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="mobile-dev-game")
+        current_app.extensions["token_serializer"] = serializer
+    return serializer
+
+
+def get_token_cache() -> TTLCache:
+    """Return the verified-token cache of the current Flask app.
+
+    Returns:
+        TTLCache: Cache mapping token to :class:`AuthenticatedUser`, sized by
+        ``TOKEN_CACHE_SIZE``. Its :meth:`~server.cache.TTLCache.stats` report
+        the hit rate.
+    """
+    cache = current_app.extensions.get("token_cache")
+    if cache is None:
+        cache = TTLCache(current_app.config["TOKEN_CACHE_SIZE"])
+        current_app.extensions["token_cache"] = cache
+    return cache
 
 
-def generate_token(user_id: int) -> str:
+def generate_token(user_id: int, nickname: Optional[str] = None) -> str:
     """Generate a signed authentication token for a user.
 
     Args:
         user_id: Database identifier of the user.
+        nickname: Optional nickname. When given, the new token is stored in
+            the verified-token cache right away.
 
     Returns:
         str: URL-safe signed token.
     """
     serializer = _get_serializer()
-    return serializer.dumps({"user_id": user_id})
+    token = serializer.dumps({"user_id": user_id})
+    if nickname is not None:
+        expires_at = time.time() + current_app.config["TOKEN_MAX_AGE"]
+        get_token_cache().set(token, AuthenticatedUser(user_id, nickname), expires_at)
+    return token
 
 
-def verify_token(token: str) -> Optional[User]:
-    """Verify a token and return the corresponding user.
+def verify_token(token: str) -> Optional[AuthenticatedUser]:
+    """Verify a token and return the corresponding user identity.
 
     Args:
         token: Signed token previously created by :func:`generate_token`.
 
     Returns:
-        Optional[User]: Loaded user or ``None`` if token is invalid/expired.
+        Optional[AuthenticatedUser]: Caller identity or ``None`` if the token
+        is invalid/expired or the user no longer exists.
 
     Side Effects:
         Reads Flask config ``TOKEN_MAX_AGE``.
-        Performs a database query.
+        Performs a database query on a cache miss.
     """
+    cache = get_token_cache()
+    identity = cache.get(token)
+    if identity is not None:
+        return identity
+
     serializer = _get_serializer()
     max_age = current_app.config["TOKEN_MAX_AGE"]
     try:
-        data = serializer.loads(token, max_age=max_age)
-        user_id = data.get("user_id")
-        if user_id is None:
-            return None
-        return User.query.get(user_id)
+        data, issued_at = serializer.loads(token, max_age=max_age, return_timestamp=True)
     except (BadSignature, SignatureExpired):
         return None
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    if user_id is None:
+        return None
+    row = get_read_session().execute(
+        db.select(User.id, User.nickname).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    identity = AuthenticatedUser(row.id, row.nickname)
+    cache.set(token, identity, issued_at.timestamp() + max_age)
+    return identity
 
 
 def hash_password(password: str) -> str:
@@ -87,8 +167,11 @@ def hash_password(password: str) -> str:
 
     Returns:
         str: Hash suitable for storage.
+
+    Raises:
+        server.hashing.PasswordHashingBusy: If the hashing pool is saturated.
     """
-    return generate_password_hash(password)
+    return get_password_hasher().hash(password)
 
 
 def check_password(password_hash: str, password: str) -> bool:
@@ -100,15 +183,56 @@ def check_password(password_hash: str, password: str) -> bool:
 
     Returns:
         bool: ``True`` if the password matches.
+
+    Raises:
+        server.hashing.PasswordHashingBusy: If the hashing pool is saturated.
     """
-    return check_password_hash(password_hash, password)
+    return get_password_hasher().check(password_hash, password)
+
+
+def rehash_password_if_needed(user_id: int, password_hash: str, password: str) -> None:
+    """Upgrade an outdated password hash in the background.
+
+    Call only after ``password`` has been verified against ``password_hash``.
+
+    Args:
+        user_id: Identifier of the user.
+        password_hash: Currently stored hash.
+        password: Verified plain-text password.
+
+    Side Effects:
+        When the stored hash uses another method or cost than
+        ``PASSWORD_HASH_METHOD``, schedules a rehash whose result is written
+        to ``users.password_hash`` unless the hash changed in the meantime.
+        The write runs on the hasher's writer thread, in its own app context
+        and session; with ``PASSWORD_HASH_WORKERS = 0`` it runs synchronously
+        before this function returns.
+    """
+    hasher = get_password_hasher()
+    if not hasher.needs_rehash(password_hash):
+        return
+    app = current_app._get_current_object()
+
+    def _store(new_hash: str) -> None:
+        with app.app_context():
+            try:
+                db.session.execute(
+                    db.update(User)
+                    .where(User.id == user_id, User.password_hash == password_hash)
+                    .values(password_hash=new_hash)
+                )
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    hasher.rehash_in_background(password, _store)
 
 
 def token_required(fn: Callable):
     """Decorator enforcing Bearer-token authentication.
 
-    The wrapped view receives the authenticated :class:`server.models.User`
-    instance as the first positional argument.
+    The wrapped view receives the caller's :class:`AuthenticatedUser`
+    identity as the first positional argument.
 
     Args:
         fn: Flask view function.
@@ -145,25 +269,231 @@ def token_required(fn: Callable):
     return wrapper
 
 
-def upsert_profile(user: User, coins: int, upgrades: str, stats: str) -> Profile:
+def admin_required(fn: Callable):
+    """Decorator restricting a view to the nicknames in ``ADMIN_NICKNAMES``.
+
+    Place it below :func:`token_required`, which supplies the identity.
+
+    Args:
+        fn: Flask view function taking the :class:`AuthenticatedUser` first.
+
+    Returns:
+        Callable: Wrapped function answering ``403`` to non-admins.
+    """
+    @wraps(fn)
+    def wrapper(user: AuthenticatedUser, *args, **kwargs):
+        if user.nickname not in current_app.config["ADMIN_NICKNAMES"]:
+            return jsonify({"message": "Admin access required"}), 403
+        return fn(user, *args, **kwargs)
+
+    return wrapper
+
+
+def _profile_for_update(user_id: int):
+    """Query a profile together with its typed rows.
+
+    The rows are loaded up front so that touching them later cannot trigger
+    an autoflush halfway through the update (which would bump
+    :attr:`server.models.Profile.version` twice).
+
+    Args:
+        user_id: Owner of the profile.
+
+    Returns:
+        Query: Profile query with the upgrade and stat rows eager-loaded.
+    """
+    return Profile.query.filter_by(user_id=user_id).options(
+        selectinload(Profile.upgrade_rows),
+        selectinload(Profile.stat_rows),
+    )
+
+
+def upsert_profile(
+    user: AuthenticatedUser,
+    coins: Optional[int],
+    upgrades: Mapping[str, int],
+    stats: Mapping[str, int],
+    max_coin_gain: Optional[int] = None,
+    base_version: Optional[int] = None,
+    replace: bool = True,
+) -> ProfileSnapshot:
     """Create or update a user's profile snapshot.
 
     Args:
-        user: Authenticated user.
-        coins: Coin balance. Will be coerced to ``int`` and clamped to ``>= 0``.
-        upgrades: JSON string snapshot of upgrades.
-        stats: JSON string snapshot of stats.
+        user: Authenticated user identity.
+        coins: Coin balance. Will be coerced to ``int`` and clamped to ``>= 0``;
+            ``None`` keeps the stored balance.
+        upgrades: Snapshot of upgrade levels. Upgrades missing from it are
+            removed unless ``replace`` is ``False``.
+        stats: Snapshot of stat counters. Counters missing from it are
+            removed unless ``replace`` is ``False``.
+        max_coin_gain: Optional cap on the balance increase over the stored
+            one (see :mod:`server.replay`); ``None`` means uncapped.
+        base_version: Profile version the allowance was earned on. When it
+            no longer matches the stored version, the gain is capped at 0.
+        replace: ``False`` merges ``upgrades`` and ``stats`` into the stored
+            ones key by key (partial snapshots, see ``/sync/batch``).
 
     Returns:
-        Profile: Persisted profile.
+        ProfileSnapshot: Persisted state, captured between flush and commit
+        so that rendering it does not reload the expired profile.
 
     Side Effects:
-        Writes to the database (insert/update + commit).
+        - Writes to the database (insert/update + commit). Only typed rows
+          whose value changed are written.
+        - Appends a :class:`server.models.ScoreEvent` in the same transaction.
+        - Moves the player inside the leaderboard rank index.
+
+    Notes:
+        A full snapshot is last-write-wins: when a concurrent writer bumps
+        :attr:`server.models.Profile.version` first, the snapshot is
+        re-applied on the fresh row (up to :data:`SNAPSHOT_WRITE_ATTEMPTS`
+        times) instead of failing the request.
     """
-    profile = user.profile or Profile(user=user)
-    profile.coins = max(0, int(coins))
-    profile.upgrades_snapshot = upgrades
-    profile.stats_snapshot = stats
-    db.session.add(profile)
-    db.session.commit()
-    return profile
+    for attempt in range(SNAPSHOT_WRITE_ATTEMPTS):
+        profile = _profile_for_update(user.id).first() or Profile(user_id=user.id)
+        balance = profile.coins or 0
+        profile.coins = balance if coins is None else max(0, int(coins))
+        if max_coin_gain is not None:
+            allowed = max_coin_gain if base_version in (None, profile.version) else 0
+            profile.coins = min(profile.coins, balance + allowed)
+        profile.apply_upgrades(upgrades, replace=replace)
+        profile.apply_stats(stats, replace=replace)
+        profile.updated_at = datetime.utcnow()
+        db.session.add(profile)
+        earned = None if max_coin_gain is None else max(0, profile.coins - balance)
+        record_score_event(user.id, profile.coins - balance, profile.coins, earned)
+        try:
+            db.session.flush()
+            snapshot = profile.snapshot()
+            db.session.commit()
+            break
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == SNAPSHOT_WRITE_ATTEMPTS - 1:
+                raise
+    get_rank_index().upsert(user.id, user.nickname, snapshot.coins, snapshot.updated_at)
+    return snapshot
+
+
+def upsert_profiles(snapshots: Sequence[Any]) -> None:
+    """Write many full snapshots in a single transaction.
+
+    Used by the write-behind flusher (see :mod:`server.write_behind`): the
+    profiles of all users are loaded with one query and committed together,
+    instead of one ``UPDATE`` plus commit per sync.
+
+    Args:
+        snapshots: Items with ``user`` (:class:`AuthenticatedUser`),
+            ``coins``, ``upgrades``, ``stats`` and ``updated_at``; at most one
+            per user.
+
+    Side Effects:
+        - Writes to the database (one commit) and appends one
+          :class:`server.models.ScoreEvent` per snapshot.
+        - Moves the players inside the leaderboard rank index.
+
+    Notes:
+        When a concurrent writer bumps one of the versions first, the batch
+        is rolled back and every snapshot is written through
+        :func:`upsert_profile`, which retries per profile.
+    """
+    if not snapshots:
+        return
+    profiles = {
+        profile.user_id: profile
+        for profile in Profile.query.filter(Profile.user_id.in_([item.user.id for item in snapshots])).options(
+            selectinload(Profile.upgrade_rows),
+            selectinload(Profile.stat_rows),
+        )
+    }
+    for item in snapshots:
+        profile = profiles.get(item.user.id) or Profile(user_id=item.user.id)
+        balance = profile.coins or 0
+        profile.coins = item.coins
+        profile.apply_upgrades(item.upgrades, replace=True)
+        profile.apply_stats(item.stats, replace=True)
+        profile.updated_at = item.updated_at
+        db.session.add(profile)
+        record_score_event(item.user.id, item.coins - balance, item.coins)
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        for item in snapshots:
+            upsert_profile(item.user, item.coins, item.upgrades, item.stats)
+        return
+    # The committed values are the snapshot's own; reading them back from the
+    # expired instances would reload every profile.
+    index = get_rank_index()
+    for item in snapshots:
+        index.upsert(item.user.id, item.user.nickname, item.coins, item.updated_at)
+
+
+def apply_profile_delta(
+    user: AuthenticatedUser,
+    base_version: int,
+    coins: Optional[int],
+    upgrades: Mapping[str, int],
+    stats: Mapping[str, int],
+    max_coin_gain: Optional[int] = None,
+) -> ProfileSnapshot:
+    """Merge changed keys into a user's profile with optimistic concurrency.
+
+    Only what actually changes is written: a delta carrying just ``coins``
+    updates the ``profiles`` row and leaves upgrade/stat rows untouched.
+
+    Args:
+        user: Authenticated user identity.
+        base_version: :attr:`server.models.Profile.version` the client's
+            changes are based on.
+        coins: New coin balance, or ``None`` to keep the current one. Clamped
+            to ``>= 0``.
+        upgrades: Changed upgrade levels (merged into the stored ones).
+        stats: Changed stat counters (merged into the stored ones).
+        max_coin_gain: Optional cap on the balance increase over the stored
+            one (see :mod:`server.replay`); ``None`` means uncapped.
+
+    Returns:
+        ProfileSnapshot: Persisted state with its new version.
+
+    Raises:
+        ProfileVersionConflict: If ``base_version`` is not the current
+            version, or another writer committed first.
+
+    Side Effects:
+        - Writes to the database (conditional update + commit).
+        - Appends a :class:`server.models.ScoreEvent` in the same transaction
+          when something changed.
+        - Moves the player inside the leaderboard rank index.
+    """
+    profile = _profile_for_update(user.id).one()
+    if profile.version != base_version:
+        raise ProfileVersionConflict(profile.snapshot())
+
+    balance = profile.coins
+    changed = False
+    if coins is not None:
+        coins = max(0, int(coins))
+        if max_coin_gain is not None:
+            coins = min(coins, profile.coins + max_coin_gain)
+        if profile.coins != coins:
+            profile.coins = coins
+            changed = True
+    changed = profile.apply_upgrades(upgrades, replace=False) or changed
+    changed = profile.apply_stats(stats, replace=False) or changed
+    if not changed:
+        return profile.snapshot()
+    profile.updated_at = datetime.utcnow()
+    earned = None if max_coin_gain is None else max(0, profile.coins - balance)
+    record_score_event(user.id, profile.coins - balance, profile.coins, earned)
+
+    try:
+        db.session.flush()
+        snapshot = profile.snapshot()
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        raise ProfileVersionConflict(Profile.query.filter_by(user_id=user.id).one().snapshot())
+    get_rank_index().upsert(user.id, user.nickname, snapshot.coins, snapshot.updated_at)
+    return snapshot
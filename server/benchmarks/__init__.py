@@ -0,0 +1,9 @@
+"""Benchmarks for the Flask backend.
+
+Modules in this package are runnable scripts, for example:
+
+    >>> # python -m server.benchmarks.wire
+
+They build their own app via :func:`server.create_app` with a temporary
+SQLite database and never touch ``server/leaderboard.db`` contents.
+"""
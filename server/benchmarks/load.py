@@ -0,0 +1,341 @@
+"""Reproducible load test for the API.
+
+The benchmark builds an app with :func:`server.create_app` on a temporary
+SQLite database, seeds ``--users`` synthetic players and then drives a mixed
+register/login/profile/sync/leaderboard workload from ``--concurrency``
+threads through the Flask test client.
+
+For every endpoint it reports throughput and p50/p95/p99 latency as JSON.
+With ``--baseline`` the run is compared against a stored result and the
+process exits with status 1 when an endpoint regresses by more than
+``--tolerance``.
+
+Examples:
+    >>> # python -m server.benchmarks.load --users 2000 --requests 5000 --concurrency 8
+    >>> # python -m server.benchmarks.load --save-baseline bench-baseline.json
+    >>> # python -m server.benchmarks.load --baseline bench-baseline.json --tolerance 0.25
+
+Notes:
+    Passwords are hashed with the cheap ``--hash-method`` (PBKDF2 with 1000
+    iterations by default) so that login/register numbers measure the
+    service rather than the configured production hash cost. Admission
+    control (:mod:`server.admission`) is disabled unless ``--admission`` is
+    given, because every simulated client shares the test client address.
+
+    ``--write-behind`` enables the ``/sync`` write-behind queue
+    (:mod:`server.write_behind`); the report then includes its counters, so
+    ``syncs`` versus ``flushes`` shows how many commits were saved.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy.orm import selectinload
+from werkzeug.security import generate_password_hash
+
+from server.app import create_app
+from server.auth import generate_token
+from server.database import db
+from server.leaderboard import init_rank_index
+from server.models import Profile, User
+from server.wire import STAT_KEYS, UPGRADE_KEYS
+
+DEFAULT_MIX = "sync=10,leaderboard=6,profile=5,login=2,register=1"
+PASSWORD = "benchmark-pass"
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse a ``name=weight,...`` workload mix.
+
+    Args:
+        spec: Mix specification, e.g. ``"sync=10,leaderboard=6"``.
+
+    Returns:
+        Dict[str, int]: Operation name to relative weight.
+
+    Raises:
+        ValueError: On unknown operations or malformed weights.
+    """
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Return a nearest-rank percentile of pre-sorted values.
+
+    Args:
+        sorted_values: Ascending values.
+        fraction: Percentile as a fraction, e.g. ``0.95``.
+
+    Returns:
+        float: Percentile value (``0.0`` for an empty list).
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def seed(app, users: int, rng: random.Random, hash_method: str) -> List[Tuple[int, str, str]]:
+    """Create synthetic players with random progress.
+
+    Args:
+        app: Flask application.
+        users: Number of players.
+        rng: Random generator (seeded for reproducibility).
+        hash_method: Werkzeug method for the shared password hash.
+
+    Returns:
+        List[Tuple[int, str, str]]: ``(user_id, nickname, token)`` per player.
+    """
+    password_hash = generate_password_hash(PASSWORD, hash_method)
+    with app.app_context():
+        accounts = [User(nickname=f"bench-{index:07d}", password_hash=password_hash) for index in range(users)]
+        db.session.add_all(accounts)
+        db.session.flush()
+        players = [(account.id, account.nickname, generate_token(account.id)) for account in accounts]
+        db.session.commit()
+        profiles = {
+            profile.user_id: profile
+            for profile in Profile.query.options(
+                selectinload(Profile.upgrade_rows), selectinload(Profile.stat_rows)
+            )
+        }
+        for user_id, _, _ in players:
+            profile = profiles[user_id]
+            profile.coins = rng.randint(0, 100_000)
+            profile.apply_upgrades({key: rng.randint(0, 5) for key in UPGRADE_KEYS}, replace=True)
+            profile.apply_stats({key: rng.randint(0, 1000) for key in STAT_KEYS}, replace=True)
+        db.session.commit()
+    init_rank_index(app)
+    return players
+
+
+def build_operations(client, players, rng: random.Random, lock: threading.Lock) -> Dict[str, Callable[[], Any]]:
+    """Build one callable per workload operation bound to a test client."""
+    counter = {"next": 0}
+
+    def pick():
+        return players[rng.randrange(len(players))]
+
+    def auth(token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def register():
+        with lock:
+            counter["next"] += 1
+            index = counter["next"]
+        return client.post(
+            "/api/register",
+            json={"nickname": f"new-{threading.get_ident()}-{index}", "password": PASSWORD},
+        )
+
+    def login():
+        return client.post("/api/login", json={"nickname": pick()[1], "password": PASSWORD})
+
+    def profile():
+        return client.get("/api/profile", headers=auth(pick()[2]))
+
+    def sync():
+        return client.post(
+            "/api/sync",
+            json={
+                "coins": rng.randint(0, 100_000),
+                "upgrades": {key: rng.randint(0, 5) for key in UPGRADE_KEYS},
+                "stats": {key: rng.randint(0, 1000) for key in STAT_KEYS},
+            },
+            headers=auth(pick()[2]),
+        )
+
+    def leaderboard():
+        return client.get("/api/leaderboard?limit=25", headers=auth(pick()[2]))
+
+    return {
+        "register": register,
+        "login": login,
+        "profile": profile,
+        "sync": sync,
+        "leaderboard": leaderboard,
+    }
+
+
+OPERATIONS = ("register", "login", "profile", "sync", "leaderboard")
+
+
+def run(args) -> Dict[str, Any]:
+    """Seed a temporary database, run the workload and summarize it.
+
+    Args:
+        args: Parsed command line arguments.
+
+    Returns:
+        Dict[str, Any]: JSON-friendly report with ``config``, ``total`` and
+        per-endpoint ``endpoints`` statistics.
+    """
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{Path(workdir) / 'load.db'}",
+            "PASSWORD_HASH_METHOD": args.hash_method,
+            "PASSWORD_HASH_WORKERS": args.hash_workers,
+            "ADMISSION_ENABLED": args.admission,
+            "WRITE_BEHIND_ENABLED": args.write_behind,
+        })
+        players = seed(app, args.users, rng, args.hash_method)
+
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        schedule = rng.choices(names, weights=weights, k=args.requests)
+        chunks = [schedule[index::args.concurrency] for index in range(args.concurrency)]
+
+        samples: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        lock = threading.Lock()
+
+        def worker(worker_index: int, chunk: List[str]):
+            client = app.test_client()
+            operations = build_operations(client, players, random.Random(args.seed + worker_index), lock)
+            local_samples = defaultdict(list)
+            local_errors = defaultdict(int)
+            for name in chunk:
+                started = time.perf_counter()
+                response = operations[name]()
+                local_samples[name].append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    local_errors[name] += 1
+            with lock:
+                for name, values in local_samples.items():
+                    samples[name].extend(values)
+                for name, count in local_errors.items():
+                    errors[name] += count
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for future in [pool.submit(worker, index, chunk) for index, chunk in enumerate(chunks)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        write_behind = app.extensions["write_behind"]
+        if write_behind is not None:
+            write_behind.drain()
+        with app.app_context():
+            db.engine.dispose()
+
+    endpoints = {}
+    for name in names:
+        values = sorted(samples[name])
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "throughputRps": len(values) / elapsed if elapsed else 0.0,
+            "p50Ms": percentile(values, 0.50),
+            "p95Ms": percentile(values, 0.95),
+            "p99Ms": percentile(values, 0.99),
+        }
+    return {
+        "config": {
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "seed": args.seed,
+            "admission": args.admission,
+            "writeBehind": args.write_behind,
+        },
+        "total": {"elapsedS": elapsed, "throughputRps": args.requests / elapsed if elapsed else 0.0},
+        "endpoints": endpoints,
+        **({"writeBehind": write_behind.stats()} if write_behind is not None else {}),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List regressions of ``result`` against ``baseline``.
+
+    An endpoint regresses when its p95 latency grows, or its throughput
+    drops, by more than ``tolerance`` (a fraction).
+
+    Args:
+        result: Report produced by :func:`run`.
+        baseline: Previously saved report.
+        tolerance: Allowed relative slowdown, e.g. ``0.2`` for 20 %.
+
+    Returns:
+        List[str]: Human-readable regression messages (empty when none).
+    """
+    regressions = []
+    for name, current in result["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95Ms"] and current["p95Ms"] > previous["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95Ms']:.2f}ms > baseline {previous['p95Ms']:.2f}ms")
+        if current["throughputRps"] < previous["throughputRps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughputRps']:.1f}rps < baseline {previous['throughputRps']:.1f}rps"
+            )
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors > baseline {previous['errors']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    """Command line entry point.
+
+    Returns:
+        int: Process exit status (``1`` on regression).
+    """
+    parser = argparse.ArgumentParser(description="Load test the API against a temporary SQLite database.")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic players to seed")
+    parser.add_argument("--requests", type=int, default=3000, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"workload weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:1000", help="password hash method")
+    parser.add_argument("--hash-workers", type=int, default=0, help="password hashing pool size")
+    parser.add_argument(
+        "--admission",
+        action="store_true",
+        help="keep admission control enabled (all simulated clients share one address)",
+    )
+    parser.add_argument("--write-behind", action="store_true", help="queue /sync writes (see server.write_behind)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against this saved report")
+    parser.add_argument("--save-baseline", help="store the report as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (fraction)")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(report, encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            for message in regressions:
+                print(f"REGRESSION {message}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Query budgets: SQL statements issued per API request.
+
+The benchmark builds an app with :func:`server.create_app` on a temporary
+SQLite database, seeds ``--users`` players with typed upgrade/stat rows (see
+:func:`server.benchmarks.load.seed`) and sends one request per scenario
+through the Flask test client. A ``before_cursor_execute`` listener on every
+engine counts the statements each request issues.
+
+The counts are compared against :data:`BUDGETS` and printed as JSON; the
+process exits with status 1 when a scenario exceeds its budget or does not
+answer with the expected status. Because the players are seeded first, an
+N+1 pattern (one query per player, entry or row) shows up as a count that
+grows with ``--users`` and breaks the budget.
+
+The budgets are enforced by ``server/tests/test_query_budgets.py`` (one test
+per scenario); this command prints the full report, optionally with the
+executed SQL, for investigating an overrun.
+
+Examples:
+    >>> # python -m server.benchmarks.queries
+    >>> # python -m server.benchmarks.queries --users 500 --verbose
+
+Notes:
+    Background threads are kept out of the counts: the score rollup and
+    rank index refresher threads are disabled and the write-behind queue is
+    only enabled for the ``sync_write_behind`` scenario, which must not
+    touch the database.
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+
+from server.app import create_app
+from server.benchmarks.load import PASSWORD, seed
+from server.database import db
+
+# Scenario -> (maximum statements, expected status code).
+BUDGETS: Dict[str, Tuple[int, int]] = {
+    "register": (3, 200),  # nickname check, user insert, profile insert
+    "login": (1, 200),  # credentials and profile joined
+    "profile": (1, 200),
+    "profile_not_modified": (1, 304),
+    # Profile + 2 row loads, profile update, event, window counters upsert,
+    # then at most one executemany INSERT/UPDATE/DELETE per typed-row table,
+    # however many keys changed.
+    "sync": (12, 200),
+    "sync_write_behind": (0, 202),
+    "sync_batch": (12, 200),
+    "sync_delta": (6, 200),  # profile + 2 row loads, profile update, event, window counters
+    "leaderboard": (0, 200),
+    "leaderboard_cursor": (0, 200),
+    "leaderboard_around": (0, 200),
+    "leaderboard_me": (0, 200),
+    "leaderboard_window": (1, 200),  # range scan of the current window
+    "leaderboard_window_around": (4, 200),  # own row, rank count, two range scans
+    "players_search": (1, 200),  # nickname_lower range scan joined to profiles
+    "stats_me": (2, 200),
+    "stats_global": (2, 200),
+    "stats_earners": (2, 200),
+    "admin_export": (1, 200),
+    "health": (0, 200),
+}
+
+
+@contextmanager
+def count_statements(*apps):
+    """Collect the SQL statements executed on any engine of ``apps``.
+
+    Yields:
+        List[str]: Statements, appended as they run.
+    """
+    statements: List[str] = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engines = []
+    for app in apps:
+        with app.app_context():
+            engines.extend(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", listener)
+
+
+def build_scenarios(client, queue_client, player) -> Dict[str, Tuple[Callable[[], Any], Callable[[Any], Any]]]:
+    """Build ``(prepare, send)`` per scenario of :data:`BUDGETS`.
+
+    Only the request made by ``send(prepare())`` is counted. Scenarios run
+    in insertion order and may rely on the state left by earlier ones.
+    """
+    user_id, nickname, token = player
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def nothing():
+        return None
+
+    def get(path):
+        return lambda _: client.get(path, headers=headers)
+
+    def etag():
+        return client.get("/api/profile", headers=headers).headers["ETag"]
+
+    def version():
+        return client.get("/api/profile", headers=headers).get_json()["version"]
+
+    def cursor():
+        return client.get("/api/leaderboard?limit=5", headers=headers).get_json()["nextCursor"]
+
+    return {
+        "register": (nothing, lambda _: client.post(
+            "/api/register", json={"nickname": "budget-new", "password": PASSWORD}
+        )),
+        "login": (nothing, lambda _: client.post("/api/login", json={"nickname": nickname, "password": PASSWORD})),
+        "profile": (nothing, get("/api/profile")),
+        "profile_not_modified": (etag, lambda tag: client.get(
+            "/api/profile", headers={**headers, "If-None-Match": tag}
+        )),
+        "sync": (nothing, lambda _: client.post(
+            "/api/sync",
+            json={"coins": 100, "upgrades": {"magnet": 3}, "stats": {"match3": 5, "match5": 1}},
+            headers=headers,
+        )),
+        "sync_write_behind": (nothing, lambda _: queue_client.post(
+            "/api/sync", json={"coins": 1, "upgrades": {}, "stats": {}}, headers=headers
+        )),
+        "sync_batch": (nothing, lambda _: client.post(
+            "/api/sync/batch",
+            json={"snapshots": [{"coins": 120, "upgrades": {"magnet": 4}, "stats": {"match3": 6}}]},
+            headers=headers,
+        )),
+        "sync_delta": (version, lambda base: client.post(
+            "/api/sync/delta", json={"baseVersion": base, "coins": 150}, headers=headers
+        )),
+        "leaderboard": (nothing, get("/api/leaderboard")),
+        "leaderboard_cursor": (cursor, lambda value: client.get(
+            f"/api/leaderboard?limit=5&cursor={value}", headers=headers
+        )),
+        "leaderboard_around": (nothing, get("/api/leaderboard?around=me")),
+        "leaderboard_me": (nothing, get("/api/leaderboard/me")),
+        "leaderboard_window": (nothing, get("/api/leaderboard?window=week")),
+        "leaderboard_window_around": (nothing, get("/api/leaderboard?window=week&around=me")),
+        "players_search": (nothing, get("/api/players/search?q=BENCH-00&limit=20")),
+        "stats_me": (nothing, get("/api/stats/me")),
+        "stats_global": (nothing, get("/api/stats/global")),
+        "stats_earners": (nothing, get("/api/stats/earners")),
+        "admin_export": (nothing, get("/api/admin/export")),
+        "health": (nothing, lambda _: client.get("/api/health")),
+    }
+
+
+def measure(users: int = 50, rng_seed: int = 1, hash_method: str = "pbkdf2:sha256:1000", verbose: bool = False) -> Dict[str, Any]:
+    """Seed a temporary database and measure every scenario.
+
+    Also used by ``server/tests/test_query_budgets.py``, which fails the
+    test suite on a budget overrun.
+
+    Args:
+        users: Players to seed before measuring.
+        rng_seed: Random seed.
+        hash_method: Password hash method of the seeded players.
+        verbose: Include the executed SQL of every scenario.
+
+    Returns:
+        Dict[str, Any]: JSON-friendly report with ``users``, ``scenarios``
+        (``statements``, ``budget``, ``status`` and optionally ``sql`` per
+        scenario) and ``failures``.
+    """
+    rng = random.Random(rng_seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        config = {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{Path(workdir) / 'queries.db'}",
+            "PASSWORD_HASH_METHOD": hash_method,
+            "PASSWORD_HASH_WORKERS": 0,
+            "ADMISSION_ENABLED": False,
+            "SCORE_ROLLUP_INTERVAL": 0,
+            "RANK_INDEX_REFRESH_INTERVAL": 0,
+            "ADMIN_NICKNAMES": frozenset({"bench-0000000"}),
+        }
+        app = create_app(config)
+        players = seed(app, users, rng, hash_method)
+        # Same database; syncs stay queued until the final drain.
+        queue_app = create_app({**config, "WRITE_BEHIND_ENABLED": True, "WRITE_BEHIND_INTERVAL_MS": 3_600_000})
+
+        client, queue_client = app.test_client(), queue_app.test_client()
+        # Resolve the token once per app: the identity cache is bounded, and
+        # its one-off lookup is not what the budgets measure.
+        for warm in (client, queue_client):
+            warm.get("/api/leaderboard/me", headers={"Authorization": f"Bearer {players[0][2]}"})
+        scenarios = build_scenarios(client, queue_client, players[0])
+        report: Dict[str, Any] = {}
+        failures: List[str] = []
+        for name, (prepare, send) in scenarios.items():
+            budget, expected_status = BUDGETS[name]
+            prepared = prepare()
+            with count_statements(app, queue_app) as statements:
+                response = send(prepared)
+                response.get_data()
+            report[name] = {"statements": len(statements), "budget": budget, "status": response.status_code}
+            if verbose:
+                report[name]["sql"] = [" ".join(statement.split()) for statement in statements]
+            if response.status_code != expected_status:
+                failures.append(f"{name}: status {response.status_code}, expected {expected_status}")
+            if len(statements) > budget:
+                failures.append(f"{name}: {len(statements)} statements > budget {budget}")
+        queue_app.extensions["write_behind"].drain()
+    return {"users": users, "scenarios": report, "failures": failures}
+
+
+def main(argv=None) -> int:
+    """Command line entry point.
+
+    Returns:
+        int: Process exit status (``1`` when a budget is exceeded).
+    """
+    parser = argparse.ArgumentParser(description="Count SQL statements per API request against budgets.")
+    parser.add_argument("--users", type=int, default=50, help="players to seed before measuring")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:1000", help="password hash method")
+    parser.add_argument("--verbose", action="store_true", help="include the executed SQL in the report")
+    args = parser.parse_args(argv)
+
+    result = measure(args.users, args.seed, args.hash_method, args.verbose)
+    print(json.dumps(result, indent=2))
+    for message in result["failures"]:
+        print(f"OVER BUDGET {message}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Benchmark: update rate of the in-memory rank index at scale.
+
+Loads ``--players`` synthetic players into a :class:`server.leaderboard.RankIndex`,
+then moves ``--updates`` random players to a new balance with
+:meth:`~server.leaderboard.RankIndex.upsert` and measures:
+
+- upserts per second on the chunked :class:`server.leaderboard.SortedKeyList`;
+- the same updates on a plain sorted list (``bisect`` + ``del`` + ``insort``,
+  the previous implementation), whose per-update cost grows with the table;
+- rank lookups per second.
+
+Results are printed as JSON; the process exits with status 1 when upserts
+fall below ``--min-rate`` per second (default :data:`MIN_UPSERTS_PER_SECOND`)
+or the index disagrees with the plain list.
+
+Examples:
+    >>> # python -m server.benchmarks.rank_index --players 1000000
+    >>> # python -m server.benchmarks.rank_index --players 100000 --min-rate 0  # report only
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import List
+
+from server.leaderboard import RankIndex
+
+MIN_UPSERTS_PER_SECOND = 20_000
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print the results as JSON.
+
+    Returns:
+        int: Process exit status (``1`` when below ``--min-rate``).
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=1_000_000, help="players loaded into the index")
+    parser.add_argument("--updates", type=int, default=50_000, help="upserts measured")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument(
+        "--min-rate", type=float, default=MIN_UPSERTS_PER_SECOND,
+        help="minimum upserts per second (0 disables the check)",
+    )
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    epoch = datetime(2024, 1, 1)
+    rows = [
+        (user_id, f"bench-{user_id}", rng.randint(0, 100_000), epoch + timedelta(seconds=rng.randint(0, 10**7)))
+        for user_id in range(1, args.players + 1)
+    ]
+    updates = [
+        (rng.randint(1, args.players), rng.randint(0, 100_000), epoch + timedelta(seconds=10**7 + offset))
+        for offset in range(args.updates)
+    ]
+
+    index = RankIndex()
+    started = time.perf_counter()
+    index.load(rows)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for user_id, coins, updated_at in updates:
+        index.upsert(user_id, "bench", coins, updated_at)
+    upsert_seconds = time.perf_counter() - started
+
+    keys = {user_id: RankIndex._sort_key(user_id, coins, updated_at) for user_id, _, coins, updated_at in rows}
+    plain: List = sorted(keys.values())
+    started = time.perf_counter()
+    for user_id, coins, updated_at in updates:
+        del plain[bisect_left(plain, keys[user_id])]
+        keys[user_id] = RankIndex._sort_key(user_id, coins, updated_at)
+        insort(plain, keys[user_id])
+    plain_seconds = time.perf_counter() - started
+
+    probes = [rng.randint(1, args.players) for _ in range(min(args.updates, 10_000))]
+    started = time.perf_counter()
+    ranks = [index.rank_of(user_id) for user_id in probes]
+    rank_seconds = time.perf_counter() - started
+
+    rate = args.updates / upsert_seconds
+    failures: List[str] = []
+    if ranks != [bisect_left(plain, keys[user_id]) + 1 for user_id in probes]:
+        failures.append("ranks differ from the plain sorted list")
+    if rate < args.min_rate:
+        failures.append(f"{rate:.0f} upserts/s < minimum {args.min_rate:.0f}")
+    print(json.dumps({
+        "players": args.players,
+        "updates": args.updates,
+        "loadSeconds": load_seconds,
+        "upsertsPerSecond": rate,
+        "plainListUpsertsPerSecond": args.updates / plain_seconds,
+        "rankLookupsPerSecond": len(probes) / rank_seconds if rank_seconds else None,
+        "failures": failures,
+    }, indent=2))
+    for message in failures:
+        print(f"FAILED {message}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
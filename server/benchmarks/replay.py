@@ -0,0 +1,130 @@
+"""Benchmark: throughput of the match-3 replay validator.
+
+Generates ``--sessions`` synthetic sessions of ``--moves`` random legal
+swaps with :class:`server.replay.BoardBatch`, then measures:
+
+- batch validation: every session replayed at once with
+  :func:`server.replay.replay_sessions` (sessions per second);
+- single-session latency, as paid by one ``POST /api/sync`` carrying a
+  replay.
+
+Results are printed as JSON; the process exits with status 1 when batch
+validation falls below ``--min-rate`` sessions per second (default
+:data:`MIN_SESSIONS_PER_SECOND`, the "thousands of sessions per second"
+target on one core) or a generated session does not validate.
+
+Examples:
+    >>> # python -m server.benchmarks.replay --sessions 2000 --moves 30
+    >>> # python -m server.benchmarks.replay --min-rate 0  # report only
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from server.replay import CELLS, COLS, ROWS, BoardBatch, has_match, replay_sessions
+
+MIN_SESSIONS_PER_SECOND = 1000
+
+SWAPS = np.array(
+    [(cell, cell + 1) for cell in range(CELLS) if cell % COLS < COLS - 1]
+    + [(cell, cell + COLS) for cell in range(CELLS - COLS)]
+)
+
+
+def legal_swaps(colors: np.ndarray) -> np.ndarray:
+    """Return ``(boards, len(SWAPS))`` flags of swaps that form a match."""
+    count = colors.shape[0]
+    trial = np.repeat(colors.reshape(count, 1, CELLS), len(SWAPS), axis=1)
+    picks = np.arange(len(SWAPS))
+    first, second = SWAPS[:, 0], SWAPS[:, 1]
+    held = trial[:, picks, first].copy()
+    trial[:, picks, first] = trial[:, picks, second]
+    trial[:, picks, second] = held
+    return has_match(trial.reshape(-1, ROWS, COLS)).reshape(count, len(SWAPS))
+
+
+def generate_sessions(sessions: int, moves: int, seed: int) -> Dict[str, Any]:
+    """Play random legal swaps and record the move logs.
+
+    Returns:
+        Dict[str, Any]: ``seeds`` and ``logs`` (``(moves, 4)`` arrays).
+    """
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(0, 2**32, size=sessions, dtype=np.uint64)
+    batch = BoardBatch(seeds)
+    batch.init()
+    logs: List[List[List[int]]] = [[] for _ in range(sessions)]
+    for _ in range(moves):
+        legal = legal_swaps(batch.colors)
+        step = np.full((sessions, 1, 4), -1, dtype=np.int64)
+        counts = np.zeros(sessions, dtype=np.int64)
+        for board in np.nonzero(legal.any(axis=1))[0]:
+            first, second = SWAPS[rng.choice(np.nonzero(legal[board])[0])]
+            move = [first // COLS, first % COLS, second // COLS, second % COLS]
+            step[board, 0] = move
+            counts[board] = 1
+            logs[board].append(move)
+        batch.play(step, counts)
+    return {"seeds": seeds, "logs": [np.array(log, dtype=np.int64).reshape(-1, 4) for log in logs]}
+
+
+def main(argv=None) -> int:
+    """Run the benchmark and print the results as JSON.
+
+    Returns:
+        int: Process exit status (``1`` when below ``--min-rate``).
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000, help="sessions validated per batch")
+    parser.add_argument("--moves", type=int, default=30, help="moves per session")
+    parser.add_argument("--single", type=int, default=50, help="sessions validated one by one")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument(
+        "--min-rate", type=float, default=MIN_SESSIONS_PER_SECOND,
+        help="minimum batch sessions per second (0 disables the check)",
+    )
+    args = parser.parse_args(argv)
+
+    data = generate_sessions(args.sessions, args.moves, args.seed)
+    seeds, logs = data["seeds"], data["logs"]
+
+    started = time.perf_counter()
+    results = replay_sessions(seeds, logs)
+    batch_seconds = time.perf_counter() - started
+
+    single = min(args.single, args.sessions)
+    started = time.perf_counter()
+    for index in range(single):
+        replay_sessions(seeds[index:index + 1], logs[index:index + 1])
+    single_seconds = time.perf_counter() - started
+
+    rate = args.sessions / batch_seconds
+    failures: List[str] = []
+    invalid = sum(not result.valid for result in results)
+    if invalid:
+        failures.append(f"{invalid} generated sessions did not validate")
+    if rate < args.min_rate:
+        failures.append(f"{rate:.0f} sessions/s < minimum {args.min_rate:.0f}")
+    print(json.dumps({
+        "sessions": args.sessions,
+        "movesPerSession": args.moves,
+        "batch": {
+            "seconds": batch_seconds,
+            "sessionsPerSecond": rate,
+        },
+        "singleSessionMs": single_seconds / single * 1000 if single else None,
+        "meanScore": float(np.mean([result.score for result in results])),
+        "failures": failures,
+    }, indent=2))
+    for message in failures:
+        print(f"FAILED {message}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Benchmark: JSON vs. binary wire format for ``/sync`` and ``/profile``.
+
+Measures two things:
+
+- codec cost: decoding a sync body and encoding a profile response with the
+  JSON path (``json.loads`` / ``json.dumps``) versus :mod:`server.wire`;
+- end-to-end ``POST /api/sync`` through the Flask test client with each
+  format.
+
+Results are printed as JSON.
+
+Examples:
+    >>> # python -m server.benchmarks.wire --iterations 20000 --requests 500
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from server.app import create_app
+from server.wire import BINARY_MIMETYPE, STAT_KEYS, UPGRADE_KEYS, decode_sync, encode_profile, encode_sync
+
+
+def _sample_payload() -> Dict[str, Any]:
+    """Build a realistic full snapshot (every known upgrade and stat)."""
+    return {
+        "coins": 48_215,
+        "upgrades": {key: (index % 5) + 1 for index, key in enumerate(UPGRADE_KEYS)},
+        "stats": {key: 37 * (index + 3) for index, key in enumerate(STAT_KEYS)},
+    }
+
+
+def _time_per_op(fn: Callable[[], Any], iterations: int) -> float:
+    """Return the mean wall time of ``fn`` in microseconds."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def bench_codecs(iterations: int) -> Dict[str, Any]:
+    """Compare request decoding and response encoding cost."""
+    payload = _sample_payload()
+    profile = dict(payload, nickname="benchmark-hero", updatedAt="2025-11-14T10:00:00.123456", version=42)
+    json_body = json.dumps(payload).encode("utf-8")
+    binary_body = encode_sync(payload["coins"], payload["upgrades"], payload["stats"])
+    return {
+        "requestBytes": {"json": len(json_body), "binary": len(binary_body)},
+        "responseBytes": {
+            "json": len(json.dumps(profile, separators=(",", ":")).encode("utf-8")),
+            "binary": len(encode_profile(profile)),
+        },
+        "decodeUs": {
+            "json": _time_per_op(lambda: json.loads(json_body), iterations),
+            "binary": _time_per_op(lambda: decode_sync(binary_body), iterations),
+        },
+        "encodeUs": {
+            "json": _time_per_op(lambda: json.dumps(profile, separators=(",", ":")), iterations),
+            "binary": _time_per_op(lambda: encode_profile(profile), iterations),
+        },
+    }
+
+
+def bench_endpoint(requests: int) -> Dict[str, Any]:
+    """Compare end-to-end ``POST /api/sync`` latency for both formats."""
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{Path(workdir) / 'bench.db'}",
+            "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+            "PASSWORD_HASH_WORKERS": 0,
+            "ADMISSION_ENABLED": False,
+        })
+        client = app.test_client()
+        token = client.post(
+            "/api/register", json={"nickname": "benchmark-hero", "password": "secret123"}
+        ).get_json()["token"]
+        payload = _sample_payload()
+        binary_body = encode_sync(payload["coins"], payload["upgrades"], payload["stats"])
+
+        def send_json():
+            client.post("/api/sync", json=payload, headers={"Authorization": f"Bearer {token}"})
+
+        def send_binary():
+            client.post(
+                "/api/sync",
+                data=binary_body,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": BINARY_MIMETYPE,
+                    "Accept": BINARY_MIMETYPE,
+                },
+            )
+
+        send_json()
+        send_binary()
+        result = {
+            "syncMs": {
+                "json": _time_per_op(send_json, requests) / 1000,
+                "binary": _time_per_op(send_binary, requests) / 1000,
+            },
+        }
+        with app.app_context():
+            from server.database import db
+
+            db.engine.dispose()
+        return result
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000, help="codec iterations")
+    parser.add_argument("--requests", type=int, default=300, help="/sync requests per format")
+    args = parser.parse_args()
+
+    result = {"codec": bench_codecs(args.iterations), "endpoint": bench_endpoint(args.requests)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Small in-process caching primitives.
+
+:class:`TTLCache` is a bounded LRU mapping whose entries carry their own
+expiry time. It is used for hot-path lookups that must not hit the database
+on every request (for example verified tokens, see :mod:`server.auth`).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache with per-entry expiry.
+
+    Args:
+        max_size: Maximum number of entries. The least recently used entry is
+            evicted when the cache is full.
+
+    Examples:
+        >>> cache = TTLCache(max_size=2)
+        >>> cache.set("a", 1, expires_at=time.time() + 60)
+        >>> cache.get("a")
+        1
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, int(max_size))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a live value and mark it as recently used.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            Optional[Any]: Cached value, or ``None`` when missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        """Store a value until ``expires_at``.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            expires_at: Absolute expiry as a Unix timestamp.
+        """
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """Remove an entry if present.
+
+        Args:
+            key: Cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return usage counters.
+
+        Returns:
+            Dict[str, Any]: ``size``, ``maxSize``, ``hits``, ``misses``,
+            ``evictions`` and ``hitRate`` (``0.0`` before the first lookup).
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
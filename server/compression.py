@@ -0,0 +1,104 @@
+"""``Accept-Encoding`` negotiated compression of JSON responses.
+
+Mobile clients poll ``/api/leaderboard`` and ``/api/profile``; JSON bodies
+above ``RESPONSE_COMPRESSION_MIN_SIZE`` bytes are sent ``gzip`` (preferred)
+or ``deflate`` encoded when the client accepts it. Smaller bodies are sent
+as is, since the encoding overhead would outweigh the savings.
+
+Notes:
+    A strong ``ETag`` is weakened (``W/"..."``) on compressed responses, as
+    the encoded bytes differ from the identity representation; conditional
+    requests compare ETags weakly (see ``If-None-Match`` handling in
+    :mod:`server.routes`). Shared bodies are cached by ``(etag, encoding)``
+    so a page served to every client is compressed once; the ETag of a
+    shared body must therefore identify the exact representation (e.g.
+    include the page size).
+"""
+
+import gzip
+import time
+import zlib
+from typing import Optional
+
+from flask import Flask, Response, current_app, request
+
+from .cache import TTLCache
+
+ENCODINGS = ("gzip", "deflate")
+COMPRESSED_CACHE_TTL = 300
+
+
+def _encode(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic for identical bodies.
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zlib.compress(data, level)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Pick the content coding for the current request.
+
+    Returns:
+        Optional[str]: ``"gzip"``, ``"deflate"`` or ``None`` when the client
+        accepts neither.
+    """
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress_response(response: Response, shared: bool = False) -> Response:
+    """Compress a buffered JSON response when worthwhile and accepted.
+
+    Args:
+        response: Response with a fully buffered body.
+        shared: Whether the body is served to many clients under the same
+            ETag (e.g. the first leaderboard page); its encoded form is then
+            cached.
+
+    Returns:
+        flask.Response: The same response, possibly with an encoded body,
+        ``Content-Encoding`` and a weakened ``ETag``. ``Vary:
+        Accept-Encoding`` is always added.
+
+    Notes:
+        Must run inside a request context. Non-JSON, non-200 and already
+        encoded responses are left untouched.
+    """
+    min_size = current_app.config["RESPONSE_COMPRESSION_MIN_SIZE"]
+    if min_size < 0 or response.status_code != 200 or response.mimetype != "application/json":
+        return response
+    response.vary.add("Accept-Encoding")
+    if "Content-Encoding" in response.headers:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    cache: TTLCache = current_app.extensions["compressed_bodies"]
+    key = (etag, encoding) if etag and shared else None
+    encoded = cache.get(key) if key else None
+    if encoded is None:
+        encoded = _encode(data, encoding, current_app.config["RESPONSE_COMPRESSION_LEVEL"])
+        if key:
+            cache.set(key, encoded, expires_at=time.time() + COMPRESSED_CACHE_TTL)
+    response.set_data(encoded)
+    response.headers["Content-Encoding"] = encoding
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Create the compressed-body cache of an app.
+
+    Args:
+        app: Flask application instance.
+
+    Side Effects:
+        Stores a :class:`server.cache.TTLCache` in
+        ``app.extensions["compressed_bodies"]``.
+    """
+    app.extensions["compressed_bodies"] = TTLCache(256)
@@ -15,6 +15,196 @@ Environment Variables:
     TOKEN_MAX_AGE:
         Token validity in seconds.
         Default: 7 days.
+
+    TOKEN_CACHE_SIZE:
+        Maximum number of verified tokens kept in memory.
+        Default: ``10000``.
+
+    SYNC_BATCH_MAX_SNAPSHOTS:
+        Maximum number of snapshots accepted by ``POST /api/sync/batch``.
+        Default: ``50``.
+
+    PROFILE_MAX_KEYS:
+        Maximum number of keys in the ``upgrades`` and in the ``stats`` object
+        of one sync request; each key becomes a database row.
+        Default: ``256``.
+
+    PASSWORD_HASH_METHOD:
+        Werkzeug hashing method (and cost) for new password hashes. Stored
+        hashes using another method are upgraded on login.
+        Default: ``"scrypt:32768:8:1"``.
+
+    PASSWORD_HASH_WORKERS:
+        Size of the password hashing process pool (``0`` hashes inline).
+        Default: ``2``.
+
+    PASSWORD_HASH_MAX_PENDING:
+        Maximum queued plus running hashes before auth calls get ``503``.
+        Default: ``32``.
+
+    PASSWORD_HASH_TIMEOUT:
+        Seconds a request waits for its hash.
+        Default: ``10``.
+
+    DATABASE_READ_URL:
+        Optional SQLAlchemy URL of a read replica used by read-only
+        endpoints (``/profile``, token lookups). Default: unset (reads use
+        the primary database).
+
+    DB_SQLITE_JOURNAL_MODE / DB_SQLITE_SYNCHRONOUS:
+        SQLite ``journal_mode`` and ``synchronous`` pragmas.
+        Default: ``"WAL"`` / ``"NORMAL"``.
+
+    DB_SQLITE_BUSY_TIMEOUT_MS:
+        SQLite ``busy_timeout`` in milliseconds. Default: ``5000``.
+
+    DB_SQLITE_MMAP_SIZE:
+        SQLite ``mmap_size`` in bytes (``0`` disables memory mapping).
+        Default: ``0``.
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_RECYCLE:
+        Connection pool settings for non-SQLite databases.
+        Default: ``10`` / ``20`` / ``1800`` seconds.
+
+    RANK_INDEX_REFRESH_INTERVAL:
+        Seconds between two merges of profile writes made by other worker
+        processes into the in-memory rank index (see
+        :class:`server.leaderboard.RankIndexRefresher`); ``0`` disables it
+        for single-process deployments. Default: ``1``.
+
+    LEADERBOARD_PAGE_SOURCE:
+        Where ``/api/leaderboard`` cursor and ``around=me`` pages are read
+        from: ``"index"`` (in-memory rank index of this process) or
+        ``"database"`` (keyset query, consistent across workers).
+        Default: ``"index"``.
+
+    LEADERBOARD_SNAPSHOT_PATH:
+        File holding the materialized leaderboard top shared by all worker
+        processes (memory-mapped). Default: unset (each worker serves the
+        top from its own rank index).
+
+    LEADERBOARD_SNAPSHOT_INTERVAL / LEADERBOARD_SNAPSHOT_TOP_N:
+        Refresh period in seconds and number of materialized entries.
+        Default: ``2`` / ``100``.
+
+    LEADERBOARD_SNAPSHOT_MAX_AGE:
+        Seconds after which the snapshot is stale and the first page is
+        queried from the database instead. Default: ``30``.
+
+    ADMISSION_ENABLED:
+        Rate limit and concurrency-bound ``/register``, ``/login`` and
+        ``/sync*`` (see :mod:`server.admission`); ``0`` disables it.
+        Default: ``1``.
+
+    ADMISSION_SYNC_RATE / ADMISSION_SYNC_BURST:
+        Server-wide (per process) ``/sync*`` requests per second and burst
+        before ``503``. Default: ``200`` / ``400``.
+
+    ADMISSION_SYNC_CLIENT_RATE / ADMISSION_SYNC_CLIENT_BURST:
+        Per-user ``/sync*`` requests per second and burst before ``429``.
+        Default: ``2`` / ``10``.
+
+    ADMISSION_AUTH_RATE / ADMISSION_AUTH_BURST:
+        Server-wide (per process) ``/register`` + ``/login`` requests per
+        second and burst before ``503``. Default: ``50`` / ``100``.
+
+    ADMISSION_AUTH_CLIENT_RATE / ADMISSION_AUTH_CLIENT_BURST:
+        Auth requests per second and burst of one address and nickname
+        before ``429``. Keying on the nickname keeps players sharing a NAT
+        address from throttling each other; an address spraying many
+        nicknames is then only bounded by ``ADMISSION_AUTH_RATE``.
+        Default: ``2`` / ``20``.
+
+    ADMISSION_MAX_CONCURRENT:
+        Admission-controlled handlers running at once per process before
+        ``503``. Default: ``16``.
+
+    ADMISSION_MAX_CLIENTS:
+        Per-client buckets kept in memory per policy. Default: ``100000``.
+
+    RESPONSE_COMPRESSION_MIN_SIZE:
+        JSON bodies of ``/profile`` and ``/leaderboard`` of at least this
+        many bytes are gzip/deflate encoded when the client accepts it
+        (``-1`` disables compression). Default: ``1024``.
+
+    RESPONSE_COMPRESSION_LEVEL:
+        zlib compression level (1-9). Default: ``6``.
+
+    REPLAY_VALIDATION:
+        Server-side replay of match-3 move logs (see :mod:`server.replay`):
+        ``"off"`` ignores replays, ``"optional"`` caps the coin gain of
+        syncs that carry one, ``"required"`` also caps syncs without a
+        replay at no gain. Default: ``"optional"``. The current client
+        sends no replays, so validation is not active yet: ``"optional"``
+        leaves coin gains uncapped and ``"required"`` blocks all of them.
+
+    REPLAY_MAX_MOVES:
+        Maximum moves per replay. Default: ``1000``.
+
+    REPLAY_SCORE_PER_COIN:
+        Replay score (``BASE_TILE_SCORE`` per cleared tile times the chain)
+        worth one coin. Default: ``10``.
+
+    SCORE_ROLLUP_INTERVAL:
+        Seconds between two runs of the score rollup thread of each process
+        (see :mod:`server.score_events`); ``0`` leaves rollups to
+        ``python -m server.rollups`` run by a scheduler. Default: ``60``.
+
+    SCORE_ROLLUP_BATCH_SIZE / SCORE_ROLLUP_SETTLE:
+        Score events folded per transaction, and minimum event age in
+        seconds before it is folded. Default: ``5000`` / ``5``.
+
+    SCORE_EVENT_RETENTION_DAYS / SCORE_HOURLY_RETENTION_DAYS:
+        Age after which rolled-up raw score events, and hourly per-player
+        buckets, are deleted. Default: ``7`` / ``30``.
+
+    WRITE_BEHIND_ENABLED:
+        Queue ``/sync`` snapshots in memory and write them in batches (see
+        :mod:`server.write_behind`); ``1`` enables it. Default: ``0``.
+
+    WRITE_BEHIND_INTERVAL_MS / WRITE_BEHIND_MAX_ENTRIES:
+        Flush period in milliseconds, and pending players that trigger an
+        early flush (also the rows per transaction). Default: ``250`` /
+        ``500``.
+
+    IDEMPOTENCY_TTL / IDEMPOTENCY_MAX_ENTRIES:
+        Seconds a response to a request with an ``Idempotency-Key`` is
+        replayed to retries (``0`` disables the header), and keys kept per
+        process (see :mod:`server.idempotency`). Default: ``600`` /
+        ``10000``.
+
+    LEADERBOARD_SEASON_START / LEADERBOARD_SEASON_DAYS:
+        Start date (ISO, UTC) of the first season and length of each season
+        in days, for ``GET /api/leaderboard?window=season`` (see
+        :mod:`server.leaderboard_windows`). Default: ``2024-01-01`` / ``28``.
+
+    LEADERBOARD_ARCHIVE_TOP_N:
+        Standings archived per ended leaderboard window before its counters
+        are deleted. Default: ``100``.
+
+    LEADERBOARD_WINDOW_VERIFIED_ONLY:
+        When true, the windowed leaderboards only count coin gains validated
+        by a replay (see ``REPLAY_VALIDATION``); syncs without a replay,
+        including write-behind flushes, add nothing. Otherwise every balance
+        increase counts, so lowering and restoring the balance also does.
+        Default: ``0``.
+
+    ADMIN_NICKNAMES:
+        Comma-separated nicknames allowed to call the ``/api/admin/*``
+        routes (e.g. the analytics export). Default: unset (no admins).
+
+    EXPORT_BATCH_SIZE:
+        Rows fetched and rendered per chunk by the streaming export (see
+        :mod:`server.export`). Default: ``1000``.
+
+    METRICS_MULTIPROC_DIR:
+        Directory where each worker process writes its metrics snapshot so
+        ``GET /api/metrics`` can aggregate all workers. Default: unset
+        (per-process metrics).
+
+    METRICS_FLUSH_INTERVAL:
+        Minimum seconds between two snapshot writes of a worker.
+        Default: ``5``.
 """
 
 import os
@@ -30,6 +220,32 @@ class Config:
         SQLALCHEMY_DATABASE_URI: Database URL for SQLAlchemy.
         SQLALCHEMY_TRACK_MODIFICATIONS: Disabled to reduce overhead.
         TOKEN_MAX_AGE: Token max age (seconds).
+        TOKEN_CACHE_SIZE: Capacity of the verified-token cache.
+        SYNC_BATCH_MAX_SNAPSHOTS: Upper bound on snapshots per batch sync.
+        PROFILE_MAX_KEYS: Upper bound on upgrade/stat keys per sync.
+        PASSWORD_HASH_METHOD: Werkzeug method string for new hashes.
+        PASSWORD_HASH_WORKERS: Password hashing process pool size.
+        PASSWORD_HASH_MAX_PENDING: Queue-depth limit of the hashing pool.
+        PASSWORD_HASH_TIMEOUT: Wait limit for a single hash (seconds).
+        DATABASE_READ_URL: Optional read-replica URL.
+        DB_SQLITE_*: SQLite pragmas applied to every new connection.
+        DB_POOL_*, DB_MAX_OVERFLOW: Pool sizing for server databases.
+        RANK_INDEX_REFRESH_INTERVAL: Cross-worker rank index merge period.
+        LEADERBOARD_PAGE_SOURCE: Backend of deep leaderboard pages.
+        LEADERBOARD_SNAPSHOT_*: Shared leaderboard snapshot settings.
+        LEADERBOARD_SEASON_*: Season window of the windowed leaderboards.
+        LEADERBOARD_ARCHIVE_TOP_N: Standings kept per ended window.
+        LEADERBOARD_WINDOW_VERIFIED_ONLY: Count only replay-validated gains.
+        ADMISSION_*: Rate limits and concurrency bound of write-heavy routes.
+        RESPONSE_COMPRESSION_*: Threshold and level of response compression.
+        REPLAY_*: Server-side replay validation of coin gains.
+        SCORE_*: Score event rollup and retention settings.
+        WRITE_BEHIND_*: Write-behind queue of ``/sync`` snapshots.
+        IDEMPOTENCY_*: Replay store of ``Idempotency-Key`` requests.
+        ADMIN_NICKNAMES: Nicknames with access to the admin routes.
+        EXPORT_BATCH_SIZE: Row batch size of the streaming export.
+        METRICS_MULTIPROC_DIR: Shared directory for multi-worker metrics.
+        METRICS_FLUSH_INTERVAL: Snapshot write interval (seconds).
         JSON_SORT_KEYS: Disabled to preserve response key order.
     """
     BASE_DIR = Path(__file__).resolve().parent
@@ -40,4 +256,61 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     TOKEN_MAX_AGE = int(os.environ.get("TOKEN_MAX_AGE", 60 * 60 * 24 * 7))  # 7 days
+    TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+    SYNC_BATCH_MAX_SNAPSHOTS = int(os.environ.get("SYNC_BATCH_MAX_SNAPSHOTS", 50))
+    PROFILE_MAX_KEYS = int(os.environ.get("PROFILE_MAX_KEYS", 256))
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+    DATABASE_READ_URL = os.environ.get("DATABASE_READ_URL")
+    DB_SQLITE_JOURNAL_MODE = os.environ.get("DB_SQLITE_JOURNAL_MODE", "WAL")
+    DB_SQLITE_SYNCHRONOUS = os.environ.get("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+    DB_SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("DB_SQLITE_BUSY_TIMEOUT_MS", 5000))
+    DB_SQLITE_MMAP_SIZE = int(os.environ.get("DB_SQLITE_MMAP_SIZE", 0))
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    RANK_INDEX_REFRESH_INTERVAL = float(os.environ.get("RANK_INDEX_REFRESH_INTERVAL", 1))
+    LEADERBOARD_PAGE_SOURCE = os.environ.get("LEADERBOARD_PAGE_SOURCE", "index")
+    LEADERBOARD_SNAPSHOT_PATH = os.environ.get("LEADERBOARD_SNAPSHOT_PATH")
+    LEADERBOARD_SNAPSHOT_INTERVAL = float(os.environ.get("LEADERBOARD_SNAPSHOT_INTERVAL", 2))
+    LEADERBOARD_SNAPSHOT_TOP_N = int(os.environ.get("LEADERBOARD_SNAPSHOT_TOP_N", 100))
+    LEADERBOARD_SNAPSHOT_MAX_AGE = float(os.environ.get("LEADERBOARD_SNAPSHOT_MAX_AGE", 30))
+    ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1").lower() not in ("0", "false", "no")
+    ADMISSION_SYNC_RATE = float(os.environ.get("ADMISSION_SYNC_RATE", 200))
+    ADMISSION_SYNC_BURST = float(os.environ.get("ADMISSION_SYNC_BURST", 400))
+    ADMISSION_SYNC_CLIENT_RATE = float(os.environ.get("ADMISSION_SYNC_CLIENT_RATE", 2))
+    ADMISSION_SYNC_CLIENT_BURST = float(os.environ.get("ADMISSION_SYNC_CLIENT_BURST", 10))
+    ADMISSION_AUTH_RATE = float(os.environ.get("ADMISSION_AUTH_RATE", 50))
+    ADMISSION_AUTH_BURST = float(os.environ.get("ADMISSION_AUTH_BURST", 100))
+    ADMISSION_AUTH_CLIENT_RATE = float(os.environ.get("ADMISSION_AUTH_CLIENT_RATE", 2))
+    ADMISSION_AUTH_CLIENT_BURST = float(os.environ.get("ADMISSION_AUTH_CLIENT_BURST", 20))
+    ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", 16))
+    ADMISSION_MAX_CLIENTS = int(os.environ.get("ADMISSION_MAX_CLIENTS", 100000))
+    RESPONSE_COMPRESSION_MIN_SIZE = int(os.environ.get("RESPONSE_COMPRESSION_MIN_SIZE", 1024))
+    RESPONSE_COMPRESSION_LEVEL = int(os.environ.get("RESPONSE_COMPRESSION_LEVEL", 6))
+    REPLAY_VALIDATION = os.environ.get("REPLAY_VALIDATION", "optional")
+    REPLAY_MAX_MOVES = int(os.environ.get("REPLAY_MAX_MOVES", 1000))
+    REPLAY_SCORE_PER_COIN = int(os.environ.get("REPLAY_SCORE_PER_COIN", 10))
+    SCORE_ROLLUP_INTERVAL = float(os.environ.get("SCORE_ROLLUP_INTERVAL", 60))
+    SCORE_ROLLUP_BATCH_SIZE = int(os.environ.get("SCORE_ROLLUP_BATCH_SIZE", 5000))
+    SCORE_ROLLUP_SETTLE = float(os.environ.get("SCORE_ROLLUP_SETTLE", 5))
+    SCORE_EVENT_RETENTION_DAYS = float(os.environ.get("SCORE_EVENT_RETENTION_DAYS", 7))
+    SCORE_HOURLY_RETENTION_DAYS = float(os.environ.get("SCORE_HOURLY_RETENTION_DAYS", 30))
+    WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND_ENABLED", "0").lower() in ("1", "true", "yes")
+    WRITE_BEHIND_INTERVAL_MS = float(os.environ.get("WRITE_BEHIND_INTERVAL_MS", 250))
+    WRITE_BEHIND_MAX_ENTRIES = int(os.environ.get("WRITE_BEHIND_MAX_ENTRIES", 500))
+    IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 600))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000))
+    LEADERBOARD_SEASON_START = os.environ.get("LEADERBOARD_SEASON_START", "2024-01-01")
+    LEADERBOARD_SEASON_DAYS = int(os.environ.get("LEADERBOARD_SEASON_DAYS", 28))
+    LEADERBOARD_ARCHIVE_TOP_N = int(os.environ.get("LEADERBOARD_ARCHIVE_TOP_N", 100))
+    LEADERBOARD_WINDOW_VERIFIED_ONLY = os.environ.get("LEADERBOARD_WINDOW_VERIFIED_ONLY", "0").lower() in ("1", "true", "yes")
+    ADMIN_NICKNAMES = frozenset(
+        name.strip() for name in os.environ.get("ADMIN_NICKNAMES", "").split(",") if name.strip()
+    )
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+    METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR")
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
     JSON_SORT_KEYS = False
@@ -3,15 +3,126 @@
 This module exposes a shared SQLAlchemy instance (:data:`db`) and an
 initialization helper (:func:`init_db`).
 
+Engine profile:
+    - SQLite connections get ``journal_mode``, ``synchronous``,
+      ``busy_timeout`` and ``mmap_size`` pragmas from the config, so
+      concurrent ``/sync`` writes no longer lock out readers.
+    - Other databases get a sized, recycled and pre-pinged connection pool.
+    - When ``DATABASE_READ_URL`` is set, read-only endpoints use a separate
+      ``"read"`` engine through :func:`get_read_session`.
+
 Side Effects:
-    :func:`init_db` creates all tables defined by the ORM models.
+    :func:`init_db` creates all tables defined by the ORM models, adds
+    columns and indexes that were declared after a table was first created
+    and migrates legacy profile snapshots.
 """
 
+from flask import g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
 
 
 db = SQLAlchemy()
 
+READ_BIND = "read"
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _pool_options(config) -> dict:
+    """Return engine options for server (non-SQLite) databases.
+
+    Args:
+        config: Flask config mapping.
+
+    Returns:
+        dict: Keyword arguments for :func:`sqlalchemy.create_engine`.
+    """
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+
+
+def _configure_engine_profile(app) -> None:
+    """Fill SQLAlchemy engine options and binds from the config.
+
+    Explicit ``SQLALCHEMY_ENGINE_OPTIONS``/``SQLALCHEMY_BINDS`` entries set
+    by the deployment are left untouched.
+
+    Args:
+        app: Flask application instance.
+    """
+    config = app.config
+    if not _is_sqlite(config["SQLALCHEMY_DATABASE_URI"]):
+        options = _pool_options(config)
+        options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    read_url = config.get("DATABASE_READ_URL")
+    if read_url:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        if READ_BIND not in binds:
+            binds[READ_BIND] = read_url if _is_sqlite(read_url) else dict(_pool_options(config), url=read_url)
+        config["SQLALCHEMY_BINDS"] = binds
+
+
+def _install_sqlite_pragmas(engine: Engine, config) -> None:
+    """Apply the SQLite pragmas of the engine profile to every new connection.
+
+    Args:
+        engine: SQLite engine.
+        config: Flask config mapping.
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['DB_SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA journal_mode = {config['DB_SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous = {config['DB_SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {int(config['DB_SQLITE_MMAP_SIZE'])}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def get_read_session() -> Session:
+    """Return the session used by read-only endpoints.
+
+    Returns:
+        Session: A request-scoped session bound to the ``"read"`` engine when
+        ``DATABASE_READ_URL`` is configured, otherwise :data:`db.session`.
+
+    Notes:
+        A replica may lag behind the primary, so read-your-writes is not
+        guaranteed for endpoints using this session.
+    """
+    engine = db.engines.get(READ_BIND)
+    if engine is None:
+        return db.session
+    session = g.get("_read_session")
+    if session is None:
+        session = Session(bind=engine, expire_on_commit=False)
+        g._read_session = session
+    return session
+
+
+def _close_read_session(_exc=None) -> None:
+    session = g.pop("_read_session", None)
+    if session is not None:
+        session.close()
+
 
 def init_db(app):
     """Initialize SQLAlchemy and create tables.
@@ -20,9 +131,84 @@ def init_db(app):
         app: Flask application instance.
 
     Side Effects:
+        - Applies the engine profile (pool sizing, SQLite pragmas, read bind).
         - Binds SQLAlchemy to the Flask app.
-        - Creates all ORM tables (``db.create_all()``) inside the app context.
+        - Creates all ORM tables (``db.create_all()``) on the primary database
+          inside the app context; the read bind is never written to.
+        - Adds missing columns to existing tables (see :func:`_add_missing_columns`).
+        - Creates indexes declared after a table was created (see
+          :func:`_add_missing_indexes`).
+        - Moves legacy JSON snapshots into typed rows (see
+          :func:`server.models.migrate_snapshot_columns`).
+        - Fills the search column of older users (see
+          :func:`server.models.migrate_nickname_lower`).
     """
+    from .models import migrate_nickname_lower, migrate_snapshot_columns
+
+    _configure_engine_profile(app)
     db.init_app(app)
+    app.teardown_appcontext(_close_read_session)
     with app.app_context():
-        db.create_all()
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                _install_sqlite_pragmas(engine, app.config)
+        # The metadata of a "read" bind registered by another app lives on
+        # the shared ``db`` object, so name the primary bind explicitly.
+        db.create_all(bind_key=None)
+        _add_missing_columns()
+        _add_missing_indexes()
+        migrate_snapshot_columns()
+        migrate_nickname_lower()
+
+
+def _add_missing_columns():
+    """Add model columns that are absent from already existing tables.
+
+    ``db.create_all()`` never alters existing tables, so columns introduced
+    after the first deployment are added here with ``ALTER TABLE ... ADD
+    COLUMN``. Only additive changes are handled; a new ``NOT NULL`` column
+    must declare a ``server_default``.
+
+    Side Effects:
+        Issues DDL statements on the bound engine.
+    """
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=db.engine.dialect)}"
+                )
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                connection.execute(text(ddl))
+
+
+def _add_missing_indexes():
+    """Create model indexes that are absent from already existing tables.
+
+    Like columns, indexes declared after a table was created are skipped by
+    ``db.create_all()``.
+
+    Side Effects:
+        Issues ``CREATE INDEX`` statements on the bound engine.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
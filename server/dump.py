@@ -0,0 +1,63 @@
+"""Command line export of profiles and the leaderboard.
+
+Writes the same NDJSON/CSV stream as ``GET /api/admin/export`` (see
+:mod:`server.export`) to a file or stdout, reading straight from the
+database, so no admin account is needed.
+
+Examples:
+    >>> # python -m server.dump profiles --format csv --output profiles.csv
+    >>> # python -m server.dump profiles --since 2024-05-01T00:00:00 > changed.ndjson
+    >>> # python -m server.dump leaderboard
+"""
+
+import argparse
+import sys
+
+from .app import create_app
+from .database import get_read_session
+from .export import DATASETS, FORMATS, export, parse_since
+
+
+def main(argv=None):
+    """Command line entry point.
+
+    Args:
+        argv: Arguments (defaults to ``sys.argv[1:]``).
+    """
+    parser = argparse.ArgumentParser(description="Export profiles or the leaderboard as NDJSON/CSV.")
+    parser.add_argument("dataset", choices=DATASETS)
+    parser.add_argument("--format", choices=tuple(FORMATS), default="ndjson", help="output format")
+    parser.add_argument("--since", help="only profiles updated at or after this ISO 8601 time")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--batch-size", type=int, help="rows per batch (default: EXPORT_BATCH_SIZE)")
+    parser.add_argument("--database-url", help="override DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    try:
+        since = parse_since(args.since)
+    except ValueError:
+        parser.error(f"invalid --since: {args.since}")
+    overrides = {"SQLALCHEMY_DATABASE_URI": args.database_url} if args.database_url else None
+    app = create_app(overrides)
+    with app.app_context():
+        try:
+            chunks = export(
+                get_read_session(),
+                args.dataset,
+                args.format,
+                since=since,
+                batch_size=args.batch_size or app.config["EXPORT_BATCH_SIZE"],
+            )
+        except ValueError as exc:
+            parser.error(str(exc))
+        output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Streaming NDJSON/CSV export of profiles and the leaderboard.
+
+Analytics needs every profile, which neither fits a JSON response nor
+memory. :func:`export` therefore returns a generator of text chunks:
+
+- rows are fetched with ``yield_per`` (a server-side cursor on PostgreSQL,
+  incremental ``fetchmany`` on SQLite), so at most ``EXPORT_BATCH_SIZE``
+  rows are held at a time, whatever the table size;
+- each batch is rendered into one chunk, with the pre-rendered
+  ``upgrades_snapshot``/``stats_snapshot`` fragments spliced in verbatim.
+
+Datasets:
+    ``"profiles"``: one row per user with ``userId``, ``nickname``,
+    ``createdAt``, ``coins``, ``upgrades``, ``stats``, ``updatedAt`` and
+    ``version``, ordered by ``(updatedAt, userId)``. With ``since`` only
+    profiles updated at or after it are exported, so a consumer can resume
+    from the largest ``updatedAt`` it has seen (rows at exactly that instant
+    are repeated; deduplicate by ``userId``).
+
+    ``"leaderboard"``: ``rank``, ``userId``, ``nickname``, ``coins`` and
+    ``updatedAt`` in leaderboard order.
+
+Formats:
+    ``"ndjson"``: one JSON object per line. ``"csv"``: header row, then one
+    row per record; ``upgrades``/``stats`` cells hold JSON objects.
+
+Used by ``GET /api/admin/export`` (see :mod:`server.routes`) and
+``python -m server.dump``.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Iterator, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from .database import db
+from .models import Profile, User
+
+DATASETS = ("profiles", "leaderboard")
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+FIELDS = {
+    "profiles": ("userId", "nickname", "createdAt", "coins", "upgrades", "stats", "updatedAt", "version"),
+    "leaderboard": ("rank", "userId", "nickname", "coins", "updatedAt"),
+}
+
+
+def parse_since(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 ``since`` value into a naive UTC datetime.
+
+    Args:
+        value: Raw value, e.g. ``"2024-05-01T12:00:00"`` or with an offset.
+
+    Returns:
+        Optional[datetime]: ``None`` when ``value`` is empty.
+
+    Raises:
+        ValueError: If ``value`` is not an ISO 8601 timestamp.
+    """
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _query(dataset: str, since: Optional[datetime]):
+    if dataset == "leaderboard":
+        return (
+            db.select(Profile.user_id, User.nickname, Profile.coins, Profile.updated_at)
+            .join(User, User.id == Profile.user_id)
+            .order_by(Profile.coins.desc(), Profile.updated_at.desc(), Profile.user_id.desc())
+        )
+    query = (
+        db.select(
+            Profile.user_id,
+            User.nickname,
+            User.created_at,
+            Profile.coins,
+            Profile.upgrades_snapshot,
+            Profile.stats_snapshot,
+            Profile.updated_at,
+            Profile.version,
+        )
+        .join(User, User.id == Profile.user_id)
+        .order_by(Profile.updated_at, Profile.user_id)
+    )
+    if since is not None:
+        query = query.where(Profile.updated_at >= since)
+    return query
+
+
+def _iso(moment: Optional[datetime]) -> Optional[str]:
+    return moment.isoformat() if moment else None
+
+
+def _records(dataset: str, rows) -> Iterator[Sequence[Any]]:
+    """Turn result rows into field tuples in :data:`FIELDS` order."""
+    if dataset == "leaderboard":
+        for rank, (user_id, nickname, coins, updated_at) in enumerate(rows, start=1):
+            yield rank, user_id, nickname, coins or 0, _iso(updated_at)
+        return
+    for user_id, nickname, created_at, coins, upgrades, stats, updated_at, version in rows:
+        yield user_id, nickname, _iso(created_at), coins or 0, upgrades or "{}", stats or "{}", _iso(updated_at), version
+
+
+def _ndjson_line(dataset: str, record: Sequence[Any]) -> str:
+    # upgrades/stats are already compact JSON objects and are spliced in.
+    raw = {"upgrades", "stats"} if dataset == "profiles" else set()
+    return "{" + ",".join(
+        f'"{name}":{value if name in raw else json.dumps(value)}'
+        for name, value in zip(FIELDS[dataset], record)
+    ) + "}\n"
+
+
+def export(
+    session: Session,
+    dataset: str,
+    fmt: str,
+    since: Optional[datetime] = None,
+    batch_size: int = 1000,
+) -> Iterator[str]:
+    """Stream a dataset as NDJSON or CSV text chunks.
+
+    Args:
+        session: Session to read with (e.g. the read-replica session).
+        dataset: Name from :data:`DATASETS`.
+        fmt: Key of :data:`FORMATS`.
+        since: Only export profiles updated at or after this UTC time
+            (``"profiles"`` only).
+        batch_size: Rows fetched from the cursor and rendered per chunk.
+
+    Returns:
+        Iterator[str]: Lazily produced chunks; the query runs on the first
+        ``next()``.
+
+    Raises:
+        ValueError: Unknown dataset or format, or ``since`` given for the
+            leaderboard (ranks are only meaningful over the whole table).
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    if since is not None and dataset != "profiles":
+        raise ValueError("since is only supported for profiles")
+    return _stream(session, dataset, fmt, since, batch_size)
+
+
+def _stream(session: Session, dataset: str, fmt: str, since: Optional[datetime], batch_size: int) -> Iterator[str]:
+    rows = session.execute(_query(dataset, since).execution_options(yield_per=batch_size))
+    records = _records(dataset, rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(FIELDS[dataset])
+        yield buffer.getvalue()
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            if fmt == "ndjson":
+                yield "".join(_ndjson_line(dataset, record) for record in batch)
+                continue
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+    finally:
+        rows.close()
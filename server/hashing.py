@@ -0,0 +1,243 @@
+"""Off-thread password hashing.
+
+Password hashing (scrypt/PBKDF2 via Werkzeug) is deliberately expensive. Run
+inline, a burst of ``/login`` or ``/register`` calls keeps every request
+worker busy on CPU and cheap endpoints such as ``/sync`` queue behind them.
+
+:class:`PasswordHasher` moves the work to a bounded process pool:
+
+- at most ``PASSWORD_HASH_WORKERS`` hashes run at once, in separate
+  processes, so they do not hold the GIL of the request worker;
+- at most ``PASSWORD_HASH_MAX_PENDING`` hashes may be queued or running;
+  further calls fail fast with :class:`PasswordHashingBusy`;
+- the hash cost is configured with ``PASSWORD_HASH_METHOD`` (any Werkzeug
+  method string, e.g. ``"scrypt:32768:8:1"`` or ``"pbkdf2:sha256:600000"``).
+
+Hashes created with another method are upgraded after a successful login
+(see :meth:`PasswordHasher.rehash_in_background`). The new hash is stored by
+a dedicated writer thread, so a slow database never holds up the pool's
+result delivery.
+
+Notes:
+    ``PASSWORD_HASH_WORKERS = 0`` hashes inline in the calling thread while
+    still enforcing the pending limit; useful for tests and one-off scripts.
+    In that mode a rehash, including its database write, also runs
+    synchronously in the calling request.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional, Tuple
+
+from flask import Flask, current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+_init_lock = threading.Lock()
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full or a hash did not finish in time."""
+
+
+class PasswordHasher:
+    """Bounded executor for password hashing.
+
+    Args:
+        method: Werkzeug hashing method used for new hashes.
+        workers: Size of the process pool (``0`` hashes inline).
+        max_pending: Maximum number of queued plus running hashes.
+        timeout: Seconds a caller waits for a result.
+    """
+
+    def __init__(self, method: str, workers: int, max_pending: int, timeout: float):
+        self.method = method
+        self.timeout = timeout
+        self.max_pending = max(1, int(max_pending))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+        # Werkzeug fills in default parameters (e.g. iterations), so derive the
+        # canonical prefix of current hashes once instead of parsing ``method``.
+        self.prefix = generate_password_hash("", method).split("$", 1)[0]
+        self.rejected = 0
+        self._rehashed: "queue.SimpleQueue[Tuple[Callable[[str], None], str]]" = queue.SimpleQueue()
+        self._writer_pid: Optional[int] = None
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHashingBusy("password hashing queue is full")
+            self._pending += 1
+        if self._executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+        else:
+            future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _wait(self, future: Future) -> Any:
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHashingBusy("password hashing timed out")
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured method.
+
+        Args:
+            password: Plain-text password.
+
+        Returns:
+            str: Hash suitable for storage.
+
+        Raises:
+            PasswordHashingBusy: If the queue is full or hashing timed out.
+        """
+        return self._wait(self._submit(generate_password_hash, password, self.method))
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """Check a password against a stored hash.
+
+        Args:
+            password_hash: Stored hash.
+            password: Plain-text password to verify.
+
+        Returns:
+            bool: ``True`` if the password matches.
+
+        Raises:
+            PasswordHashingBusy: If the queue is full or hashing timed out.
+        """
+        return self._wait(self._submit(check_password_hash, password_hash, password))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Tell whether a stored hash was created with another method or cost.
+
+        Args:
+            password_hash: Stored hash.
+
+        Returns:
+            bool: ``True`` if the hash prefix differs from the configured one.
+        """
+        return password_hash.split("$", 1)[0] != self.prefix
+
+    def rehash_in_background(self, password: str, on_done: Callable[[str], None]) -> None:
+        """Compute a fresh hash without blocking the caller.
+
+        Rehashing is best effort: it is skipped when the queue is full and
+        errors are logged.
+
+        Args:
+            password: Plain-text password that was just verified.
+            on_done: Callback receiving the new hash (e.g. to store it). With
+                a process pool it runs on the ``password-rehash`` writer
+                thread, outside of any Flask context. Inline
+                (``workers=0``) both the hash and the callback run
+                synchronously in the calling thread.
+        """
+        try:
+            future = self._submit(generate_password_hash, password, self.method)
+        except PasswordHashingBusy:
+            return
+        if self._executor is not None:
+            self._ensure_writer()
+
+        def _complete(done: Future) -> None:
+            if done.cancelled() or done.exception() is not None:
+                return
+            if self._executor is not None:
+                # Runs on the executor's result thread: hand the write off.
+                self._rehashed.put((on_done, done.result()))
+                return
+            self._store(on_done, done.result())
+
+        future.add_done_callback(_complete)
+
+    @staticmethod
+    def _store(on_done: Callable[[str], None], new_hash: str) -> None:
+        try:
+            on_done(new_hash)
+        except Exception:
+            logger.exception("Password rehash failed")
+
+    def _write_rehashes(self) -> None:
+        while True:
+            on_done, new_hash = self._rehashed.get()
+            self._store(on_done, new_hash)
+
+    def _ensure_writer(self) -> None:
+        """Start the rehash writer thread in the current process if needed."""
+        pid = os.getpid()
+        if self._writer_pid == pid:
+            return
+        with self._lock:
+            if self._writer_pid == pid:
+                return
+            threading.Thread(target=self._write_rehashes, name="password-rehash", daemon=True).start()
+            self._writer_pid = pid
+
+    def stats(self) -> dict:
+        """Return usage counters.
+
+        Returns:
+            dict: ``maxPending``, current ``pending`` and ``rejected`` calls.
+        """
+        return {
+            "maxPending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
+
+
+def init_password_hasher(app: Flask) -> PasswordHasher:
+    """Create the password hasher of an app from its config.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        PasswordHasher: Hasher stored in ``app.extensions["password_hasher"]``.
+    """
+    hasher = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+    )
+    app.extensions["password_hasher"] = hasher
+    return hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the password hasher of the current Flask app.
+
+    Returns:
+        PasswordHasher: Hasher created on first use.
+    """
+    hasher = current_app.extensions.get("password_hasher")
+    if hasher is None:
+        with _init_lock:
+            hasher = current_app.extensions.get("password_hasher")
+            if hasher is None:
+                hasher = init_password_hasher(current_app)
+    return hasher
@@ -0,0 +1,232 @@
+"""``Idempotency-Key`` support for retried writes.
+
+The mobile client retries a write when it times out, so the same snapshot
+often reaches the server two or three times, each costing a full write and
+commit. A client that sends an ``Idempotency-Key`` header (any unique string
+of at most :data:`MAX_KEY_LENGTH` characters, e.g. a UUID reused across the
+retries of one request) gets the first response replayed instead:
+
+- the first request with a key runs normally and its response is stored
+  for ``IDEMPOTENCY_TTL`` seconds;
+- a repeat with the same key and the same body gets the stored response
+  back with ``Idempotent-Replayed: true``, without touching the database
+  or the admission limits;
+- a repeat with the same key and a different body is rejected with
+  ``422``, as the key is bound to the payload it was first used with;
+- a repeat arriving while the first request still runs gets ``409`` with
+  ``Retry-After``.
+
+Keys are scoped per route and per user (per route only on ``/register``
+and ``/login``). Requests without the header are not affected.
+
+Notes:
+    Entries live in a bounded :class:`server.cache.TTLCache`
+    (``IDEMPOTENCY_MAX_ENTRIES``, least recently used evicted first) per
+    process; a retry reaching another worker, or arriving after eviction,
+    runs again. Responses that invite a retry (``429`` and ``5xx``) are not
+    stored. ``IDEMPOTENCY_TTL=0`` disables the feature.
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, Response, current_app, jsonify, make_response, request
+
+from .cache import TTLCache
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    """Response kept for replay.
+
+    Attributes:
+        fingerprint: Digest of the request the key was first used with.
+        status: HTTP status code, or ``None`` while the request runs.
+        headers: Response headers.
+        body: Response body.
+    """
+    fingerprint: str
+    status: Optional[int]
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+def request_fingerprint() -> str:
+    """Return a digest of the current request's method, path, type and body."""
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.mimetype or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """Per-process store of responses by idempotency key.
+
+    Args:
+        ttl: Seconds a response is replayable.
+        max_entries: Maximum stored keys.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.cache = TTLCache(max_entries)
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "replayed": 0, "mismatched": 0, "inProgress": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def begin(self, key: Hashable, fingerprint: str) -> Optional[StoredResponse]:
+        """Claim ``key`` for a new request, or return what it is bound to.
+
+        Args:
+            key: Scoped idempotency key.
+            fingerprint: :func:`request_fingerprint` of the request.
+
+        Returns:
+            Optional[StoredResponse]: ``None`` if the key was free and is now
+            marked in progress; otherwise the existing entry (check its
+            ``fingerprint`` and ``status``).
+        """
+        with self._lock:
+            existing = self.cache.get(key)
+            if existing is not None:
+                if existing.fingerprint != fingerprint:
+                    self.counters["mismatched"] += 1
+                elif existing.status is None:
+                    self.counters["inProgress"] += 1
+                else:
+                    self.counters["replayed"] += 1
+                return existing
+            self.cache.set(key, StoredResponse(fingerprint, None, [], b""), time.time() + self.ttl)
+            return None
+
+    def complete(self, key: Hashable, fingerprint: str, response: Response) -> None:
+        """Store the response of a claimed key, or release the key.
+
+        Args:
+            key: Key claimed with :meth:`begin`.
+            fingerprint: Fingerprint it was claimed with.
+            response: Buffered response of the request.
+        """
+        if response.status_code == 429 or response.status_code >= 500 or response.is_streamed:
+            self.release(key)
+            return
+        stored = StoredResponse(
+            fingerprint,
+            response.status_code,
+            [(name, value) for name, value in response.headers if name.lower() != "content-length"],
+            response.get_data(),
+        )
+        with self._lock:
+            self.cache.set(key, stored, time.time() + self.ttl)
+            self.counters["stored"] += 1
+
+    def release(self, key: Hashable) -> None:
+        """Forget a claimed key so that a retry runs again.
+
+        Args:
+            key: Key claimed with :meth:`begin`.
+        """
+        self.cache.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store counters.
+
+        Returns:
+            Dict[str, Any]: ``size`` and the ``stored``, ``replayed``,
+            ``mismatched`` and ``inProgress`` counts.
+        """
+        with self._lock:
+            return {"size": len(self.cache), **self.counters}
+
+
+def idempotent(scope: str) -> Callable:
+    """Decorator replaying responses of requests with an ``Idempotency-Key``.
+
+    Place it below :func:`server.auth.token_required` (keys are then scoped
+    to the user) and above :func:`server.admission.admission_control`, so
+    replays are not rate limited.
+
+    Args:
+        scope: Name separating the keys of different routes.
+
+    Returns:
+        Callable: Decorator.
+
+    Examples:
+        >>> @api_bp.route("/sync", methods=["POST"])
+        ... @token_required
+        ... @idempotent("sync")
+        ... @admission_control("sync")
+        ... def sync(user):
+        ...     ...
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            header = request.headers.get(HEADER)
+            store = get_idempotency()
+            if header is None or not store.enabled:
+                return fn(*args, **kwargs)
+            if not header or len(header) > MAX_KEY_LENGTH:
+                return jsonify({"message": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+            user = args[0] if args and hasattr(args[0], "id") else None
+            key = (scope, user.id if user is not None else None, header)
+            fingerprint = request_fingerprint()
+            existing = store.begin(key, fingerprint)
+            if existing is not None:
+                return _answer(existing, fingerprint)
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except BaseException:
+                store.release(key)
+                raise
+            store.complete(key, fingerprint, response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _answer(existing: StoredResponse, fingerprint: str):
+    if existing.fingerprint != fingerprint:
+        return jsonify({"message": f"{HEADER} was already used with a different request"}), 422
+    if existing.status is None:
+        return jsonify({"message": "A request with this key is in progress"}), 409, {"Retry-After": "1"}
+    response = Response(existing.body, status=existing.status, headers=existing.headers)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def init_idempotency(app: Flask) -> IdempotencyStore:
+    """Create the idempotency store of an app from its config.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        IdempotencyStore: Store saved in ``app.extensions["idempotency"]``.
+    """
+    store = IdempotencyStore(app.config["IDEMPOTENCY_TTL"], app.config["IDEMPOTENCY_MAX_ENTRIES"])
+    app.extensions["idempotency"] = store
+    return store
+
+
+def get_idempotency() -> IdempotencyStore:
+    """Return the idempotency store of the current Flask app.
+
+    Returns:
+        IdempotencyStore: Store created by :func:`init_idempotency`.
+    """
+    return current_app.extensions["idempotency"]
@@ -0,0 +1,886 @@
+"""In-process leaderboard rank index.
+
+The leaderboard is served from an ordered in-memory index instead of running
+``ORDER BY coins DESC, updated_at DESC`` against the ``profiles`` table on
+every request.
+
+The index keeps one sort key per player:
+
+``(-coins, -updated_at, -user_id)``
+
+stored in a :class:`SortedKeyList` (sorted chunks plus a Fenwick tree of
+chunk sizes). Looking up a player's absolute rank and moving a player after
+a write are ``O(log n)``; slicing the top-N or a window around a player
+does not touch the database. ``python -m server.benchmarks.rank_index``
+measures the update rate at a million players.
+
+Notes:
+    The index is loaded once from :class:`server.models.Profile` at startup
+    (see :func:`init_rank_index`) and kept up to date by
+    :func:`server.auth.upsert_profile` and the ``/register`` route.
+
+    Each process owns its own index. Writes served by another process (e.g.
+    a second gunicorn worker) are merged in by :class:`RankIndexRefresher`,
+    which follows the append-only ``score_events`` log and new ``users``
+    rows, so the index trails other workers by at most
+    ``RANK_INDEX_REFRESH_INTERVAL`` seconds.
+
+    Serialized ``/leaderboard`` bodies are cached per ``limit`` in
+    :class:`LeaderboardCache`. The cache is keyed on :attr:`RankIndex.version`,
+    which only changes when a write touches the top :data:`CACHED_TOP_N`
+    entries, so writes further down the table keep the cache warm.
+
+    Deeper pages use keyset pagination: an opaque cursor (see
+    :func:`encode_cursor`) carries the sort key and rank of the last row of
+    the previous page, and the next page starts right after that key. The
+    same ordering is served either by the rank index or, with
+    ``LEADERBOARD_PAGE_SOURCE = "database"``, by :class:`DatabaseLeaderboard`
+    through the ``ix_profiles_leaderboard`` composite index, so page 1 and
+    page 10,000 cost the same.
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from .database import db
+from .models import Profile, ScoreEvent, User
+
+logger = logging.getLogger(__name__)
+
+SortKey = Tuple[int, float, int]
+
+CACHED_TOP_N = 100
+
+
+class LeaderboardEntry(NamedTuple):
+    """Single ranked leaderboard row.
+
+    Attributes:
+        rank: 1-based absolute rank.
+        user_id: Identifier of the player.
+        nickname: Player nickname.
+        coins: Coin balance.
+        updated_at: Timestamp of the last profile update.
+    """
+    rank: int
+    user_id: int
+    nickname: str
+    coins: int
+    updated_at: Optional[datetime]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the entry into a JSON-friendly dictionary.
+
+        Returns:
+            Dict[str, Any]: Dictionary with keys ``rank``, ``nickname``,
+            ``coins`` and ``updatedAt``.
+        """
+        return {
+            "rank": self.rank,
+            "nickname": self.nickname,
+            "coins": self.coins,
+            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+def render_entry(entry: LeaderboardEntry) -> bytes:
+    """Render one entry exactly as it appears inside a ``/leaderboard`` body.
+
+    Must run inside an app context (uses the app's JSON provider).
+
+    Args:
+        entry: Ranked entry.
+
+    Returns:
+        bytes: Compact UTF-8 JSON object.
+    """
+    return current_app.json.dumps(entry.to_dict(), separators=(",", ":")).encode("utf-8")
+
+
+class Cursor(NamedTuple):
+    """Position after which the next leaderboard page starts.
+
+    Attributes:
+        coins: Coins of the last row of the previous page.
+        updated_at: ``updated_at`` of that row.
+        user_id: Identifier of that row's player.
+        rank: Rank of that row, so the next page can number its rows
+            without counting.
+    """
+    coins: int
+    updated_at: Optional[datetime]
+    user_id: int
+    rank: int
+
+
+def encode_cursor(entry: LeaderboardEntry) -> str:
+    """Build the opaque cursor pointing after ``entry``.
+
+    Args:
+        entry: Last entry of a page.
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    raw = json.dumps([
+        entry.coins,
+        entry.updated_at.isoformat() if entry.updated_at else None,
+        entry.user_id,
+        entry.rank,
+    ], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Parse a cursor produced by :func:`encode_cursor`.
+
+    Args:
+        value: Cursor string from the client.
+
+    Returns:
+        Cursor: Decoded position.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        coins, updated_at, user_id, rank = json.loads(raw)
+        return Cursor(
+            int(coins),
+            datetime.fromisoformat(updated_at) if updated_at else None,
+            int(user_id),
+            int(rank),
+        )
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+class SortedKeyList:
+    """Sorted sequence of sort keys with logarithmic updates.
+
+    A plain sorted list moves ``O(n)`` items on every insert or delete,
+    which dominates :meth:`RankIndex.upsert` once the table holds millions
+    of players. Keys are kept in sorted chunks of ``load`` to ``2 * load``
+    items instead (the layout of ``sortedcontainers.SortedList``), with a
+    Fenwick tree over the chunk sizes:
+
+    - finding a key's chunk and its absolute position is ``O(log n)``;
+    - an insert or delete moves at most ``2 * load`` items within one chunk;
+    - splitting a full chunk, or merging one that fell below ``load / 4``
+      into its neighbour, rebuilds the tree in ``O(n / load)``, at most once
+      per ``load / 4`` updates of that chunk.
+
+    Not thread-safe; :class:`RankIndex` serializes access.
+
+    Args:
+        keys: Initial keys, in any order.
+        load: Target chunk size.
+
+    Examples:
+        >>> keys = SortedKeyList([(3, 0.0, 1), (1, 0.0, 2)], load=2)
+        >>> keys.add((2, 0.0, 3))
+        1
+        >>> keys[0:3]
+        [(1, 0.0, 2), (2, 0.0, 3), (3, 0.0, 1)]
+        >>> keys.remove((1, 0.0, 2)), keys.bisect_left((3, 0.0, 1))
+        (0, 1)
+    """
+
+    def __init__(self, keys: Iterable[SortKey] = (), load: int = 512):
+        self._load = max(4, int(load))
+        values = sorted(keys)
+        self._chunks: List[List[SortKey]] = [
+            values[start:start + self._load] for start in range(0, len(values), self._load)
+        ]
+        self._len = len(values)
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _rebuild(self) -> None:
+        """Recompute the chunk maxima and the Fenwick tree of chunk sizes."""
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        tree = [0] + [len(chunk) for chunk in self._chunks]
+        for node in range(1, len(tree)):
+            parent = node + (node & -node)
+            if parent < len(tree):
+                tree[parent] += tree[node]
+        self._tree = tree
+
+    def _grow(self, chunk: int, delta: int) -> None:
+        node = chunk + 1
+        while node < len(self._tree):
+            self._tree[node] += delta
+            node += node & -node
+
+    def _offset(self, chunk: int) -> int:
+        """Return the number of keys stored in the chunks before ``chunk``."""
+        total = 0
+        node = chunk
+        while node:
+            total += self._tree[node]
+            node -= node & -node
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """Return the chunk and in-chunk index of the key at ``position``."""
+        chunk = 0
+        step = (1 << (len(self._tree) - 1).bit_length()) >> 1
+        while step:
+            node = chunk + step
+            if node < len(self._tree) and self._tree[node] <= position:
+                chunk = node
+                position -= self._tree[node]
+            step >>= 1
+        return chunk, position
+
+    def add(self, key: SortKey) -> int:
+        """Insert ``key``.
+
+        Args:
+            key: Sort key.
+
+        Returns:
+            int: 0-based position of the inserted key.
+        """
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([key])
+            self._rebuild()
+            return 0
+        chunk = min(bisect_left(self._maxes, key), len(self._chunks) - 1)
+        items = self._chunks[chunk]
+        index = bisect_right(items, key)
+        items.insert(index, key)
+        position = self._offset(chunk) + index
+        if len(items) > 2 * self._load:
+            self._chunks[chunk:chunk + 1] = [items[:self._load], items[self._load:]]
+            self._rebuild()
+        else:
+            self._maxes[chunk] = items[-1]
+            self._grow(chunk, 1)
+        return position
+
+    def remove(self, key: SortKey) -> int:
+        """Delete ``key``.
+
+        Args:
+            key: Sort key present in the list.
+
+        Returns:
+            int: 0-based position the key had.
+
+        Raises:
+            ValueError: If ``key`` is not in the list.
+        """
+        chunk = bisect_left(self._maxes, key)
+        items = self._chunks[chunk] if chunk < len(self._chunks) else []
+        index = bisect_left(items, key)
+        if index == len(items) or items[index] != key:
+            raise ValueError(f"{key!r} not in list")
+        position = self._offset(chunk) + index
+        del items[index]
+        self._len -= 1
+        if not items:
+            del self._chunks[chunk]
+            self._rebuild()
+        elif len(items) * 4 < self._load and len(self._chunks) > 1:
+            first = chunk if chunk + 1 < len(self._chunks) else chunk - 1
+            merged = self._chunks[first] + self._chunks[first + 1]
+            if len(merged) > 2 * self._load:
+                half = len(merged) // 2
+                self._chunks[first:first + 2] = [merged[:half], merged[half:]]
+            else:
+                self._chunks[first:first + 2] = [merged]
+            self._rebuild()
+        else:
+            self._maxes[chunk] = items[-1]
+            self._grow(chunk, -1)
+        return position
+
+    def bisect_left(self, key: SortKey) -> int:
+        """Return the position of the first key ``>= key``."""
+        chunk = bisect_left(self._maxes, key)
+        if chunk == len(self._chunks):
+            return self._len
+        return self._offset(chunk) + bisect_left(self._chunks[chunk], key)
+
+    def bisect_right(self, key: SortKey) -> int:
+        """Return the position of the first key ``> key``."""
+        chunk = bisect_right(self._maxes, key)
+        if chunk == len(self._chunks):
+            return self._len
+        return self._offset(chunk) + bisect_right(self._chunks[chunk], key)
+
+    def __getitem__(self, window: slice) -> List[SortKey]:
+        """Return the keys of a contiguous slice (``keys[start:stop]``)."""
+        start, stop, _ = window.indices(self._len)
+        if start >= stop:
+            return []
+        chunk, index = self._locate(start)
+        keys: List[SortKey] = []
+        wanted = stop - start
+        while len(keys) < wanted:
+            keys.extend(self._chunks[chunk][index:index + wanted - len(keys)])
+            chunk, index = chunk + 1, 0
+        return keys
+
+
+class RankIndex:
+    """Ordered index of all players by ``(coins DESC, updated_at DESC, user_id)``.
+
+    All public methods are thread-safe.
+
+    Attributes:
+        epoch: Random token identifying this index instance, so versions from
+            a previous process are never mistaken for current ones.
+        version: Counter bumped whenever the top :data:`CACHED_TOP_N` entries
+            change. Used to build leaderboard ETags.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._keys = SortedKeyList()
+        self._players: Dict[int, Tuple[SortKey, str, int, Optional[datetime]]] = {}
+
+    @staticmethod
+    def _sort_key(user_id: int, coins: int, updated_at: Optional[datetime]) -> SortKey:
+        timestamp = updated_at.timestamp() if updated_at else 0.0
+        return (-int(coins or 0), -timestamp, -int(user_id))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: Iterable[Tuple[int, str, int, Optional[datetime]]]) -> None:
+        """Replace the index content.
+
+        Args:
+            rows: Iterable of ``(user_id, nickname, coins, updated_at)`` tuples.
+        """
+        players = {}
+        for user_id, nickname, coins, updated_at in rows:
+            key = self._sort_key(user_id, coins, updated_at)
+            players[user_id] = (key, nickname, int(coins or 0), updated_at)
+        keys = SortedKeyList(item[0] for item in players.values())
+        with self._lock:
+            self._players = players
+            self._keys = keys
+            self.version += 1
+
+    def upsert(
+        self,
+        user_id: int,
+        nickname: str,
+        coins: int,
+        updated_at: Optional[datetime],
+    ) -> Tuple[Optional[int], int]:
+        """Insert a player or move them to their new position.
+
+        Args:
+            user_id: Identifier of the player.
+            nickname: Player nickname.
+            coins: New coin balance.
+            updated_at: Timestamp of the profile update.
+
+        Returns:
+            Tuple[Optional[int], int]: Previous rank (``None`` for a new
+            player) and the new rank.
+
+        Side Effects:
+            Bumps :attr:`version` when the old or new rank is within the top
+            :data:`CACHED_TOP_N`.
+        """
+        key = self._sort_key(user_id, coins, updated_at)
+        with self._lock:
+            old_rank = None
+            previous = self._players.get(user_id)
+            if previous is not None:
+                old_rank = self._keys.remove(previous[0]) + 1
+            new_rank = self._keys.add(key) + 1
+            self._players[user_id] = (key, nickname, int(coins or 0), updated_at)
+            if new_rank <= CACHED_TOP_N or (old_rank is not None and old_rank <= CACHED_TOP_N):
+                self.version += 1
+            return old_rank, new_rank
+
+    def merge(self, rows: Iterable[Tuple[int, str, int, Optional[datetime]]]) -> int:
+        """Move the players whose stored row differs from the index.
+
+        Rows older than the indexed entry (a write of this process that
+        committed after the row was read) are skipped.
+
+        Args:
+            rows: Iterable of ``(user_id, nickname, coins, updated_at)`` tuples.
+
+        Returns:
+            int: Number of players inserted or moved.
+        """
+        moved = 0
+        with self._lock:
+            for user_id, nickname, coins, updated_at in rows:
+                current = self._players.get(user_id)
+                if current is not None:
+                    if current[1:] == (nickname, int(coins or 0), updated_at):
+                        continue
+                    if current[3] and updated_at and updated_at < current[3]:
+                        continue
+                self.upsert(user_id, nickname, coins, updated_at)
+                moved += 1
+        return moved
+
+    def remove(self, user_id: int) -> None:
+        """Drop a player from the index (no-op when absent).
+
+        Args:
+            user_id: Identifier of the player.
+        """
+        with self._lock:
+            previous = self._players.pop(user_id, None)
+            if previous is not None:
+                position = self._keys.remove(previous[0])
+                if position < CACHED_TOP_N:
+                    self.version += 1
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """Return the 1-based rank of a player.
+
+        Args:
+            user_id: Identifier of the player.
+
+        Returns:
+            Optional[int]: Rank or ``None`` if the player is not indexed.
+        """
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return None
+            return self._keys.bisect_left(player[0]) + 1
+
+    def entries_of(self, user_ids: Iterable[int]) -> Dict[int, LeaderboardEntry]:
+        """Return the ranked entries of several players under one lock.
+
+        Args:
+            user_ids: Identifiers of the players.
+
+        Returns:
+            Dict[int, LeaderboardEntry]: Entries by user id; players that are
+            not indexed are missing.
+        """
+        entries = {}
+        with self._lock:
+            for user_id in user_ids:
+                player = self._players.get(user_id)
+                if player is not None:
+                    key, nickname, coins, updated_at = player
+                    entries[user_id] = LeaderboardEntry(
+                        self._keys.bisect_left(key) + 1, user_id, nickname, coins, updated_at
+                    )
+        return entries
+
+    def _slice(self, start: int, stop: int) -> List[LeaderboardEntry]:
+        entries = []
+        for offset, key in enumerate(self._keys[start:stop]):
+            user_id = -key[2]
+            _, nickname, coins, updated_at = self._players[user_id]
+            entries.append(LeaderboardEntry(start + offset + 1, user_id, nickname, coins, updated_at))
+        return entries
+
+    def top(self, limit: int) -> List[LeaderboardEntry]:
+        """Return the first ``limit`` players.
+
+        Args:
+            limit: Number of entries to return.
+
+        Returns:
+            List[LeaderboardEntry]: Ranked entries.
+        """
+        with self._lock:
+            return self._slice(0, max(0, limit))
+
+    def versioned_top(self, limit: int) -> Tuple[int, List[LeaderboardEntry]]:
+        """Return the first ``limit`` players together with the current version.
+
+        Args:
+            limit: Number of entries to return.
+
+        Returns:
+            Tuple[int, List[LeaderboardEntry]]: Index version and ranked
+            entries, read atomically.
+        """
+        with self._lock:
+            return self.version, self._slice(0, max(0, limit))
+
+    def around(self, user_id: int, radius: int) -> Tuple[Optional[int], List[LeaderboardEntry]]:
+        """Return a player's rank and the entries surrounding it.
+
+        Args:
+            user_id: Identifier of the player.
+            radius: Number of neighbours to include on each side.
+
+        Returns:
+            Tuple[Optional[int], List[LeaderboardEntry]]: Player rank (``None``
+            when not indexed) and the window ``[rank - radius, rank + radius]``.
+        """
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return None, []
+            position = self._keys.bisect_left(player[0])
+            start = max(0, position - radius)
+            return position + 1, self._slice(start, position + radius + 1)
+
+    def page_after(self, cursor: Optional[Cursor], limit: int) -> List[LeaderboardEntry]:
+        """Return the ``limit`` players ranked right after ``cursor``.
+
+        Args:
+            cursor: Position of the previous page's last row, or ``None``
+                for the first page.
+            limit: Page size.
+
+        Returns:
+            List[LeaderboardEntry]: Ranked entries (binary search, then a
+            slice; the cost does not depend on the depth).
+        """
+        with self._lock:
+            start = 0
+            if cursor is not None:
+                key = self._sort_key(cursor.user_id, cursor.coins, cursor.updated_at)
+                start = self._keys.bisect_right(key)
+            return self._slice(start, start + max(0, limit))
+
+    def window(self, user_id: int, limit: int) -> Tuple[Optional[int], List[LeaderboardEntry]]:
+        """Return a page of ``limit`` players with ``user_id`` in the middle.
+
+        Args:
+            user_id: Identifier of the player.
+            limit: Page size.
+
+        Returns:
+            Tuple[Optional[int], List[LeaderboardEntry]]: Player rank
+            (``None`` when not indexed, with no entries) and the page.
+        """
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return None, []
+            position = self._keys.bisect_left(player[0])
+            start = max(0, position - limit // 2)
+            return position + 1, self._slice(start, start + limit)
+
+
+class DatabaseLeaderboard:
+    """Keyset leaderboard pages read straight from the ``profiles`` table.
+
+    Offers the same :meth:`page_after` / :meth:`window` interface as
+    :class:`RankIndex`. Every page is an index range scan on
+    ``ix_profiles_leaderboard`` starting at the cursor, so it always reflects
+    the database, including writes served by other processes.
+
+    Subclasses rank another table by overriding :attr:`model`,
+    :meth:`_ranking_columns` and :meth:`_scope` (see
+    :class:`server.leaderboard_windows.WindowLeaderboard`).
+
+    Args:
+        session: Session to query (e.g. :func:`server.database.get_read_session`).
+    """
+
+    model = Profile
+
+    def __init__(self, session: Session):
+        self._session = session
+        self._coins, self._updated_at, self._user_id = self._ranking_columns()
+        self._key = tuple_(self._coins, self._updated_at, self._user_id)
+
+    def _ranking_columns(self):
+        """Return the ``(coins, updated_at, user_id)`` columns ranked on."""
+        return Profile.coins, Profile.updated_at, Profile.user_id
+
+    def _scope(self, query):
+        """Restrict ``query`` to the ranked rows (all of them here)."""
+        return query
+
+    def _rows(self, query) -> List[Tuple[int, str, int, Optional[datetime]]]:
+        return self._session.execute(
+            query.add_columns(self._user_id, User.nickname, self._coins, self._updated_at)
+            .join(User, User.id == self._user_id)
+        ).all()
+
+    def _select(self):
+        return self._scope(db.select().select_from(self.model))
+
+    def _descending(self):
+        return self._select().order_by(self._coins.desc(), self._updated_at.desc(), self._user_id.desc())
+
+    @staticmethod
+    def _entries(first_rank: int, rows) -> List[LeaderboardEntry]:
+        return [
+            LeaderboardEntry(first_rank + offset, user_id, nickname, int(coins or 0), updated_at)
+            for offset, (user_id, nickname, coins, updated_at) in enumerate(rows)
+        ]
+
+    def page_after(self, cursor: Optional[Cursor], limit: int) -> List[LeaderboardEntry]:
+        """Return the ``limit`` players ranked right after ``cursor``.
+
+        Args:
+            cursor: Position of the previous page's last row, or ``None``
+                for the first page.
+            limit: Page size.
+
+        Returns:
+            List[LeaderboardEntry]: Ranked entries; ranks continue from
+            :attr:`Cursor.rank`.
+        """
+        query = self._descending().limit(max(0, limit))
+        first_rank = 1
+        if cursor is not None:
+            query = query.where(self._key < tuple_(cursor.coins, cursor.updated_at, cursor.user_id))
+            first_rank = cursor.rank + 1
+        return self._entries(first_rank, self._rows(query))
+
+    def window(self, user_id: int, limit: int) -> Tuple[Optional[int], List[LeaderboardEntry]]:
+        """Return a page of ``limit`` players with ``user_id`` in the middle.
+
+        Args:
+            user_id: Identifier of the player.
+            limit: Page size.
+
+        Returns:
+            Tuple[Optional[int], List[LeaderboardEntry]]: Player rank
+            (``None`` without a ranked row, with no entries) and the page.
+
+        Notes:
+            The rank itself is a ``COUNT`` over the index range above the
+            player, so its cost grows with the rank; the page is two range
+            scans.
+        """
+        me = self._session.execute(
+            self._scope(db.select(self._coins, self._updated_at, self._user_id)).where(self._user_id == user_id)
+        ).one_or_none()
+        if me is None:
+            return None, []
+        mine = tuple_(*me)
+        rank = 1 + self._session.execute(
+            self._scope(db.select(func.count()).select_from(self.model)).where(self._key > mine)
+        ).scalar_one()
+        above = self._rows(
+            self._select()
+            .where(self._key > mine)
+            .order_by(self._coins, self._updated_at, self._user_id)
+            .limit(limit // 2)
+        )
+        below = self._rows(self._descending().where(self._key <= mine).limit(max(0, limit - len(above))))
+        return rank, self._entries(rank - len(above), list(reversed(above)) + below)
+
+
+class LeaderboardCache:
+    """Cache of serialized ``/leaderboard`` bodies keyed per ``limit``.
+
+    Each cached body remembers the :attr:`RankIndex.version` it was built
+    from and is rebuilt lazily once the version moves on.
+    """
+
+    def __init__(self, index: RankIndex):
+        self._index = index
+        self._lock = threading.Lock()
+        self._bodies: Dict[int, Tuple[int, bytes]] = {}
+
+    def get(self, limit: int, render: Callable[[List[LeaderboardEntry]], bytes]) -> Tuple[int, bytes]:
+        """Return the serialized body for ``limit``.
+
+        Args:
+            limit: Number of entries in the body.
+            render: Callback serializing ranked entries into a response body.
+                Only called on a cache miss.
+
+        Returns:
+            Tuple[int, bytes]: Version the body was built from and the body.
+        """
+        version = self._index.version
+        cached = self._bodies.get(limit)
+        if cached is not None and cached[0] == version:
+            return cached
+        version, entries = self._index.versioned_top(limit)
+        cached = (version, render(entries))
+        with self._lock:
+            self._bodies[limit] = cached
+        return cached
+
+
+class RankIndexRefresher:
+    """Merges profile writes committed by other processes into a rank index.
+
+    Every profile write appends a :class:`server.models.ScoreEvent` and every
+    registration inserts a :class:`server.models.User`, both with increasing
+    ids. Each run reloads the profiles of the players behind the rows after
+    the last seen ids and merges them (see :meth:`RankIndex.merge`).
+
+    The seen ids only advance past rows older than ``settle`` seconds, so
+    rows younger than that are read again on the next run. On databases that
+    allocate ids before commit a lower id may become visible after a higher
+    one; the delay keeps such rows from being skipped (as for the score
+    rollup watermark).
+
+    Args:
+        app: Flask application; the thread queries inside its app context.
+        index: Index to keep up to date.
+        interval: Seconds between two runs.
+        settle: Age in seconds after which a row is assumed committed.
+    """
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, app, index: RankIndex, interval: float, settle: float):
+        self.app = app
+        self.index = index
+        self.interval = interval
+        self.settle = settle
+        self._event_mark = 0
+        self._user_mark = 0
+        self._lock = threading.Lock()
+        self._thread_pid: Optional[int] = None
+
+    @staticmethod
+    def _settled_id(model, cutoff: datetime) -> int:
+        return db.session.execute(
+            db.select(model.id).where(model.created_at <= cutoff).order_by(model.id.desc()).limit(1)
+        ).scalar() or 0
+
+    def _marks(self) -> Tuple[int, int]:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.settle)
+        return self._settled_id(ScoreEvent, cutoff), self._settled_id(User, cutoff)
+
+    def start_from_now(self) -> None:
+        """Skip the rows already covered by a full load of the index.
+
+        Must run inside an app context, right before the load.
+        """
+        self._event_mark, self._user_mark = self._marks()
+
+    @staticmethod
+    def _rows(condition) -> List[Tuple[int, str, int, Optional[datetime]]]:
+        return db.session.execute(
+            db.select(Profile.user_id, User.nickname, Profile.coins, Profile.updated_at)
+            .join(User, User.id == Profile.user_id)
+            .where(condition)
+        ).all()
+
+    def refresh(self) -> int:
+        """Merge the writes committed since the previous run.
+
+        Returns:
+            int: Number of players inserted or moved in the index.
+        """
+        with self.app.app_context():
+            try:
+                event_mark, user_mark = self._marks()
+                changed = sorted(
+                    db.session.execute(
+                        db.select(ScoreEvent.user_id).where(ScoreEvent.id > self._event_mark).distinct()
+                    ).scalars()
+                )
+                rows = self._rows(User.id > self._user_mark)
+                for start in range(0, len(changed), self.CHUNK_SIZE):
+                    rows += self._rows(Profile.user_id.in_(changed[start:start + self.CHUNK_SIZE]))
+            finally:
+                db.session.remove()
+        moved = self.index.merge(rows)
+        self._event_mark = max(self._event_mark, event_mark)
+        self._user_mark = max(self._user_mark, user_mark)
+        return moved
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Rank index refresh failed")
+
+    def ensure_refresher(self) -> None:
+        """Start the refresher thread in the current process if needed.
+
+        Started lazily, like the leaderboard snapshot refresher, so it lives
+        in each forked worker.
+        """
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            threading.Thread(target=self._run, name="rank-index-refresh", daemon=True).start()
+            self._thread_pid = pid
+
+
+def init_rank_index(app) -> RankIndex:
+    """Build the rank index from the ``profiles`` table.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        RankIndex: Loaded index, also stored in ``app.extensions["rank_index"]``.
+        A :class:`LeaderboardCache` over it is stored in
+        ``app.extensions["leaderboard_cache"]``, and its
+        :class:`RankIndexRefresher` in ``app.extensions["rank_index_refresher"]``
+        (``None`` when ``RANK_INDEX_REFRESH_INTERVAL`` is ``0``).
+
+    Side Effects:
+        Loads every profile inside the app context. The refresher thread
+        starts on the first :func:`get_rank_index` call of each worker.
+    """
+    index = RankIndex()
+    interval = float(app.config["RANK_INDEX_REFRESH_INTERVAL"])
+    refresher = None
+    if interval > 0:
+        refresher = RankIndexRefresher(app, index, interval, float(app.config["SCORE_ROLLUP_SETTLE"]))
+    with app.app_context():
+        if refresher is not None:
+            refresher.start_from_now()
+        rows = db.session.execute(
+            db.select(Profile.user_id, User.nickname, Profile.coins, Profile.updated_at)
+            .join(User, User.id == Profile.user_id)
+        )
+        index.load(rows)
+    app.extensions["rank_index"] = index
+    app.extensions["rank_index_refresher"] = refresher
+    app.extensions["leaderboard_cache"] = LeaderboardCache(index)
+    return index
+
+
+def get_rank_index() -> RankIndex:
+    """Return the rank index of the current Flask app.
+
+    Also makes sure the index refresher of this process is running.
+
+    Returns:
+        RankIndex: Index created by :func:`init_rank_index`.
+    """
+    refresher = current_app.extensions.get("rank_index_refresher")
+    if refresher is not None:
+        refresher.ensure_refresher()
+    return current_app.extensions["rank_index"]
+
+
+def get_leaderboard_cache() -> LeaderboardCache:
+    """Return the leaderboard body cache of the current Flask app.
+
+    Returns:
+        LeaderboardCache: Cache created by :func:`init_rank_index`.
+    """
+    return current_app.extensions["leaderboard_cache"]
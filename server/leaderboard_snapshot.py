@@ -0,0 +1,283 @@
+"""Materialized leaderboard snapshot shared by all worker processes.
+
+Each gunicorn worker owns its own :class:`server.leaderboard.RankIndex`, so
+with N workers the first leaderboard page is built, cached and kept up to
+date N times. When ``LEADERBOARD_SNAPSHOT_PATH`` is set, one worker instead
+materializes the ranked top ``LEADERBOARD_SNAPSHOT_TOP_N`` into a file every
+``LEADERBOARD_SNAPSHOT_INTERVAL`` seconds, and every worker memory-maps that
+file to serve ``GET /api/leaderboard``:
+
+- the refresher is elected with an exclusive ``flock`` on
+  ``<path>.lock``; the other workers keep retrying, so another one takes
+  over when the holder exits;
+- a new snapshot is written to a temporary file and renamed over the old
+  one, so readers never see a partial file and keep their current mapping
+  until they notice the new inode;
+- entries are stored pre-rendered with :func:`server.leaderboard.render_entry`
+  (byte-identical to the in-memory path) together with an offsets table, so
+  a page of any ``limit`` is a slice of the mapping, with no parsing or
+  querying;
+- a snapshot older than ``LEADERBOARD_SNAPSHOT_MAX_AGE`` is ignored and the
+  route falls back to a SQL query.
+
+File layout (little-endian)::
+
+    header   := magic "LBS1" | generation u64 | built_at f64 | count u32 | digest u32
+    offsets  := (count + 1) x u32     ; start of each entry fragment
+    cursors  := (count + 1) x u32     ; start of each entry's nextCursor JSON
+    entries  := fragment ("," fragment)*
+    cursor*  := JSON string
+
+Notes:
+    ``flock`` is POSIX-only. Without :mod:`fcntl` (e.g. on Windows, where
+    gunicorn does not run anyway) every process refreshes its own file.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from flask import Flask, current_app
+
+from .database import db
+from .leaderboard import DatabaseLeaderboard, LeaderboardEntry, encode_cursor, render_entry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LBS1"
+HEADER = struct.Struct("<4sQdII")
+
+
+def render_snapshot(entries: List[LeaderboardEntry], generation: int) -> bytes:
+    """Serialize ranked entries into the snapshot file format.
+
+    Must run inside an app context (entries are rendered with
+    :func:`server.leaderboard.render_entry`).
+
+    Args:
+        entries: Ranked top entries.
+        generation: Monotonic counter stored in the header.
+
+    Returns:
+        bytes: File content.
+    """
+    fragments = [render_entry(entry) for entry in entries]
+    cursors = [b'"' + encode_cursor(entry).encode("ascii") + b'"' for entry in entries]
+    count = len(entries)
+    tables_size = 2 * 4 * (count + 1)
+    base = HEADER.size + tables_size
+
+    offsets = []
+    position = base
+    for fragment in fragments:
+        offsets.append(position)
+        position += len(fragment) + 1  # trailing comma
+    offsets.append(position)
+    body = b",".join(fragments) + b","
+
+    cursor_offsets = []
+    for cursor in cursors:
+        cursor_offsets.append(position)
+        position += len(cursor)
+    cursor_offsets.append(position)
+    cursor_area = b"".join(cursors)
+
+    digest = zlib.crc32(body)
+    header = HEADER.pack(MAGIC, generation, time.time(), count, digest)
+    table = struct.pack(f"<{count + 1}I", *offsets) + struct.pack(f"<{count + 1}I", *cursor_offsets)
+    return header + table + body + cursor_area
+
+
+class LeaderboardSnapshot:
+    """Reader (and, when elected, writer) of the shared snapshot file.
+
+    Args:
+        app: Flask application; the refresher thread queries the database
+            inside its app context.
+        path: Snapshot file.
+        interval: Seconds between two refreshes.
+        top_n: Number of ranked entries materialized.
+        max_age: Seconds after which a snapshot is considered stale.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        path: str,
+        interval: float,
+        top_n: int,
+        max_age: float,
+    ):
+        self.app = app
+        self.path = Path(path)
+        self.interval = interval
+        self.top_n = top_n
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._thread_pid: Optional[int] = None
+        self._lock_file = None
+        self.generation = 0
+
+    # -- refresher ---------------------------------------------------------
+
+    def _try_elect(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            return True
+        handle = open(f"{self.path}.lock", "a+b")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_file = handle
+        return True
+
+    def refresh(self) -> None:
+        """Query the top entries and atomically replace the snapshot file.
+
+        Side Effects:
+            Reads the database inside an app context and writes
+            ``<path>`` via a temporary file and :func:`os.replace`.
+        """
+        with self.app.app_context():
+            try:
+                entries = DatabaseLeaderboard(db.session).page_after(None, self.top_n)
+                self.generation += 1
+                content = render_snapshot(entries, self.generation)
+            finally:
+                db.session.remove()
+        temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp.write_bytes(content)
+        os.replace(temp, self.path)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if self._try_elect():
+                    self.refresh()
+            except Exception:
+                logger.exception("Leaderboard snapshot refresh failed")
+            time.sleep(self.interval)
+
+    def ensure_refresher(self) -> None:
+        """Start the refresher thread in the current process if needed.
+
+        The thread is started lazily so that it lives in each forked worker
+        (threads do not survive ``fork``, e.g. with ``gunicorn --preload``).
+        """
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._lock_file = None
+            self._map = None
+            self._identity = None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            threading.Thread(target=self._run, name="leaderboard-snapshot", daemon=True).start()
+            self._thread_pid = pid
+
+    # -- reader ------------------------------------------------------------
+
+    def _mapping(self) -> Optional[mmap.mmap]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return self._map
+        with self._lock:
+            if identity != self._identity:
+                with open(self.path, "rb") as handle:
+                    mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                if mapping[:4] != MAGIC:
+                    return None
+                # The previous mapping is released once in-flight readers drop
+                # their reference to it.
+                self._map = mapping
+                self._identity = identity
+            return self._map
+
+    def page(self, limit: int) -> Optional[Tuple[str, bytes]]:
+        """Return the first leaderboard page from the snapshot.
+
+        Args:
+            limit: Page size.
+
+        Returns:
+            Optional[Tuple[str, bytes]]: ETag and JSON body, or ``None`` when
+            the snapshot is missing, stale or shorter than a full page while
+            more rows may exist (``limit > top_n``).
+        """
+        self.ensure_refresher()
+        if limit > self.top_n:
+            return None
+        mapping = self._mapping()
+        if mapping is None:
+            return None
+        _, generation, built_at, count, digest = HEADER.unpack_from(mapping, 0)
+        if time.time() - built_at > self.max_age:
+            return None
+        size = min(limit, count)
+        if size == 0:
+            return f"lbs-{digest:08x}-0", b'{"entries":[],"nextCursor":null}'
+        offsets = HEADER.size
+        cursors = offsets + 4 * (count + 1)
+        start = struct.unpack_from("<I", mapping, offsets)[0]
+        end = struct.unpack_from("<I", mapping, offsets + 4 * size)[0] - 1
+        next_cursor = b"null"
+        if size == limit:
+            cursor_start, cursor_end = struct.unpack_from("<2I", mapping, cursors + 4 * (size - 1))
+            next_cursor = mapping[cursor_start:cursor_end]
+        body = b'{"entries":[' + mapping[start:end] + b'],"nextCursor":' + next_cursor + b"}"
+        return f"lbs-{digest:08x}-{size}", body
+
+
+def init_leaderboard_snapshot(app: Flask) -> Optional[LeaderboardSnapshot]:
+    """Configure the shared snapshot when ``LEADERBOARD_SNAPSHOT_PATH`` is set.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        Optional[LeaderboardSnapshot]: Snapshot stored in
+        ``app.extensions["leaderboard_snapshot"]``, or ``None`` when disabled.
+    """
+    path = app.config.get("LEADERBOARD_SNAPSHOT_PATH")
+    snapshot = None
+    if path:
+        snapshot = LeaderboardSnapshot(
+            app,
+            path,
+            interval=float(app.config["LEADERBOARD_SNAPSHOT_INTERVAL"]),
+            top_n=int(app.config["LEADERBOARD_SNAPSHOT_TOP_N"]),
+            max_age=float(app.config["LEADERBOARD_SNAPSHOT_MAX_AGE"]),
+        )
+    app.extensions["leaderboard_snapshot"] = snapshot
+    return snapshot
+
+
+def get_leaderboard_snapshot() -> Optional[LeaderboardSnapshot]:
+    """Return the shared snapshot of the current Flask app.
+
+    Returns:
+        Optional[LeaderboardSnapshot]: Snapshot, or ``None`` when disabled.
+    """
+    return current_app.extensions.get("leaderboard_snapshot")
@@ -0,0 +1,250 @@
+"""Daily, weekly and season leaderboards.
+
+The lifetime leaderboard ranks ``Profile.coins``, so long-time players stay
+on top forever. Windowed leaderboards rank the coins earned since the start
+of the current window instead:
+
+- ``"day"``: UTC calendar day;
+- ``"week"``: ISO week, starting Monday 00:00 UTC;
+- ``"season"``: ``LEADERBOARD_SEASON_DAYS`` days, counted from
+  ``LEADERBOARD_SEASON_START``.
+
+Counters:
+    Every profile write that raises the balance (with
+    ``LEADERBOARD_WINDOW_VERIFIED_ONLY``: only by a replay-validated gain,
+    see :func:`server.score_events.record_score_event`) adds the gain to one :class:`server.models.WindowScore` row per window, keyed by the
+    window's start (see :func:`record_window_gain`). Gains are collected on
+    ``db.session`` and written by one ``INSERT ... ON CONFLICT DO UPDATE``
+    right before its commit, in the same transaction as the profile write,
+    so a batch of snapshots costs one extra statement and a rolled-back
+    write leaves no gain behind.
+
+Ranking:
+    :class:`WindowLeaderboard` reads only the rows of the current window,
+    through ``ix_window_scores_leaderboard``, with the same keyset pages as
+    :class:`server.leaderboard.DatabaseLeaderboard`. A new window simply
+    starts with no rows.
+
+Rotation:
+    :func:`rotate_windows` (run by the score rollup job, see
+    :mod:`server.score_events`) copies the top ``LEADERBOARD_ARCHIVE_TOP_N``
+    of every ended window into :class:`server.models.WindowArchive` and
+    deletes its counters, so the table only holds live windows.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import db
+from .leaderboard import DatabaseLeaderboard
+from .models import WindowArchive, WindowScore
+
+WINDOWS = ("day", "week", "season")
+PENDING_GAINS = "window_gains"
+
+
+def window_start(moment: datetime, window: str, config: Optional[Mapping[str, Any]] = None) -> datetime:
+    """Return the start of the window containing ``moment``.
+
+    Args:
+        moment: Naive UTC timestamp.
+        window: Name from :data:`WINDOWS`.
+        config: App config (defaults to the current app's); read for seasons.
+
+    Returns:
+        datetime: Naive UTC start of the window.
+    """
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "day":
+        return day
+    if window == "week":
+        return day - timedelta(days=day.weekday())
+    config = config if config is not None else current_app.config
+    origin = datetime.fromisoformat(config["LEADERBOARD_SEASON_START"])
+    length = timedelta(days=config["LEADERBOARD_SEASON_DAYS"])
+    return origin + length * ((moment - origin) // length)
+
+
+def window_end(start: datetime, window: str, config: Optional[Mapping[str, Any]] = None) -> datetime:
+    """Return the end (exclusive) of the window starting at ``start``.
+
+    Args:
+        start: Value returned by :func:`window_start`.
+        window: Name from :data:`WINDOWS`.
+        config: App config (defaults to the current app's); read for seasons.
+
+    Returns:
+        datetime: Naive UTC start of the next window.
+    """
+    if window == "day":
+        return start + timedelta(days=1)
+    if window == "week":
+        return start + timedelta(weeks=1)
+    config = config if config is not None else current_app.config
+    return start + timedelta(days=config["LEADERBOARD_SEASON_DAYS"])
+
+
+def record_window_gain(user_id: int, coins: int) -> None:
+    """Queue coins earned by a profile write for the windowed counters.
+
+    Call before committing the write; non-positive amounts are ignored.
+    Window starts are resolved here, with the app config at hand, so the
+    commit hook needs no app context.
+
+    Args:
+        user_id: Owner of the profile.
+        coins: Coins earned by the write.
+
+    Side Effects:
+        Stores the gain in ``db.session.info``; it is written just before
+        the commit (see :func:`_write_pending_gains`) and dropped on rollback.
+    """
+    if coins <= 0:
+        return
+    moment = datetime.utcnow()
+    starts = tuple((window, window_start(moment, window)) for window in WINDOWS)
+    db.session.info.setdefault(PENDING_GAINS, []).append((user_id, coins, moment, starts))
+
+
+@event.listens_for(db.session, "before_commit")
+def _write_pending_gains(session: Session) -> None:
+    gains = session.info.pop(PENDING_GAINS, None)
+    if not gains:
+        return
+    rows: Dict[Tuple[str, datetime, int], Dict[str, Any]] = {}
+    for user_id, coins, moment, starts in gains:
+        for window, start in starts:
+            key = (window, start, user_id)
+            row = rows.get(key)
+            if row is None:
+                rows[key] = {"period": window, "bucket_start": start, "user_id": user_id, "coins": coins, "updated_at": moment}
+            else:
+                row["coins"] += coins
+                row["updated_at"] = max(row["updated_at"], moment)
+    _upsert(session, list(rows.values()))
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_pending_gains(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_GAINS, None)
+
+
+def _upsert(session: Session, rows: List[Dict[str, Any]]) -> None:
+    """Add ``rows`` to the counters with one statement where supported."""
+    table = WindowScore.__table__
+    dialect = session.get_bind(WindowScore).dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        session.execute(
+            insert.on_conflict_do_update(
+                index_elements=[table.c.period, table.c.bucket_start, table.c.user_id],
+                set_={"coins": table.c.coins + insert.excluded.coins, "updated_at": insert.excluded.updated_at},
+            ),
+            rows,
+        )
+        return
+    # Generic fallback: per-row update, insert when missing.
+    for row in rows:
+        updated = session.execute(
+            table.update()
+            .where(
+                table.c.period == row["period"],
+                table.c.bucket_start == row["bucket_start"],
+                table.c.user_id == row["user_id"],
+            )
+            .values(coins=table.c.coins + row["coins"], updated_at=row["updated_at"])
+        ).rowcount
+        if not updated:
+            session.execute(table.insert().values(**row))
+
+
+class WindowLeaderboard(DatabaseLeaderboard):
+    """Keyset pages of one leaderboard window.
+
+    Same interface as :class:`server.leaderboard.DatabaseLeaderboard`; every
+    query is restricted to the rows of ``(window, start)`` and served by
+    ``ix_window_scores_leaderboard``.
+
+    Args:
+        session: Session to query.
+        window: Name from :data:`WINDOWS`.
+        start: Window start (see :func:`window_start`).
+    """
+
+    model = WindowScore
+
+    def __init__(self, session: Session, window: str, start: datetime):
+        self.period = window
+        self.start = start
+        super().__init__(session)
+
+    def _ranking_columns(self):
+        return WindowScore.coins, WindowScore.updated_at, WindowScore.user_id
+
+    def _scope(self, query):
+        return query.where(WindowScore.period == self.period, WindowScore.bucket_start == self.start)
+
+
+def rotate_windows(now: Optional[datetime] = None, top_n: Optional[int] = None) -> Dict[str, int]:
+    """Archive and drop the counters of ended windows.
+
+    A window is rotated ``SCORE_ROLLUP_SETTLE`` seconds after its end, so
+    writes in flight at the boundary land before it is archived. Each
+    window is archived in its own transaction; when another process archived
+    it first, the insert conflicts and this one only rolls back.
+
+    Args:
+        now: Reference UTC time (defaults to now).
+        top_n: Standings kept per window (default
+            ``LEADERBOARD_ARCHIVE_TOP_N``).
+
+    Returns:
+        Dict[str, int]: ``archivedWindows`` and ``expiredScores`` (deleted
+        counter rows).
+
+    Side Effects:
+        Inserts :class:`server.models.WindowArchive` rows, deletes
+        :class:`server.models.WindowScore` rows and commits.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    top_n = config["LEADERBOARD_ARCHIVE_TOP_N"] if top_n is None else top_n
+    cutoff = now - timedelta(seconds=config["SCORE_ROLLUP_SETTLE"])
+    archived = expired = 0
+    for window in WINDOWS:
+        starts = db.session.execute(
+            db.select(WindowScore.bucket_start)
+            .where(WindowScore.period == window, WindowScore.bucket_start < window_start(cutoff, window, config))
+            .distinct()
+        ).scalars().all()
+        for start in starts:
+            if window_end(start, window, config) > cutoff:
+                continue
+            already = db.session.execute(
+                db.select(WindowArchive.rank).where(WindowArchive.period == window, WindowArchive.bucket_start == start).limit(1)
+            ).first()
+            try:
+                if already is None:
+                    entries = WindowLeaderboard(db.session, window, start).page_after(None, top_n)
+                    db.session.add_all(
+                        WindowArchive(
+                            period=window, bucket_start=start, rank=entry.rank,
+                            user_id=entry.user_id, coins=entry.coins, updated_at=entry.updated_at,
+                        )
+                        for entry in entries
+                    )
+                    archived += 1
+                expired += db.session.execute(
+                    db.delete(WindowScore).where(WindowScore.period == window, WindowScore.bucket_start == start)
+                ).rowcount
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+    return {"archivedWindows": archived, "expiredScores": expired}
+
@@ -0,0 +1,419 @@
+"""Request and database instrumentation exposed in Prometheus text format.
+
+:func:`init_metrics` registers lightweight hooks on the app:
+
+- ``before_request`` / ``after_request`` / ``teardown_request`` record a
+  latency histogram and status counters per endpoint (``request.endpoint``,
+  e.g. ``"api.sync"``) and an in-flight gauge;
+- SQLAlchemy ``before_cursor_execute`` / ``after_cursor_execute`` listeners
+  on every engine count statements and DB time for the current request.
+
+``GET /api/metrics`` renders everything with :func:`render_metrics`,
+together with the stats of the token cache and the password hasher.
+
+Notes:
+    Recording is a handful of dictionary updates under one lock per request,
+    cheap enough to leave on permanently.
+
+    Each process keeps its own counters. When ``METRICS_MULTIPROC_DIR`` is
+    set, every process writes a snapshot of its counters to
+    ``<dir>/metrics-<pid>.json`` (at most once per
+    ``METRICS_FLUSH_INTERVAL`` seconds and on every scrape) and
+    :func:`render_metrics` sums all snapshots, so any gunicorn worker can
+    answer a scrape for the whole server. Counters of exited workers are
+    kept; gauges only count live processes. Clear the directory on deploy.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from .database import db
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+PREFIX = "match3"
+
+_UNMATCHED = "unmatched"
+
+
+class Histogram:
+    """Fixed-bucket histogram.
+
+    Args:
+        buckets: Ascending upper bounds (``+Inf`` is implicit).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, counts: List[int], total: float, count: int) -> None:
+        """Add the raw state of another histogram with the same buckets."""
+        for index, value in enumerate(counts):
+            self.counts[index] += value
+        self.total += total
+        self.count += count
+
+    def to_list(self) -> list:
+        """Return the raw state as ``[counts, total, count]``."""
+        return [list(self.counts), self.total, self.count]
+
+
+class MetricsRegistry:
+    """Process-local request and database counters.
+
+    All public methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+        self.responses: Dict[Tuple[str, str, str], int] = {}
+        self.in_flight = 0
+
+    def request_started(self) -> None:
+        """Increment the in-flight gauge."""
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self) -> None:
+        """Decrement the in-flight gauge."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, endpoint: str, method: str, status: int, seconds: float, statements: int, db_seconds: float) -> None:
+        """Record a finished request.
+
+        Args:
+            endpoint: Flask endpoint name.
+            method: HTTP method.
+            status: Response status code.
+            seconds: Wall-clock duration of the request.
+            statements: Number of SQL statements executed.
+            db_seconds: Time spent executing those statements.
+        """
+        key = (endpoint, method)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.statements[key] = Histogram(STATEMENT_BUCKETS)
+                self.db_seconds[key] = 0.0
+            histogram.observe(seconds)
+            self.statements[key].observe(statements)
+            self.db_seconds[key] += db_seconds
+            status_key = (endpoint, method, str(status))
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-friendly copy of all counters.
+
+        Returns:
+            Dict[str, Any]: Snapshot accepted by :meth:`merge`.
+        """
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "inFlight": self.in_flight,
+                "latency": [[list(key), hist.to_list()] for key, hist in self.latency.items()],
+                "statements": [[list(key), hist.to_list()] for key, hist in self.statements.items()],
+                "dbSeconds": [[list(key), value] for key, value in self.db_seconds.items()],
+                "responses": [[list(key), value] for key, value in self.responses.items()],
+            }
+
+    def merge(self, snapshot: Dict[str, Any], include_gauges: bool = True) -> None:
+        """Add the counters of a snapshot into this registry.
+
+        Args:
+            snapshot: Result of :meth:`snapshot` (possibly from another process).
+            include_gauges: Whether to add the in-flight gauge as well.
+        """
+        with self._lock:
+            if include_gauges:
+                self.in_flight += snapshot["inFlight"]
+            for key, state in snapshot["latency"]:
+                self.latency.setdefault(tuple(key), Histogram(LATENCY_BUCKETS)).merge(*state)
+            for key, state in snapshot["statements"]:
+                self.statements.setdefault(tuple(key), Histogram(STATEMENT_BUCKETS)).merge(*state)
+            for key, value in snapshot["dbSeconds"]:
+                self.db_seconds[tuple(key)] = self.db_seconds.get(tuple(key), 0.0) + value
+            for key, value in snapshot["responses"]:
+                self.responses[tuple(key)] = self.responses.get(tuple(key), 0) + value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render_histogram(lines: List[str], name: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+    for (endpoint, method), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_number(bound)
+            lines.append(f"{name}_bucket{_labels(endpoint=endpoint, method=method, le=le)} {cumulative}")
+        labels = _labels(endpoint=endpoint, method=method)
+        lines.append(f"{name}_sum{labels} {_format_number(histogram.total)}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+
+def _component_stats(app: Flask) -> Iterable[Tuple[str, str, str, float]]:
+    """Yield ``(name, type, help, value)`` for app components already in use.
+
+    Components are read from ``app.extensions`` directly so a scrape never
+    creates them (e.g. it must not start the hashing process pool).
+    """
+    token_cache = app.extensions.get("token_cache")
+    if token_cache is not None:
+        stats = token_cache.stats()
+        yield "token_cache_hits_total", "counter", "Verified-token cache hits.", stats["hits"]
+        yield "token_cache_misses_total", "counter", "Verified-token cache misses.", stats["misses"]
+        yield "token_cache_evictions_total", "counter", "Verified-token cache evictions.", stats["evictions"]
+        yield "token_cache_size", "gauge", "Entries in the verified-token cache.", stats["size"]
+    hasher = app.extensions.get("password_hasher")
+    if hasher is not None:
+        stats = hasher.stats()
+        yield "password_hash_pending", "gauge", "Queued plus running password hashes.", stats["pending"]
+        yield "password_hash_rejected_total", "counter", "Hashes rejected because the queue was full.", stats["rejected"]
+    rank_index = app.extensions.get("rank_index")
+    if rank_index is not None:
+        yield "leaderboard_players", "gauge", "Players in the in-memory rank index.", len(rank_index)
+    admission = app.extensions.get("admission")
+    if admission is not None:
+        stats = admission.stats()
+        yield "admission_rejected_client_total", "counter", "Requests rejected by a per-client rate limit (429).", stats["rejectedClient"]
+        yield "admission_rejected_global_total", "counter", "Requests rejected by a server-wide rate limit (503).", stats["rejectedGlobal"]
+        yield "admission_rejected_concurrency_total", "counter", "Requests rejected because the concurrency gate was full (503).", stats["rejectedConcurrency"]
+        yield "admission_active", "gauge", "Admission-controlled handlers currently running.", stats["active"]
+    idempotency = app.extensions.get("idempotency")
+    if idempotency is not None:
+        stats = idempotency.stats()
+        yield "idempotency_keys", "gauge", "Idempotency keys held for replay.", stats["size"]
+        yield "idempotency_replayed_total", "counter", "Retried requests answered from a stored response.", stats["replayed"]
+        yield "idempotency_mismatched_total", "counter", "Idempotency keys reused with a different body (422).", stats["mismatched"]
+        yield "idempotency_in_progress_total", "counter", "Retries that arrived while the first request ran (409).", stats["inProgress"]
+    write_behind = app.extensions.get("write_behind")
+    if write_behind is not None:
+        stats = write_behind.stats()
+        yield "write_behind_pending", "gauge", "Players with a queued, unwritten sync.", stats["pending"]
+        yield "write_behind_syncs_total", "counter", "Syncs accepted by the write-behind queue.", stats["syncs"]
+        yield "write_behind_rows_total", "counter", "Coalesced profile rows written by the flusher.", stats["rows"]
+        yield "write_behind_flushes_total", "counter", "Write-behind transactions committed.", stats["flushes"]
+        yield "write_behind_failures_total", "counter", "Write-behind transactions that failed.", stats["failures"]
+        yield "write_behind_lag_seconds", "gauge", "Oldest queued sync age at the last flush commit.", stats["lastLag"]
+        yield "write_behind_lag_max_seconds", "gauge", "Largest flush lag observed.", stats["maxLag"]
+
+
+def _snapshot_path(directory: str, pid: int) -> Path:
+    return Path(directory) / f"metrics-{pid}.json"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot(app: Flask) -> None:
+    """Write this process's counters to ``METRICS_MULTIPROC_DIR``.
+
+    Args:
+        app: Flask application instance.
+
+    Notes:
+        The file is replaced atomically (write to a temp file, then rename),
+        so readers never see a partial snapshot. No-op when the directory is
+        not configured.
+    """
+    directory = app.config.get("METRICS_MULTIPROC_DIR")
+    if not directory:
+        return
+    registry: MetricsRegistry = app.extensions["metrics"]
+    snapshot = registry.snapshot()
+    snapshot["components"] = [list(item) for item in _component_stats(app)]
+    target = _snapshot_path(directory, snapshot["pid"])
+    temp = target.with_suffix(f".{threading.get_ident()}.tmp")
+    temp.write_text(json.dumps(snapshot), encoding="utf-8")
+    os.replace(temp, target)
+    app.extensions["metrics_last_flush"] = time.monotonic()
+
+
+def _collect(app: Flask) -> Tuple[MetricsRegistry, Dict[str, Tuple[str, str, float]]]:
+    """Return the counters to render: local, or merged across processes."""
+    local: MetricsRegistry = app.extensions["metrics"]
+    directory = app.config.get("METRICS_MULTIPROC_DIR")
+    if not directory:
+        components = {name: (kind, text, value) for name, kind, text, value in _component_stats(app)}
+        return local, components
+
+    write_snapshot(app)
+    merged = MetricsRegistry()
+    components: Dict[str, Tuple[str, str, float]] = {}
+    for path in sorted(Path(directory).glob("metrics-*.json")):
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        alive = _pid_alive(snapshot["pid"])
+        merged.merge(snapshot, include_gauges=alive)
+        for name, kind, text, value in snapshot.get("components", []):
+            if kind == "gauge" and not alive:
+                continue
+            previous = components.get(name)
+            components[name] = (kind, text, value + (previous[2] if previous else 0))
+    return merged, components
+
+
+def render_metrics(app: Optional[Flask] = None) -> str:
+    """Render all metrics in the Prometheus text exposition format (0.0.4).
+
+    Args:
+        app: Flask application (defaults to ``current_app``).
+
+    Returns:
+        str: Exposition text.
+    """
+    app = app or current_app._get_current_object()
+    registry, components = _collect(app)
+    with registry._lock:
+        lines = [
+            f"# HELP {PREFIX}_http_request_duration_seconds Request latency per endpoint.",
+            f"# TYPE {PREFIX}_http_request_duration_seconds histogram",
+        ]
+        _render_histogram(lines, f"{PREFIX}_http_request_duration_seconds", registry.latency)
+
+        lines += [
+            f"# HELP {PREFIX}_http_requests_total Finished requests per endpoint and status.",
+            f"# TYPE {PREFIX}_http_requests_total counter",
+        ]
+        for (endpoint, method, status), count in sorted(registry.responses.items()):
+            lines.append(f"{PREFIX}_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+        lines += [
+            f"# HELP {PREFIX}_http_requests_in_flight Requests currently being served.",
+            f"# TYPE {PREFIX}_http_requests_in_flight gauge",
+            f"{PREFIX}_http_requests_in_flight {registry.in_flight}",
+            f"# HELP {PREFIX}_db_statements_per_request SQL statements executed per request.",
+            f"# TYPE {PREFIX}_db_statements_per_request histogram",
+        ]
+        _render_histogram(lines, f"{PREFIX}_db_statements_per_request", registry.statements)
+
+        lines += [
+            f"# HELP {PREFIX}_db_duration_seconds_total Time spent executing SQL per endpoint.",
+            f"# TYPE {PREFIX}_db_duration_seconds_total counter",
+        ]
+        for (endpoint, method), seconds in sorted(registry.db_seconds.items()):
+            lines.append(
+                f"{PREFIX}_db_duration_seconds_total{_labels(endpoint=endpoint, method=method)} {_format_number(seconds)}"
+            )
+
+    for name, (kind, text, value) in sorted(components.items()):
+        lines += [
+            f"# HELP {PREFIX}_{name} {text}",
+            f"# TYPE {PREFIX}_{name} {kind}",
+            f"{PREFIX}_{name} {_format_number(value)}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _install_sql_listeners(engine) -> None:
+    """Count statements and DB time of the current request on ``engine``."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, _cursor, _statement, _parameters, _context, _executemany):
+        started = conn.info["_metrics_started"].pop()
+        if has_request_context():
+            sql = g.get("_metrics_sql")
+            if sql is not None:
+                sql[0] += 1
+                sql[1] += time.perf_counter() - started
+
+
+def init_metrics(app: Flask) -> MetricsRegistry:
+    """Register request and SQL instrumentation on an app.
+
+    Args:
+        app: Flask application instance. The database must already be
+            initialized (see :func:`server.database.init_db`).
+
+    Returns:
+        MetricsRegistry: Registry stored in ``app.extensions["metrics"]``.
+    """
+    registry = MetricsRegistry()
+    app.extensions["metrics"] = registry
+    app.extensions["metrics_last_flush"] = 0.0
+    directory = app.config.get("METRICS_MULTIPROC_DIR")
+    if directory:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    flush_interval = float(app.config.get("METRICS_FLUSH_INTERVAL", 5))
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _install_sql_listeners(engine)
+
+    @app.before_request
+    def _metrics_start():
+        registry.request_started()
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = [0, 0.0]
+
+    @app.after_request
+    def _metrics_observe(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            statements, db_seconds = g._metrics_sql
+            registry.observe(
+                request.endpoint or _UNMATCHED,
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                statements,
+                db_seconds,
+            )
+        if directory and time.monotonic() - app.extensions["metrics_last_flush"] >= flush_interval:
+            write_snapshot(app)
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(_exc=None):
+        if "_metrics_sql" in g:
+            registry.request_finished()
+
+    return registry
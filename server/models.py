@@ -5,15 +5,42 @@ The backend stores two main entities:
 - :class:`User` with authentication data (nickname + password hash).
 - :class:`Profile` with gameplay snapshot (coins/upgrades/stats).
 
+Every profile write also appends a :class:`ScoreEvent`; the rollup job in
+:mod:`server.score_events` folds those events into
+:class:`PlayerScoreRollup` / :class:`GlobalScoreRollup` buckets, tracking its
+progress in :class:`RollupWatermark`. Coins earned per daily, weekly and
+season window are counted in :class:`WindowScore` and archived into
+:class:`WindowArchive` once a window ends (see
+:mod:`server.leaderboard_windows`).
+
+Upgrade levels and stat counters are stored as typed rows
+(:class:`ProfileUpgrade`, :class:`ProfileStat`) so they can be indexed and
+aggregated in SQL, e.g. "players with ``dragon-siege`` >= 3" or
+"total ``match5``".
+
 Notes:
+    The ``User.profile`` / ``Profile.user`` relationships are
+    ``lazy="raise_on_sql"``: touching one that was not eager-loaded raises
+    instead of silently issuing a query per row (N+1). Load them explicitly
+    (``joinedload``/``selectinload``) or select the needed columns.
+
     The profile row is auto-created on user creation via an SQLAlchemy
     ``after_insert`` hook.
+
+    The ``upgrades_snapshot``/``stats_snapshot`` columns hold the typed rows
+    pre-rendered as compact JSON objects. They are refreshed on every write
+    (see :meth:`Profile.apply_upgrades`) so responses can splice them in
+    without loading the rows or re-encoding them. Legacy databases, where
+    these columns were the only storage, are migrated by
+    :func:`migrate_snapshot_columns`.
 """
 
+import json
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Mapping, NamedTuple, Optional
 
-from sqlalchemy import event
+from sqlalchemy import event, func
+from sqlalchemy.orm import attribute_keyed_dict
 
 from .database import db
 
@@ -24,22 +51,34 @@ class User(db.Model):
     Attributes:
         id: Primary key.
         nickname: Unique nickname used for login/leaderboard.
+        nickname_lower: :func:`normalize_nickname` of ``nickname``, set on
+            insert; indexed for case-insensitive prefix search (see
+            :mod:`server.players`).
         password_hash: Hashed password (generated by Werkzeug).
         created_at: UTC timestamp when the user was created.
-        profile: One-to-one relationship to :class:`Profile`.
+        profile: One-to-one relationship to :class:`Profile` (never
+            lazy-loaded, see the module notes).
     """
     __tablename__ = "users"
 
     id = db.Column(db.Integer, primary_key=True)
     nickname = db.Column(db.String(40), unique=True, nullable=False, index=True)
+    nickname_lower = db.Column(db.String(40))
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Serves prefix search as a range scan in (nickname_lower, id) order,
+        # which is also the keyset pagination order.
+        db.Index("ix_users_nickname_lower", "nickname_lower", "id"),
+    )
+
     profile = db.relationship(
         "Profile",
         uselist=False,
         back_populates="user",
         cascade="all, delete-orphan",
+        lazy="raise_on_sql",
     )
 
 
@@ -52,10 +91,17 @@ class Profile(db.Model):
         id: Primary key.
         user_id: Foreign key to :class:`User`.
         coins: Integer coin balance.
-        upgrades_snapshot: JSON string representing upgrade levels.
-        stats_snapshot: JSON string representing aggregated statistics.
+        upgrades_snapshot: :attr:`upgrade_rows` rendered as a JSON object
+            (see :func:`render_counters`), refreshed on write.
+        stats_snapshot: :attr:`stat_rows` rendered as a JSON object,
+            refreshed on write.
         updated_at: UTC timestamp of last update.
-        user: Back-reference to :class:`User`.
+        version: Optimistic-concurrency counter. SQLAlchemy adds
+            ``WHERE version = <loaded>`` to every ORM update and bumps it, so
+            concurrent writers raise :class:`sqlalchemy.orm.exc.StaleDataError`.
+        user: Back-reference to :class:`User` (never lazy-loaded).
+        upgrade_rows: Upgrade levels keyed by upgrade id.
+        stat_rows: Stat counters keyed by stat name.
     """
     __tablename__ = "profiles"
 
@@ -65,29 +111,569 @@ class Profile(db.Model):
     upgrades_snapshot = db.Column(db.Text, default="{}")
     stats_snapshot = db.Column(db.Text, default="{}")
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    user = db.relationship("User", back_populates="profile", lazy="raise_on_sql")
+    upgrade_rows = db.relationship(
+        "ProfileUpgrade",
+        collection_class=attribute_keyed_dict("upgrade_id"),
+        cascade="all, delete-orphan",
+    )
+    stat_rows = db.relationship(
+        "ProfileStat",
+        collection_class=attribute_keyed_dict("name"),
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        # Serves leaderboard pages ordered by (coins DESC, updated_at DESC,
+        # user_id DESC) as a backward index range scan, at any depth.
+        db.Index("ix_profiles_leaderboard", "coins", "updated_at", "user_id"),
+        # Serves incremental exports ("changed since", see server.export).
+        db.Index("ix_profiles_updated_at", "updated_at", "user_id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+    def upgrade_levels(self) -> Dict[str, int]:
+        """Return upgrade levels as a plain dictionary.
+
+        Returns:
+            Dict[str, int]: Mapping of upgrade id to level.
+        """
+        return {key: row.level for key, row in self.upgrade_rows.items()}
+
+    def stat_counters(self) -> Dict[str, int]:
+        """Return stat counters as a plain dictionary.
+
+        Returns:
+            Dict[str, int]: Mapping of stat name to value.
+        """
+        return {key: row.value for key, row in self.stat_rows.items()}
 
-    user = db.relationship("User", back_populates="profile")
+    def apply_upgrades(self, levels: Mapping[str, int], replace: bool) -> bool:
+        """Write upgrade levels, touching only rows whose value changed.
 
-    def to_dict(self) -> Dict[str, Any]:
+        Args:
+            levels: Mapping of upgrade id to level.
+            replace: When ``True``, ids missing from ``levels`` are deleted
+                (full snapshot); otherwise ``levels`` is merged (delta).
+
+        Returns:
+            bool: ``True`` if any row was added, changed or removed.
+
+        Side Effects:
+            Re-renders :attr:`upgrades_snapshot` when something changed.
+        """
+        changed = False
+        for key, level in levels.items():
+            row = self.upgrade_rows.get(key)
+            if row is None:
+                self.upgrade_rows[key] = ProfileUpgrade(upgrade_id=key, level=level)
+                changed = True
+            elif row.level != level:
+                row.level = level
+                changed = True
+        if replace:
+            for key in set(self.upgrade_rows) - set(levels):
+                del self.upgrade_rows[key]
+                changed = True
+        if changed:
+            self.upgrades_snapshot = render_counters(self.upgrade_levels())
+        return changed
+
+    def apply_stats(self, counters: Mapping[str, int], replace: bool) -> bool:
+        """Write stat counters, touching only rows whose value changed.
+
+        Args:
+            counters: Mapping of stat name to value.
+            replace: When ``True``, names missing from ``counters`` are
+                deleted (full snapshot); otherwise ``counters`` is merged.
+
+        Returns:
+            bool: ``True`` if any row was added, changed or removed.
+
+        Side Effects:
+            Re-renders :attr:`stats_snapshot` when something changed.
+        """
+        changed = False
+        for key, value in counters.items():
+            row = self.stat_rows.get(key)
+            if row is None:
+                self.stat_rows[key] = ProfileStat(name=key, value=value)
+                changed = True
+            elif row.value != value:
+                row.value = value
+                changed = True
+        if replace:
+            for key in set(self.stat_rows) - set(counters):
+                del self.stat_rows[key]
+                changed = True
+        if changed:
+            self.stats_snapshot = render_counters(self.stat_counters())
+        return changed
+
+    def snapshot(self) -> "ProfileSnapshot":
+        """Capture the response columns of a loaded profile.
+
+        Call after a flush and before the commit: the values stay valid once
+        the commit expires the instance, so rendering them costs no query.
+
+        Returns:
+            ProfileSnapshot: Current column values.
+        """
+        return ProfileSnapshot(self.coins, self.upgrades_snapshot, self.stats_snapshot, self.updated_at, self.version)
+
+    def to_dict(self, nickname: str) -> Dict[str, Any]:
         """Serialize the profile into a JSON-friendly dictionary.
 
+        Args:
+            nickname: Owner nickname (passed in rather than read through
+                :attr:`user`, which would cost a query).
+
         Returns:
             Dict[str, Any]: Dictionary with keys ``nickname``, ``coins``,
-            ``upgrades``, ``stats``, and ``updatedAt``.
-
-        Notes:
-            ``upgrades`` and ``stats`` are returned as the stored JSON strings
-            (no parsing is performed in this method).
+            ``upgrades``, ``stats``, ``updatedAt`` and ``version``.
         """
         return {
-            "nickname": self.user.nickname,
+            "nickname": nickname,
             "coins": self.coins,
-            "upgrades": self.upgrades_snapshot,
-            "stats": self.stats_snapshot,
+            "upgrades": json.loads(self.upgrades_snapshot or "{}"),
+            "stats": json.loads(self.stats_snapshot or "{}"),
             "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
+            "version": self.version,
         }
 
 
+class ProfileSnapshot(NamedTuple):
+    """Response columns of a profile, detached from the session.
+
+    Has the attribute names of the ``server.routes.PROFILE_COLUMNS`` rows, so
+    either can be rendered by the same serializers.
+
+    Attributes:
+        coins: Coin balance.
+        upgrades_snapshot: Upgrade levels as compact JSON.
+        stats_snapshot: Stat counters as compact JSON.
+        updated_at: UTC timestamp of the last update.
+        version: Optimistic-concurrency counter.
+    """
+    coins: int
+    upgrades_snapshot: str
+    stats_snapshot: str
+    updated_at: Optional[datetime]
+    version: int
+
+    @classmethod
+    def initial(cls, created_at: Optional[datetime]) -> "ProfileSnapshot":
+        """Return the state of the profile created with a new user.
+
+        Args:
+            created_at: ``User.created_at``, which is also the profile's
+                ``updated_at`` (see :func:`create_profile_after_user_insert`).
+
+        Returns:
+            ProfileSnapshot: Empty profile at version 1.
+        """
+        return cls(0, "{}", "{}", created_at, 1)
+
+
+class ProfileUpgrade(db.Model):
+    """Level of a single upgrade owned by a profile.
+
+    Attributes:
+        profile_id: Foreign key to :class:`Profile` (part of the primary key).
+        upgrade_id: Upgrade identifier, e.g. ``"dragon-siege"`` (see
+            ``constants/Upgrades.ts``).
+        level: Purchased level.
+    """
+    __tablename__ = "profile_upgrades"
+
+    profile_id = db.Column(db.Integer, db.ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True)
+    upgrade_id = db.Column(db.String(64), primary_key=True)
+    level = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index("ix_profile_upgrades_upgrade_level", "upgrade_id", "level"),)
+
+    @classmethod
+    def count_at_least(cls, upgrade_id: str, level: int) -> int:
+        """Count profiles owning ``upgrade_id`` at ``level`` or higher.
+
+        Args:
+            upgrade_id: Upgrade identifier.
+            level: Minimum level.
+
+        Returns:
+            int: Number of profiles (index range scan on ``(upgrade_id, level)``).
+        """
+        return db.session.execute(
+            db.select(func.count()).where(cls.upgrade_id == upgrade_id, cls.level >= level)
+        ).scalar_one()
+
+
+class ProfileStat(db.Model):
+    """Value of a single stat counter of a profile.
+
+    Attributes:
+        profile_id: Foreign key to :class:`Profile` (part of the primary key).
+        name: Stat name, e.g. ``"match5"`` (see ``store/StatStore.ts``).
+        value: Counter value.
+        updated_at: UTC timestamp of the last change of this counter.
+    """
+    __tablename__ = "profile_stats"
+
+    profile_id = db.Column(db.Integer, db.ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True)
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_profile_stats_name_value", "name", "value"),
+        db.Index("ix_profile_stats_name_updated", "name", "updated_at"),
+    )
+
+    @classmethod
+    def total(cls, name: str, touched_since: Optional[datetime] = None) -> int:
+        """Sum a stat counter over all profiles.
+
+        Counters are lifetime values, so this is not the amount gained in a
+        time window: with ``touched_since`` the full value of every counter
+        changed at or after that time is summed. Per-window coin totals come
+        from the rollups of :mod:`server.score_events` instead.
+
+        Args:
+            name: Stat name.
+            touched_since: Only include counters whose ``updated_at`` is at
+                or after this UTC time (e.g. "among recently active players").
+
+        Returns:
+            int: Sum of matching counters (``0`` when none match).
+        """
+        query = db.select(func.coalesce(func.sum(cls.value), 0)).where(cls.name == name)
+        if touched_since is not None:
+            query = query.where(cls.updated_at >= touched_since)
+        return db.session.execute(query).scalar_one()
+
+
+class ScoreEvent(db.Model):
+    """Append-only record of one profile write.
+
+    Rows are never updated; they are folded into the rollup tables by
+    :func:`server.score_events.roll_up` and deleted by
+    :func:`server.score_events.compact` once rolled up and old enough.
+
+    Attributes:
+        id: Monotonic primary key; the rollup watermark refers to it.
+        user_id: Foreign key to :class:`User`.
+        created_at: UTC timestamp of the write.
+        coins_delta: Balance change made by the write (negative when coins
+            were spent).
+        coins: Balance after the write.
+    """
+    __tablename__ = "score_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    coins_delta = db.Column(db.Integer, nullable=False, default=0)
+    coins = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_score_events_created_at", "created_at"),
+        # Ids must never be reused after compaction deletes the newest rows,
+        # or new events would fall below the rollup watermark.
+        {"sqlite_autoincrement": True},
+    )
+
+
+class PlayerScoreRollup(db.Model):
+    """Score events of one player aggregated over an hour or a day.
+
+    Attributes:
+        user_id: Foreign key to :class:`User` (part of the primary key).
+        period: ``"hour"`` or ``"day"`` (part of the primary key).
+        bucket_start: UTC start of the bucket (part of the primary key).
+        coins_earned: Sum of positive balance changes.
+        coins_spent: Sum of negative balance changes, as a positive number.
+        syncs: Number of profile writes.
+        coins: Balance after the last write of the bucket.
+    """
+    __tablename__ = "player_score_rollups"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    coins_earned = db.Column(db.BigInteger, nullable=False, default=0)
+    coins_spent = db.Column(db.BigInteger, nullable=False, default=0)
+    syncs = db.Column(db.Integer, nullable=False, default=0)
+    coins = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Serves "top earners since X" and global recomputation of a bucket.
+        db.Index("ix_player_score_rollups_bucket", "period", "bucket_start", "coins_earned"),
+    )
+
+
+class GlobalScoreRollup(db.Model):
+    """Score events of all players aggregated over an hour or a day.
+
+    Attributes:
+        period: ``"hour"`` or ``"day"`` (part of the primary key).
+        bucket_start: UTC start of the bucket (part of the primary key).
+        players: Distinct players with at least one write (active players).
+        coins_earned: Sum of positive balance changes.
+        coins_spent: Sum of negative balance changes, as a positive number.
+        syncs: Number of profile writes.
+    """
+    __tablename__ = "global_score_rollups"
+
+    period = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    players = db.Column(db.Integer, nullable=False, default=0)
+    coins_earned = db.Column(db.BigInteger, nullable=False, default=0)
+    coins_spent = db.Column(db.BigInteger, nullable=False, default=0)
+    syncs = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RollupWatermark(db.Model):
+    """Progress of an incremental job over an append-only table.
+
+    Attributes:
+        name: Job name, e.g. ``"score_rollups"``.
+        last_event_id: Highest event id already processed.
+        updated_at: UTC timestamp of the last run that advanced it.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name = db.Column(db.String(32), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class WindowScore(db.Model):
+    """Coins a player earned during one leaderboard window.
+
+    Attributes:
+        period: ``"day"``, ``"week"`` or ``"season"`` (part of the primary key).
+        bucket_start: UTC start of the window (part of the primary key).
+        user_id: Foreign key to :class:`User` (part of the primary key).
+        coins: Sum of positive balance changes within the window.
+        updated_at: UTC timestamp of the last gain.
+    """
+    __tablename__ = "window_scores"
+
+    period = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    coins = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Serves the windowed leaderboard of one bucket like
+        # ix_profiles_leaderboard serves the lifetime one.
+        db.Index("ix_window_scores_leaderboard", "period", "bucket_start", "coins", "updated_at", "user_id"),
+    )
+
+
+class WindowArchive(db.Model):
+    """Final standing of a player in an ended leaderboard window.
+
+    Attributes:
+        period: ``"day"``, ``"week"`` or ``"season"`` (part of the primary key).
+        bucket_start: UTC start of the window (part of the primary key).
+        rank: 1-based final rank (part of the primary key).
+        user_id: Foreign key to :class:`User`.
+        coins: Coins earned within the window.
+        updated_at: UTC timestamp of the player's last gain in the window.
+    """
+    __tablename__ = "window_archive"
+
+    period = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    coins = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(db.DateTime)
+
+
+def normalize_nickname(nickname: str) -> str:
+    """Return the case-insensitive search form of a nickname.
+
+    Args:
+        nickname: Nickname or search prefix.
+
+    Returns:
+        str: Lowercased nickname.
+    """
+    return nickname.lower()
+
+
+def migrate_nickname_lower(batch_size: int = 1000) -> int:
+    """Fill ``users.nickname_lower`` for users created before the column.
+
+    Lowercasing happens in Python, as SQL ``lower()`` only folds ASCII on
+    SQLite. Cheap when nothing is left to fill.
+
+    Args:
+        batch_size: Number of users updated per round trip.
+
+    Returns:
+        int: Number of updated users.
+
+    Side Effects:
+        Writes to the database (one commit per batch).
+    """
+    users = User.__table__
+    migrated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(users.c.id, users.c.nickname).where(users.c.nickname_lower.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            return migrated
+        db.session.execute(
+            users.update().where(users.c.id == db.bindparam("user_id")).values(nickname_lower=db.bindparam("lower")),
+            [{"user_id": user_id, "lower": normalize_nickname(nickname)} for user_id, nickname in rows],
+        )
+        db.session.commit()
+        migrated += len(rows)
+
+
+def render_counters(counters: Mapping[str, int]) -> str:
+    """Render counters as the compact JSON object stored in the snapshot columns.
+
+    Args:
+        counters: Mapping of key to integer value.
+
+    Returns:
+        str: JSON object with sorted keys and no whitespace, e.g.
+        ``'{"match3":4,"red":12}'``.
+    """
+    return json.dumps(counters, sort_keys=True, separators=(",", ":"))
+
+
+def _legacy_counters(raw: Optional[str]) -> Dict[str, int]:
+    """Parse a legacy JSON snapshot into integer counters.
+
+    Args:
+        raw: Stored JSON string.
+
+    Returns:
+        Dict[str, int]: Numeric entries; anything else is dropped.
+    """
+    try:
+        data = json.loads(raw or "{}")
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        str(key)[:64]: int(value)
+        for key, value in data.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def migrate_snapshot_columns(batch_size: int = 1000) -> int:
+    """Reconcile the snapshot columns with the typed rows.
+
+    Two kinds of profiles are fixed up:
+
+    - legacy profiles whose JSON snapshot holds data but that have no typed
+      rows yet: the JSON is parsed into :class:`ProfileUpgrade` /
+      :class:`ProfileStat` rows;
+    - profiles that have typed rows but an empty snapshot (written before the
+      snapshot columns became render caches): the snapshot is rendered from
+      the rows.
+
+    Either way the column ends up as :func:`render_counters` of the typed
+    rows. ``updated_at`` is preserved so leaderboard order does not change.
+    The function is idempotent and cheap when nothing is left to reconcile.
+
+    Args:
+        batch_size: Number of profiles handled per round trip.
+
+    Returns:
+        int: Number of reconciled profiles.
+
+    Side Effects:
+        Writes to the database (one commit per batch).
+    """
+    profiles = Profile.__table__
+    kinds = (
+        # (snapshot column, typed table, key column, value column)
+        (profiles.c.upgrades_snapshot, ProfileUpgrade.__table__, "upgrade_id", "level"),
+        (profiles.c.stats_snapshot, ProfileStat.__table__, "name", "value"),
+    )
+    pending = []
+    for column, table, _, _ in kinds:
+        empty = db.or_(column.is_(None), column.in_(["{}", ""]))
+        has_rows = db.exists().where(table.c.profile_id == profiles.c.id)
+        pending.append(db.and_(db.not_(empty), db.not_(has_rows)))
+        pending.append(db.and_(empty, has_rows))
+
+    migrated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(profiles.c.id, profiles.c.upgrades_snapshot, profiles.c.stats_snapshot)
+            .where(db.or_(*pending))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return migrated
+        ids = [row[0] for row in rows]
+        rendered: Dict[int, Dict[str, str]] = {profile_id: {} for profile_id in ids}
+        for position, (column, table, key_name, value_name) in enumerate(kinds, start=1):
+            stored: Dict[int, Dict[str, int]] = {}
+            for profile_id, key, value in db.session.execute(
+                db.select(table.c.profile_id, table.c[key_name], table.c[value_name])
+                .where(table.c.profile_id.in_(ids))
+            ):
+                stored.setdefault(profile_id, {})[key] = value
+            inserts = []
+            for row in rows:
+                counters = stored.get(row[0])
+                if counters is None:
+                    counters = _legacy_counters(row[position])
+                    inserts.extend(
+                        {"profile_id": row[0], key_name: key, value_name: value}
+                        for key, value in counters.items()
+                    )
+                rendered[row[0]][column.name] = render_counters(counters)
+            if inserts:
+                db.session.execute(table.insert(), inserts)
+        db.session.execute(
+            profiles.update()
+            .where(profiles.c.id == db.bindparam("profile_id"))
+            .values(
+                upgrades_snapshot=db.bindparam("upgrades"),
+                stats_snapshot=db.bindparam("stats"),
+                updated_at=profiles.c.updated_at,
+            ),
+            [
+                {
+                    "profile_id": profile_id,
+                    "upgrades": columns["upgrades_snapshot"],
+                    "stats": columns["stats_snapshot"],
+                }
+                for profile_id, columns in rendered.items()
+            ],
+        )
+        db.session.commit()
+        migrated += len(rows)
+
+
+@event.listens_for(User, "before_insert")
+def set_nickname_lower_before_user_insert(mapper, connection, target: User):
+    """Derive :attr:`User.nickname_lower` from the nickname being inserted.
+
+    Args:
+        mapper: SQLAlchemy mapper (unused).
+        connection: Database connection (unused).
+        target: :class:`User` about to be inserted.
+    """
+    target.nickname_lower = normalize_nickname(target.nickname)
+
+
 @event.listens_for(User, "after_insert")
 def create_profile_after_user_insert(mapper, connection, target: User):
     """Create a default profile row immediately after a user is inserted.
@@ -98,9 +684,10 @@ def create_profile_after_user_insert(mapper, connection, target: User):
         target: Newly inserted :class:`User` instance.
 
     Side Effects:
-        Inserts a row into the ``profiles`` table.
+        Inserts a row into the ``profiles`` table matching
+        :meth:`ProfileSnapshot.initial`.
     """
-    profile_table = Profile.__table__
+    initial = ProfileSnapshot.initial(target.created_at)
     connection.execute(
-        profile_table.insert().values(user_id=target.id, coins=0, upgrades_snapshot="{}", stats_snapshot="{}")
+        Profile.__table__.insert().values(user_id=target.id, **initial._asdict())
     )
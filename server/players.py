@@ -0,0 +1,138 @@
+"""Case-insensitive nickname prefix search.
+
+``GET /api/players/search`` looks players up by the start of their
+nickname. A ``LIKE 'abc%'`` on ``users.nickname`` would be case-sensitive,
+and a leading wildcard would scan the whole table, so the search runs on
+``users.nickname_lower`` (:func:`server.models.normalize_nickname` of the
+nickname, filled on insert) through the ``ix_users_nickname_lower`` index
+on ``(nickname_lower, id)``:
+
+- the prefix becomes the half-open range ``[prefix, successor)``, an index
+  range scan of exactly the matching rows whatever the table size;
+- pages are keyset-paginated in index order: the opaque cursor (see
+  :func:`encode_cursor`) carries the ``(nickname_lower, id)`` of the last
+  result, so page 1 and page 1,000 cost the same.
+
+Each result carries the player's coins from the same row and their rank
+from the in-memory rank index (see :mod:`server.leaderboard`), so a page is
+one indexed query.
+
+Notes:
+    The range is exact under byte-wise (SQLite, PostgreSQL ``"C"``)
+    collations. Under a linguistic collation it may admit extra rows, which
+    the ``LIKE`` re-check on the same column drops.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from .database import db
+from .models import Profile, User, normalize_nickname
+
+MAX_QUERY_LENGTH = 40
+
+
+class PlayerMatch(NamedTuple):
+    """One search result.
+
+    Attributes:
+        user_id: Identifier of the player.
+        nickname: Player nickname.
+        nickname_lower: Search form of the nickname (the cursor key).
+        coins: Coin balance.
+        updated_at: Timestamp of the last profile update.
+    """
+    user_id: int
+    nickname: str
+    nickname_lower: str
+    coins: int
+    updated_at: Optional[datetime]
+
+
+def encode_cursor(match: PlayerMatch) -> str:
+    """Build the opaque cursor pointing after ``match``.
+
+    Args:
+        match: Last result of a page.
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    raw = json.dumps([match.nickname_lower, match.user_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(value: str) -> Tuple[str, int]:
+    """Parse a cursor produced by :func:`encode_cursor`.
+
+    Args:
+        value: Cursor string from the client.
+
+    Returns:
+        Tuple[str, int]: ``(nickname_lower, user_id)`` of the last result.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        nickname_lower, user_id = json.loads(raw)
+        if not isinstance(nickname_lower, str):
+            raise TypeError("nickname must be a string")
+        return nickname_lower, int(user_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _successor(prefix: str) -> Optional[str]:
+    """Return the smallest string greater than every string starting with ``prefix``."""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+def search(
+    session: Session,
+    query: str,
+    limit: int,
+    after: Optional[Tuple[str, int]] = None,
+) -> List[PlayerMatch]:
+    """Find players whose nickname starts with ``query``, ignoring case.
+
+    Args:
+        session: Session to read with (e.g. the read-replica session).
+        query: Nickname prefix (non-empty).
+        limit: Maximum number of results.
+        after: Decoded cursor; results start right after it.
+
+    Returns:
+        List[PlayerMatch]: Matches in ``(nickname_lower, user_id)`` order.
+    """
+    prefix = normalize_nickname(query)
+    statement = (
+        db.select(User.id, User.nickname, User.nickname_lower, Profile.coins, Profile.updated_at)
+        .join(Profile, Profile.user_id == User.id)
+        .where(
+            User.nickname_lower >= prefix,
+            User.nickname_lower.startswith(prefix, autoescape=True),
+        )
+        .order_by(User.nickname_lower, User.id)
+        .limit(limit)
+    )
+    upper = _successor(prefix)
+    if upper is not None:
+        statement = statement.where(User.nickname_lower < upper)
+    if after is not None:
+        statement = statement.where(tuple_(User.nickname_lower, User.id) > tuple_(*after))
+    return [
+        PlayerMatch(user_id, nickname, nickname_lower, coins or 0, updated_at)
+        for user_id, nickname, nickname_lower, coins, updated_at in session.execute(statement)
+    ]
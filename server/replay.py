@@ -0,0 +1,572 @@
+"""Server-side replay of match-3 sessions.
+
+``POST /api/sync`` used to accept any coin balance, so the leaderboard could
+be spoofed with a single request. A client can now attach the move log of
+the sessions it played since its last sync; the server re-simulates it with
+a port of the rules in ``game/match3/logic.ts`` and caps the coin gain at
+what the replay earned (see ``REPLAY_*`` in :mod:`server.config`).
+
+The engine works on batches of boards held in NumPy arrays (``colors`` and
+``special`` of shape ``(boards, ROWS, COLS)``): match detection, clearing,
+gravity and refill are array operations over every board at once. Only the
+rare special activations (tapping a special, swapping two specials) run per
+board.
+
+Determinism:
+    ``logic.ts`` draws from ``Math.random``; a replayable session instead
+    draws from a counter-based generator, ``draw(seed, n)`` for the n-th
+    draw of the session (see :func:`draw`, a few lines with ``Math.imul`` in
+    TypeScript). Draws are consumed in the order of ``logic.ts``:
+
+    - ``initBoard``: 64 colors (row-major) per attempt, up to 40 attempts
+      until the board has no match;
+    - ``resolveBoard``: per match group (horizontal lines by row, vertical
+      lines by column, then 2x2 squares), one draw for the position of a
+      created special, or two (row, column) per lightning it triggers; then
+      one color per refilled cell (row-major);
+    - activations: two draws per lightning, one per random color clear,
+      then the refill.
+
+    A draw ``d`` picks ``floor(d / 2**32 * n)`` out of ``n`` choices. Tile
+    ids are not part of the stream. The seed of a session is
+    :func:`replay_seed` of the user id and the profile version the replay is
+    based on, so a replay can only be credited once.
+
+Moves:
+    ``[row1, col1, row2, col2]`` swaps two adjacent tiles. The swap must
+    form a match, unless both tiles are specials, which triggers the
+    combined activation of ``activateCombinedSpecial``. ``[row, col]`` taps
+    a special (``activateSpecial``). Every move then cascades through
+    ``resolveBoard``; the chain counter starts at 1 after a swap and at 2
+    after an activation. An illegal move invalidates the whole replay.
+
+Status:
+    No client produces replays yet: the app's board (``domain/Grid.ts``)
+    does not run ``logic.ts``, and ``logic.ts`` itself still draws from
+    ``Math.random``. Until a client ships :func:`draw` and sends its move
+    log, ``"optional"`` validation caps nothing (``/sync`` is as spoofable
+    as before) and ``"required"`` blocks every coin gain.
+
+Examples:
+    >>> seed = replay_seed(1, 3)
+    >>> result = replay_sessions([seed], [parse_moves([[2, 2, 2, 3]], max_moves=1000)])[0]
+    >>> result.valid, result.score, result.moves
+    (True, 90, 1)
+    >>> replay_sessions([seed], [parse_moves([[0, 0, 0, 1]], max_moves=1000)])[0].valid
+    False
+"""
+
+import zlib
+from typing import Any, List, NamedTuple, Sequence
+
+import numpy as np
+
+ROWS = 8
+COLS = 8
+CELLS = ROWS * COLS
+COLOR_COUNT = 5
+BASE_TILE_SCORE = 10
+INIT_ATTEMPTS = 40
+MAX_CASCADE = 100
+
+NONE, ROCKET_H, ROCKET_V, LIGHTNING, BOMB = range(5)
+SPECIAL_NAMES = {ROCKET_H: "rocketH", ROCKET_V: "rocketV", LIGHTNING: "lightning", BOMB: "bomb"}
+
+_MASK32 = 0xFFFFFFFF
+_WIDTH = max(ROWS, COLS)
+_STEPS = np.arange(_WIDTH)
+_COLUMN = np.arange(COLS)
+
+
+def _row_index(count: int) -> np.ndarray:
+    return np.arange(count)[:, None, None]
+
+
+def _build_tables():
+    """Precompute clear masks ``(kind, cell) -> (CELLS,)``."""
+    effects = np.zeros((5, CELLS, CELLS), dtype=bool)
+    squares = np.zeros((CELLS, CELLS), dtype=bool)
+    for row in range(ROWS):
+        for col in range(COLS):
+            cell = row * COLS + col
+            effects[ROCKET_H, cell].reshape(ROWS, COLS)[row, :] = True
+            effects[ROCKET_V, cell].reshape(ROWS, COLS)[:, col] = True
+            effects[LIGHTNING, cell, cell] = True
+            # logic.ts: bomb clears rows/cols -2..+1 around the tile.
+            effects[BOMB, cell].reshape(ROWS, COLS)[max(0, row - 2):row + 2, max(0, col - 2):col + 2] = True
+            squares[cell].reshape(ROWS, COLS)[row:row + 2, col:col + 2] = True
+    return effects, squares
+
+
+_EFFECTS, _SQUARES = _build_tables()
+
+
+def draw(seed, counter) -> np.ndarray:
+    """Return the ``counter``-th 32-bit draw of a session (vectorized).
+
+    TypeScript equivalent::
+
+        let x = (Math.imul(counter, 0x9e3779b9) ^ seed) >>> 0;
+        x = (x ^ (x >>> 16)) >>> 0; x = Math.imul(x, 0x7feb352d) >>> 0;
+        x = (x ^ (x >>> 15)) >>> 0; x = Math.imul(x, 0x846ca68b) >>> 0;
+        return (x ^ (x >>> 16)) >>> 0;
+
+    Args:
+        seed: Session seed(s), broadcastable against ``counter``.
+        counter: Draw number(s).
+
+    Returns:
+        np.ndarray: ``uint64`` array of values in ``[0, 2**32)``.
+    """
+    x = (np.asarray(counter, dtype=np.uint64) * np.uint64(0x9E3779B9)) & np.uint64(_MASK32)
+    x ^= np.asarray(seed, dtype=np.uint64)
+    x ^= x >> np.uint64(16)
+    x = (x * np.uint64(0x7FEB352D)) & np.uint64(_MASK32)
+    x ^= x >> np.uint64(15)
+    x = (x * np.uint64(0x846CA68B)) & np.uint64(_MASK32)
+    x ^= x >> np.uint64(16)
+    return x
+
+
+def _choose(seed, counter, choices) -> np.ndarray:
+    """Map draws to ``floor(draw / 2**32 * choices)``."""
+    picked = (draw(seed, counter) * np.asarray(choices, dtype=np.uint64)) >> np.uint64(32)
+    return picked.astype(np.int64)
+
+
+def replay_seed(user_id: int, version: int) -> int:
+    """Return the seed of a session based on a profile version.
+
+    Args:
+        user_id: Player id.
+        version: :attr:`server.models.Profile.version` the replay is based on.
+
+    Returns:
+        int: CRC-32 of ``"<user_id>:<version>"``.
+    """
+    return zlib.crc32(f"{user_id}:{version}".encode("ascii"))
+
+
+def parse_moves(value: Any, max_moves: int) -> np.ndarray:
+    """Validate a JSON move log.
+
+    Args:
+        value: List of ``[r1, c1, r2, c2]`` swaps and ``[r, c]`` taps.
+        max_moves: Upper bound on the number of moves.
+
+    Returns:
+        np.ndarray: ``(moves, 4)`` int array; taps have ``-1`` as second
+        position.
+
+    Raises:
+        ValueError: If the log is not a list of integer pairs/quadruples or
+            is too long.
+    """
+    if not isinstance(value, list) or len(value) > max_moves:
+        raise ValueError("moves must be a list of at most %d moves" % max_moves)
+    moves = np.full((len(value), 4), -1, dtype=np.int64)
+    for index, move in enumerate(value):
+        if (
+            not isinstance(move, list)
+            or len(move) not in (2, 4)
+            or any(isinstance(item, bool) or not isinstance(item, int) for item in move)
+        ):
+            raise ValueError(f"invalid move #{index}")
+        moves[index, :len(move)] = move
+    return moves
+
+
+class ReplayResult(NamedTuple):
+    """Outcome of one replayed session.
+
+    Attributes:
+        valid: ``False`` when a move was illegal.
+        score: Score earned (``BASE_TILE_SCORE`` per cleared tile times the
+            chain), up to the first illegal move.
+        moves: Number of moves applied.
+    """
+    valid: bool
+    score: int
+    moves: int
+
+
+def _runs(colors: np.ndarray):
+    """Find runs of at least 3 equal colors along the last axis.
+
+    Returns:
+        tuple: ``(board, line, start, length)`` arrays, in board, line and
+        start order.
+    """
+    count, lines, width = colors.shape
+    starts = np.ones(colors.shape, dtype=bool)
+    starts[..., 1:] = colors[..., 1:] != colors[..., :-1]
+    first = np.flatnonzero(starts)
+    length = np.diff(first, append=starts.size)
+    long_enough = length >= 3
+    first, length = first[long_enough], length[long_enough]
+    board, rest = np.divmod(first, lines * width)
+    line, start = np.divmod(rest, width)
+    return board, line, start, length
+
+
+def _squares(colors: np.ndarray) -> np.ndarray:
+    """2x2 same-color clusters, indexed by their top-left cell."""
+    top_left = colors[:, :-1, :-1]
+    return (
+        (top_left == colors[:, :-1, 1:])
+        & (top_left == colors[:, 1:, :-1])
+        & (top_left == colors[:, 1:, 1:])
+    )
+
+
+def has_match(colors: np.ndarray) -> np.ndarray:
+    """Return which boards contain at least one match.
+
+    Args:
+        colors: ``(boards, ROWS, COLS)`` color indices.
+
+    Returns:
+        np.ndarray: ``(boards,)`` booleans.
+    """
+    horizontal = (colors[:, :, :-2] == colors[:, :, 1:-1]) & (colors[:, :, 1:-1] == colors[:, :, 2:])
+    vertical = (colors[:, :-2, :] == colors[:, 1:-1, :]) & (colors[:, 1:-1, :] == colors[:, 2:, :])
+    return horizontal.any((1, 2)) | vertical.any((1, 2)) | _squares(colors).any((1, 2))
+
+
+class BoardBatch:
+    """Boards replayed in lockstep.
+
+    Args:
+        seeds: One session seed per board.
+    """
+
+    def __init__(self, seeds: Sequence[int]):
+        self.seeds = np.asarray(seeds, dtype=np.uint64)
+        count = len(self.seeds)
+        self.colors = np.zeros((count, ROWS, COLS), dtype=np.int8)
+        self.special = np.zeros((count, ROWS, COLS), dtype=np.int8)
+        self.counter = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.applied = np.zeros(count, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.seeds)
+
+    def _flat(self):
+        return self.colors.reshape(len(self), CELLS), self.special.reshape(len(self), CELLS)
+
+    # -- setup ---------------------------------------------------------------
+
+    def init(self) -> None:
+        """Fill every board like ``initBoard``."""
+        pending = np.arange(len(self))
+        for _ in range(INIT_ATTEMPTS):
+            counters = self.counter[pending, None] + np.arange(CELLS)
+            self.colors[pending] = _choose(self.seeds[pending, None], counters, COLOR_COUNT).reshape(-1, ROWS, COLS)
+            self.special[pending] = NONE
+            self.counter[pending] += CELLS
+            pending = pending[has_match(self.colors[pending])]
+            if not pending.size:
+                break
+
+    # -- resolution ------------------------------------------------------------
+
+    def _groups(self, boards: np.ndarray):
+        """Enumerate match groups of ``boards`` in ``findAllMatches`` order.
+
+        Returns:
+            tuple: ``(local_board, positions, valid, kind, length)`` sorted by
+            board; ``kind`` is 0/1/2 for horizontal/vertical/square.
+        """
+        colors = self.colors[boards]
+        hb, hr, hc, h_length = _runs(colors)
+        vb, vc, vr, v_length = _runs(colors.transpose(0, 2, 1))
+        sb, sr, sc = np.nonzero(_squares(colors))
+        square_offsets = np.zeros(_WIDTH, dtype=np.int64)
+        square_offsets[:4] = (0, 1, COLS, COLS + 1)
+
+        positions = np.concatenate([
+            hr[:, None] * COLS + hc[:, None] + _STEPS,
+            (vr[:, None] + _STEPS) * COLS + vc[:, None],
+            (sr * COLS + sc)[:, None] + square_offsets,
+        ])
+        length = np.concatenate([h_length, v_length, np.full(sb.size, 4, dtype=np.int64)])
+        kind = np.concatenate([
+            np.zeros(hb.size, dtype=np.int64),
+            np.ones(vb.size, dtype=np.int64),
+            np.full(sb.size, 2, dtype=np.int64),
+        ])
+        local = np.concatenate([hb, vb, sb])
+        valid = _STEPS < length[:, None]
+        positions = np.where(valid, positions, 0)
+        order = np.argsort(local, kind="stable")
+        return local[order], positions[order], valid[order], kind[order], length[order]
+
+    def resolve_step(self, boards: np.ndarray, chain: np.ndarray) -> np.ndarray:
+        """Apply one ``resolveBoard`` pass to ``boards``.
+
+        Args:
+            boards: Board indices.
+            chain: Chain multiplier per board.
+
+        Returns:
+            np.ndarray: Per board, whether it had a match (and was resolved).
+        """
+        local, positions, valid, kind, length = self._groups(boards)
+        count = boards.size
+        if not local.size:
+            return np.zeros(count, dtype=bool)
+        _, special_flat = self._flat()
+        owners = boards[local]
+        seeds = self.seeds[owners]
+
+        group_specials = np.where(valid, special_flat[owners[:, None], positions], NONE)
+        has_special = (group_specials != NONE).any(axis=1)
+        create = ~has_special & ((kind == 2) | (length >= 4))
+        fired = (group_specials != NONE) & has_special[:, None]
+        lightning = fired & (group_specials == LIGHTNING)
+        draws = create.astype(np.int64) + 2 * lightning.sum(axis=1)
+        running = np.cumsum(draws) - draws
+        base = self.counter[owners] + running - running[np.searchsorted(local, local)]
+
+        clear = np.zeros((count, CELLS), dtype=bool)
+        clear[np.broadcast_to(local[:, None], positions.shape)[valid], positions[valid]] = True
+        group_index, slot = np.nonzero(fired)
+        if group_index.size:
+            kinds = group_specials[group_index, slot]
+            np.logical_or.at(clear, local[group_index], _EFFECTS[kinds, positions[group_index, slot]])
+            is_lightning = kinds == LIGHTNING
+            if is_lightning.any():
+                group_index, slot = group_index[is_lightning], slot[is_lightning]
+                rank = (np.cumsum(lightning, axis=1) - lightning)[group_index, slot]
+                at = base[group_index] + 2 * rank
+                row = np.clip(_choose(seeds[group_index], at, ROWS), 0, ROWS - 2)
+                col = np.clip(_choose(seeds[group_index], at + 1, COLS), 0, COLS - 2)
+                np.logical_or.at(clear, local[group_index], _SQUARES[row * COLS + col])
+
+        created = np.nonzero(create)[0]
+        picked = positions[created, _choose(seeds[created], base[created], length[created])]
+        created_kind = np.where(
+            kind[created] == 2,
+            LIGHTNING,
+            np.where(length[created] >= 5, BOMB, np.where(kind[created] == 0, ROCKET_H, ROCKET_V)),
+        )
+
+        matched = np.bincount(local, minlength=count) > 0
+        self.score[boards] += clear.sum(axis=1) * BASE_TILE_SCORE * chain
+        pre_draws = np.bincount(local, weights=draws, minlength=count).astype(np.int64)
+        self._collapse(boards[matched], clear[matched], pre_draws[matched])
+
+        if created.size:
+            # Later groups win when two specials land on the same cell.
+            keys = (owners[created] * CELLS + picked)[::-1]
+            _, last = np.unique(keys, return_index=True)
+            last = created.size - 1 - last
+            special_flat[owners[created][last], picked[last]] = created_kind[last]
+        return matched
+
+    def _collapse(self, boards: np.ndarray, clear: np.ndarray, pre_draws: np.ndarray) -> None:
+        """Remove cleared cells, apply gravity and refill (``applyGravity``/``refill``).
+
+        Args:
+            boards: Board indices.
+            clear: ``(boards, CELLS)`` cells to remove.
+            pre_draws: Draws consumed by the pass before the refill.
+        """
+        if not boards.size:
+            return
+        count = boards.size
+        keep = ~clear.reshape(count, ROWS, COLS)
+        # A stable sort of each column by "kept" moves the survivors to the
+        # bottom in their original order, leaving the cleared slots on top.
+        source = np.argsort(keep, axis=1, kind="stable") * COLS + _COLUMN
+        empty = ~keep.reshape(count, CELLS)[_row_index(count), source]
+        source += (boards * CELLS)[:, None, None]
+        colors = self.colors.reshape(-1)[source]
+        special = self.special.reshape(-1)[source]
+        special[empty] = NONE
+
+        empty = empty.reshape(count, CELLS)
+        rank = np.cumsum(empty, axis=1) - 1
+        board, cell = np.nonzero(empty)
+        at = (self.counter[boards] + pre_draws)[board] + rank[board, cell]
+        colors.reshape(count, CELLS)[board, cell] = _choose(self.seeds[boards][board], at, COLOR_COUNT)
+
+        self.colors[boards] = colors
+        self.special[boards] = special
+        self.counter[boards] += pre_draws + empty.sum(axis=1)
+
+    def cascade(self, boards: np.ndarray, chain: np.ndarray) -> None:
+        """Resolve ``boards`` until no match is left (chain grows per pass)."""
+        for _ in range(MAX_CASCADE):
+            if not boards.size:
+                return
+            matched = self.resolve_step(boards, chain)
+            boards, chain = boards[matched], chain[matched] + 1
+
+    # -- activations (per board) -------------------------------------------
+
+    def _next(self, board: int, choices: int) -> int:
+        value = int(_choose(self.seeds[board], self.counter[board], choices))
+        self.counter[board] += 1
+        return value
+
+    def _lightning_square(self, board: int) -> np.ndarray:
+        row = max(0, min(ROWS - 2, self._next(board, ROWS)))
+        col = max(0, min(COLS - 2, self._next(board, COLS)))
+        return _SQUARES[row * COLS + col]
+
+    def _clear(self, board: int, mask: np.ndarray) -> int:
+        self._collapse(np.array([board]), mask[None, :], np.zeros(1, dtype=np.int64))
+        return int(mask.sum())
+
+    def activate(self, board: int, cell: int) -> int:
+        """Port of ``activateSpecial``.
+
+        Returns:
+            int: Cleared cells, or ``-1`` when the tile is not a special.
+        """
+        kind = int(self.special[board].flat[cell])
+        if kind == NONE:
+            return -1
+        mask = _EFFECTS[kind, cell].copy()
+        if kind == LIGHTNING:
+            mask |= self._lightning_square(board)
+        return self._clear(board, mask)
+
+    def _color_clear(self, board: int, times: int) -> np.ndarray:
+        flat = self.colors[board].reshape(CELLS)
+        values, first = np.unique(flat, return_index=True)
+        palette = values[np.argsort(first)]  # insertion order of the JS Set
+        mask = np.zeros(CELLS, dtype=bool)
+        for _ in range(times):
+            mask |= flat == palette[self._next(board, palette.size)]
+        return mask
+
+    def activate_combined(self, board: int, a: int, b: int) -> int:
+        """Port of ``activateCombinedSpecial``; returns the score gained."""
+        kind_a = int(self.special[board].flat[a])
+        kind_b = int(self.special[board].flat[b])
+        key = "+".join(sorted((SPECIAL_NAMES[kind_a], SPECIAL_NAMES[kind_b])))
+        grid = np.zeros((ROWS, COLS), dtype=bool)
+        (row_a, col_a), (row_b, col_b) = divmod(a, COLS), divmod(b, COLS)
+
+        def area(row: int, col: int, radius: int) -> None:
+            grid[max(0, row - radius):row + radius + 1, max(0, col - radius):col + radius + 1] = True
+
+        if key == "rocketH+rocketH":
+            grid[[row_a, row_b], :] = True
+        elif key == "rocketV+rocketV":
+            grid[:, [col_a, col_b]] = True
+        elif key == "rocketH+rocketV":
+            if kind_a == ROCKET_H:
+                grid[row_a, :] = True
+                grid[:, col_b] = True
+            else:
+                grid[row_b, :] = True
+                grid[:, col_a] = True
+        elif key == "bomb+bomb":
+            grid[
+                max(0, min(row_a, row_b) - 2):max(row_a, row_b) + 3,
+                max(0, min(col_a, col_b) - 2):max(col_a, col_b) + 3,
+            ] = True
+        elif key in ("bomb+rocketH", "bomb+rocketV"):
+            bomb, rocket, rocket_kind = ((a, b, kind_b) if kind_a == BOMB else (b, a, kind_a))
+            area(*divmod(bomb, COLS), 2)
+            if rocket_kind == ROCKET_H:
+                grid[rocket // COLS, :] = True
+            else:
+                grid[:, rocket % COLS] = True
+        elif key == "bomb+lightning":
+            area(*divmod(a if kind_a == BOMB else b, COLS), 2)
+            grid |= self._color_clear(board, 1).reshape(ROWS, COLS)
+        elif key == "lightning+lightning":
+            if np.unique(self.colors[board]).size <= 2:
+                grid[:, :] = True
+            else:
+                grid |= self._color_clear(board, 2).reshape(ROWS, COLS)
+        else:
+            # Lightning + rocket: logic.ts sorts the key ("lightning+rocketX"),
+            # which none of its cases match, so both specials fire one by one.
+            first = self.activate(board, a)
+            second = self.activate(board, b)
+            removed = max(first, 0) + max(second, 0)
+            return removed * BASE_TILE_SCORE * 2
+        return self._clear(board, grid.reshape(CELLS)) * BASE_TILE_SCORE * 2
+
+    # -- moves -----------------------------------------------------------------
+
+    def play(self, moves: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Apply move logs to every board in lockstep.
+
+        Args:
+            moves: ``(boards, max_moves, 4)`` moves (see :func:`parse_moves`).
+            counts: Moves per board.
+
+        Returns:
+            np.ndarray: Per board, whether every move was legal.
+        """
+        alive = np.ones(len(self), dtype=bool)
+        color_flat, special_flat = self._flat()
+        for step in range(moves.shape[1] if moves.ndim == 3 else 0):
+            active = np.nonzero(alive & (counts > step))[0]
+            if not active.size:
+                break
+            row_a, col_a, row_b, col_b = moves[active, step].T
+            tap = (row_b < 0) & (col_b < 0)
+            inside_a = (row_a >= 0) & (row_a < ROWS) & (col_a >= 0) & (col_a < COLS)
+            inside_b = (row_b >= 0) & (row_b < ROWS) & (col_b >= 0) & (col_b < COLS)
+            adjacent = np.abs(row_a - row_b) + np.abs(col_a - col_b) == 1
+            cell_a = np.where(inside_a, row_a * COLS + col_a, 0)
+            cell_b = np.where(inside_b, row_b * COLS + col_b, 0)
+            legal = inside_a & np.where(tap, special_flat[active, cell_a] != NONE, inside_b & adjacent)
+
+            swap = legal & ~tap
+            swapped, a, b = active[swap], cell_a[swap], cell_b[swap]
+            both_special = (special_flat[swapped, a] != NONE) & (special_flat[swapped, b] != NONE)
+            for flat in (color_flat, special_flat):
+                held = flat[swapped, a].copy()
+                flat[swapped, a] = flat[swapped, b]
+                flat[swapped, b] = held
+            # The first resolve pass doubles as the legality check: a plain
+            # swap must produce a match.
+            plain = swapped[~both_special]
+            matching = self.resolve_step(plain, np.ones(plain.size, dtype=np.int64))
+            legal[np.nonzero(swap)[0][~both_special][~matching]] = False
+            alive[active[~legal]] = False
+            self.applied[active[legal]] += 1
+
+            activated = []
+            for board, cell in zip(active[legal & tap], cell_a[legal & tap]):
+                self.score[board] += self.activate(int(board), int(cell)) * BASE_TILE_SCORE
+                activated.append(board)
+            for board, first, second in zip(swapped[both_special], a[both_special], b[both_special]):
+                self.score[board] += self.activate_combined(int(board), int(first), int(second))
+                activated.append(board)
+            boards = np.concatenate([plain[matching], np.asarray(activated, dtype=np.int64)])
+            self.cascade(boards, np.full(boards.size, 2, dtype=np.int64))
+        return alive
+
+
+def replay_sessions(seeds: Sequence[int], move_logs: Sequence[np.ndarray]) -> List[ReplayResult]:
+    """Replay many sessions at once.
+
+    Args:
+        seeds: Session seeds (see :func:`replay_seed`).
+        move_logs: ``(moves, 4)`` arrays from :func:`parse_moves`, one per
+            seed.
+
+    Returns:
+        List[ReplayResult]: One result per session, in input order.
+    """
+    counts = np.array([len(log) for log in move_logs], dtype=np.int64)
+    moves = np.full((len(move_logs), int(counts.max(initial=0)), 4), -1, dtype=np.int64)
+    for index, log in enumerate(move_logs):
+        moves[index, :len(log)] = log
+    batch = BoardBatch(seeds)
+    batch.init()
+    alive = batch.play(moves, counts)
+    return [
+        ReplayResult(bool(ok), int(score), int(applied))
+        for ok, score, applied in zip(alive, batch.score, batch.applied)
+    ]
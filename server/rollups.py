@@ -0,0 +1,46 @@
+"""Command line runner of the score rollup job.
+
+Folds pending :class:`server.models.ScoreEvent` rows into the hourly/daily
+rollups, compacts old events (see :mod:`server.score_events`) and archives
+ended leaderboard windows (see :mod:`server.leaderboard_windows`). Meant for
+cron when the in-process thread is disabled (``SCORE_ROLLUP_INTERVAL=0``);
+running it next to the thread is safe.
+
+Examples:
+    >>> # python -m server.rollups
+    >>> # python -m server.rollups --no-compact --settle 0
+"""
+
+import argparse
+
+from .app import create_app
+from .leaderboard_windows import rotate_windows
+from .score_events import compact, roll_up_all
+
+
+def main(argv=None):
+    """Command line entry point: roll up pending events, compact, rotate windows.
+
+    Args:
+        argv: Arguments (defaults to ``sys.argv[1:]``).
+    """
+    parser = argparse.ArgumentParser(description="Roll up score events and compact old ones.")
+    parser.add_argument("--no-compact", action="store_true", help="only roll up")
+    parser.add_argument("--settle", type=float, help="minimum event age in seconds (default: SCORE_ROLLUP_SETTLE)")
+    parser.add_argument("--database-url", help="override DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    overrides = {"SQLALCHEMY_DATABASE_URI": args.database_url} if args.database_url else None
+    app = create_app(overrides)
+    with app.app_context():
+        folded = roll_up_all(settle=args.settle)
+        print(f"rolled up {folded} events")
+        if not args.no_compact:
+            deleted = compact()
+            print(f"deleted {deleted['events']} events, {deleted['hourlyBuckets']} hourly buckets")
+        rotated = rotate_windows()
+        print(f"archived {rotated['archivedWindows']} leaderboard windows, deleted {rotated['expiredScores']} scores")
+
+
+if __name__ == "__main__":
+    main()
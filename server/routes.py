@@ -8,13 +8,49 @@ Authentication:
 
     ``Authorization: Bearer <token>``
 
+Content Negotiation:
+    ``/sync`` accepts and ``/profile``/``/sync`` return the compact binary
+    format of :mod:`server.wire` when the client uses the
+    ``application/x-match3-profile`` media type (``Content-Type`` /
+    ``Accept``). JSON is the default. Large JSON bodies of ``/profile`` and
+    ``/leaderboard`` are compressed per ``Accept-Encoding``.
+
 Endpoints:
     - ``GET /health``: health check.
+    - ``GET /metrics``: request/SQL/cache metrics in Prometheus text format.
     - ``POST /register``: create a user and return token + profile.
     - ``POST /login``: authenticate and return token + profile.
     - ``GET /profile``: get current profile snapshot.
     - ``POST /sync``: upload local snapshot (coins/upgrades/stats).
-    - ``GET /leaderboard``: get top profiles sorted by coins.
+    - ``POST /sync/batch``: upload queued offline snapshots in one request.
+    - ``POST /sync/delta``: upload only changed keys against a base version.
+    - ``GET /leaderboard``: get a page of profiles sorted by coins
+      (cursor pagination, ``around=me``).
+    - ``GET /leaderboard/me``: get the caller's rank and neighbours.
+    - ``GET /players/search``: find players by nickname prefix (case-insensitive).
+    - ``GET /stats/me``: the caller's hourly/daily score buckets.
+    - ``GET /stats/global``: hourly/daily active players and coin totals.
+    - ``GET /stats/earners``: players ranked by coins earned over recent buckets.
+    - ``GET /admin/export``: stream profiles or the leaderboard as NDJSON/CSV
+      (admins only).
+
+Write-Behind:
+    With ``WRITE_BEHIND_ENABLED``, ``/sync`` answers ``202`` and the
+    snapshot is written by the batched flusher of :mod:`server.write_behind`;
+    routes that read or merge into the caller's stored row flush the
+    caller's pending snapshot first (see :func:`_flush_pending`).
+
+Idempotency:
+    ``/register``, ``/login`` and the ``/sync*`` routes accept an
+    ``Idempotency-Key`` header: a retried request with the same key and
+    body gets the first response replayed without a database write (see
+    :mod:`server.idempotency`).
+
+Admission Control:
+    ``/register``, ``/login`` and the ``/sync*`` routes are rate limited and
+    concurrency bounded by :mod:`server.admission`; rejected requests get
+    ``429`` (per-client limit) or ``503`` (server-wide limit) with
+    ``Retry-After``.
 
 Examples:
     Health check:
@@ -29,17 +65,109 @@ Examples:
 """
 
 import json
-from typing import Any, Dict
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 
-from .auth import check_password, generate_token, hash_password, token_required, upsert_profile
-from .database import db
-from .models import Profile, User
+from .admission import admission_control
+from .auth import (
+    AuthenticatedUser,
+    ProfileVersionConflict,
+    admin_required,
+    apply_profile_delta,
+    check_password,
+    generate_token,
+    hash_password,
+    rehash_password_if_needed,
+    token_required,
+    upsert_profile,
+)
+from .compression import compress_response
+from .export import FORMATS, export, parse_since
+from .database import db, get_read_session
+from .hashing import PasswordHashingBusy
+from .idempotency import idempotent
+from .leaderboard import (
+    DatabaseLeaderboard,
+    decode_cursor,
+    encode_cursor,
+    get_leaderboard_cache,
+    get_rank_index,
+)
+from .leaderboard_snapshot import get_leaderboard_snapshot
+from .leaderboard_windows import WINDOWS, WindowLeaderboard, window_end, window_start
+from .metrics import render_metrics
+from .models import Profile, ProfileSnapshot, User
+from . import players
+from .replay import parse_moves, replay_seed, replay_sessions
+from .score_events import bucket_start, global_buckets, player_buckets, rolled_up_at, top_earners
+from .wire import BINARY_MIMETYPE, decode_sync, encode_profile
+from .write_behind import get_write_behind
 
 api_bp = Blueprint("api", __name__)
 
 
+# Ranges of the INTEGER (coins, upgrade levels) and BIGINT (stat values)
+# columns; larger numbers would fail in the database instead of the request.
+MAX_INT = 2**31 - 1
+MAX_BIGINT = 2**63 - 1
+
+
+def _parse_int(value: Any, maximum: int = MAX_INT) -> int:
+    """Coerce a JSON number to ``int`` within a column range.
+
+    Args:
+        value: Raw request value.
+        maximum: Largest allowed magnitude (see :data:`MAX_INT`).
+
+    Returns:
+        int: Value truncated to an integer.
+
+    Raises:
+        ValueError: If ``value`` is not a finite number (booleans included)
+            or falls outside ``[-maximum - 1, maximum]``.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("expected a number")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError("expected a finite number")
+    number = int(value)
+    if not -maximum - 1 <= number <= maximum:
+        raise ValueError("number out of range")
+    return number
+
+
+def _parse_counters(value: Any, maximum: int = MAX_BIGINT) -> Dict[str, int]:
+    """Validate an ``upgrades``/``stats`` object and coerce it to integers.
+
+    Args:
+        value: Raw request field (``None`` is treated as an empty object).
+        maximum: Largest allowed value magnitude (see :func:`_parse_int`).
+
+    Returns:
+        Dict[str, int]: Mapping of key to integer value.
+
+    Raises:
+        ValueError: If ``value`` is not an object or has more than
+            ``PROFILE_MAX_KEYS`` keys, a key is longer than 64 characters or
+            a value is not a number in range.
+    """
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError("expected an object")
+    if len(value) > current_app.config["PROFILE_MAX_KEYS"]:
+        raise ValueError("too many keys")
+    counters = {}
+    for key, item in value.items():
+        if len(key) > 64:
+            raise ValueError(f"invalid counter {key!r}")
+        counters[key] = _parse_int(item, maximum)
+    return counters
+
+
 def _parse_payload() -> Dict[str, Any]:
     """Parse JSON body into a dictionary.
 
@@ -56,6 +184,198 @@ def _parse_payload() -> Dict[str, Any]:
     return payload
 
 
+def _hashing_busy():
+    """Build the fast-fail response used when password hashing is saturated.
+
+    Returns:
+        tuple: JSON error body, status ``503`` and a ``Retry-After`` header.
+    """
+    return jsonify({"message": "Server is busy, try again later"}), 503, {"Retry-After": "1"}
+
+
+def _coin_allowance(user: AuthenticatedUser, replay: Any, base_version: Any) -> Optional[int]:
+    """Compute how many coins a sync may add, per ``REPLAY_VALIDATION``.
+
+    Args:
+        user: Authenticated user identity.
+        replay: ``replay`` object of the request (``None`` when absent).
+        base_version: Profile version the replay was played on.
+
+    Returns:
+        Optional[int]: Maximum balance increase, or ``None`` when uncapped
+        (validation off, or optional and no replay attached).
+
+    Raises:
+        ValueError: If the replay or its base version is malformed.
+    """
+    mode = current_app.config["REPLAY_VALIDATION"]
+    if mode == "off":
+        return None
+    if replay is None:
+        return 0 if mode == "required" else None
+    if not isinstance(replay, dict) or isinstance(base_version, bool) or not isinstance(base_version, int):
+        raise ValueError("invalid replay")
+    moves = parse_moves(replay.get("moves"), current_app.config["REPLAY_MAX_MOVES"])
+    result = replay_sessions([replay_seed(user.id, base_version)], [moves])[0]
+    if not result.valid:
+        return 0
+    return result.score // current_app.config["REPLAY_SCORE_PER_COIN"]
+
+
+PROFILE_COLUMNS = (
+    Profile.coins,
+    Profile.upgrades_snapshot,
+    Profile.stats_snapshot,
+    Profile.updated_at,
+    Profile.version,
+)
+
+
+def _profile_json(nickname: str, profile: Any) -> str:
+    """Render a profile snapshot as a JSON object.
+
+    The pre-rendered ``upgrades_snapshot``/``stats_snapshot`` fragments are
+    spliced in verbatim, so neither the typed rows nor the fragments are
+    parsed or re-encoded.
+
+    Args:
+        nickname: Owner nickname.
+        profile: :class:`server.models.ProfileSnapshot` or a row selected
+            with :data:`PROFILE_COLUMNS`.
+
+    Returns:
+        str: JSON object with keys ``nickname``, ``coins``, ``upgrades``,
+        ``stats``, ``updatedAt`` and ``version``.
+    """
+    updated_at = profile.updated_at
+    return (
+        f'{{"nickname":{json.dumps(nickname)},"coins":{json.dumps(profile.coins)},'
+        f'"upgrades":{profile.upgrades_snapshot or "{}"},"stats":{profile.stats_snapshot or "{}"},'
+        f'"updatedAt":{json.dumps(updated_at.isoformat()) if updated_at else "null"},'
+        f'"version":{json.dumps(profile.version)}}}'
+    )
+
+
+def _json_response(body: str, status: int = 200) -> Response:
+    """Wrap an already serialized JSON body.
+
+    Args:
+        body: JSON text.
+        status: HTTP status code.
+
+    Returns:
+        flask.Response: ``application/json`` response.
+    """
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _flush_pending(user_id: int) -> bool:
+    """Write the user's queued write-behind snapshot, if any.
+
+    Args:
+        user_id: Player about to be read or written synchronously.
+
+    Returns:
+        bool: ``True`` if a snapshot was written, i.e. rows read before the
+        call are stale.
+    """
+    queue = get_write_behind()
+    return queue is not None and queue.flush_user(user_id)
+
+
+def _wants_binary() -> bool:
+    """Return whether the client prefers :data:`server.wire.BINARY_MIMETYPE`."""
+    return request.accept_mimetypes.best_match(["application/json", BINARY_MIMETYPE]) == BINARY_MIMETYPE
+
+
+def _profile_etag(user_id: int, version: int) -> str:
+    """Build the ``/profile`` ETag from the row version.
+
+    ``Profile.version`` is bumped on every write, so it identifies the
+    snapshot content; the representation (JSON or binary) is part of the tag.
+    """
+    return f"p{user_id}-{version}{'-b' if _wants_binary() else ''}"
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate ``If-None-Match`` / ``If-Modified-Since`` for a GET.
+
+    ``If-None-Match`` takes precedence and is compared weakly (compressed
+    responses carry weak ETags, see :mod:`server.compression`).
+    ``If-Modified-Since`` has one-second resolution, so a second write
+    within the same second is only detected through the ETag.
+
+    Args:
+        etag: Current ETag (unquoted).
+        last_modified: Current modification time (naive UTC).
+
+    Returns:
+        bool: ``True`` when a ``304`` should be returned.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> Response:
+    """Attach ``ETag``, ``Last-Modified`` and revalidation headers."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response
+
+
+def _profile_response(nickname: str, profile: Any) -> Response:
+    """Return a profile snapshot in the format negotiated via ``Accept``.
+
+    Args:
+        nickname: Owner nickname.
+        profile: :class:`server.models.ProfileSnapshot`, a
+            :class:`server.write_behind.PendingSnapshot` or a row selected
+            with :data:`PROFILE_COLUMNS`.
+
+    Returns:
+        flask.Response: Binary body (see :mod:`server.wire`) when the client
+        prefers :data:`server.wire.BINARY_MIMETYPE`, JSON (see
+        :func:`_profile_json`) otherwise.
+    """
+    if _wants_binary():
+        response = Response(encode_profile({
+            "nickname": nickname,
+            "coins": profile.coins,
+            "upgrades": json.loads(profile.upgrades_snapshot or "{}"),
+            "stats": json.loads(profile.stats_snapshot or "{}"),
+            "updatedAt": profile.updated_at.isoformat() if profile.updated_at else None,
+            "version": profile.version,
+        }), mimetype=BINARY_MIMETYPE)
+    else:
+        response = _json_response(_profile_json(nickname, profile))
+    response.vary.add("Accept")
+    return response
+
+
+def _session_response(token: str, nickname: str, profile: Any) -> Response:
+    """Build the ``/register`` and ``/login`` response body.
+
+    Args:
+        token: Freshly issued token.
+        nickname: User nickname.
+        profile: :class:`server.models.ProfileSnapshot` or a row selected
+            with :data:`PROFILE_COLUMNS`.
+
+    Returns:
+        flask.Response: JSON with keys ``token``, ``nickname``, ``profile``.
+    """
+    return _json_response(
+        f'{{"token":{json.dumps(token)},"nickname":{json.dumps(nickname)},'
+        f'"profile":{_profile_json(nickname, profile)}}}'
+    )
+
+
 @api_bp.route("/health", methods=["GET"])
 def healthcheck():
     """Health check endpoint.
@@ -66,7 +386,24 @@ def healthcheck():
     return jsonify({"status": "ok"})
 
 
+@api_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose request, SQL and cache metrics for Prometheus.
+
+    Returns:
+        flask.Response: Prometheus text exposition (``text/plain;
+        version=0.0.4``).
+
+    Notes:
+        The endpoint is unauthenticated; restrict it at the reverse proxy
+        when the API is public.
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 @api_bp.route("/register", methods=["POST"])
+@idempotent("register")
+@admission_control("auth")
 def register():
     """Register a new user.
 
@@ -80,10 +417,16 @@ def register():
     Status Codes:
         200: User created.
         400: Nickname/password too short or malformed payload.
-        409: Nickname already exists.
+        409: Nickname already exists, or a request with the same
+            ``Idempotency-Key`` is still running.
+        422: ``Idempotency-Key`` reused with a different body.
+        429: Too many auth requests from this address (``Retry-After`` is set).
+        503: Password hashing pool or admission limits saturated
+            (``Retry-After`` is set).
 
     Side Effects:
-        Inserts a user into the database and creates a related profile.
+        - Inserts a user into the database and creates a related profile.
+        - Adds the new player to the leaderboard rank index.
     """
     payload = _parse_payload()
     nickname = (payload.get("nickname") or "").strip()
@@ -92,30 +435,32 @@ def register():
     if len(nickname) < 3 or len(password) < 6:
         return jsonify({"message": "Nickname or password is too short"}), 400
 
-    existing = User.query.filter_by(nickname=nickname).first()
+    existing = db.session.execute(db.select(User.id).where(User.nickname == nickname)).first()
     if existing:
         return jsonify({"message": "Nickname already taken"}), 409
 
-    user = User(nickname=nickname, password_hash=hash_password(password))
+    try:
+        password_hash = hash_password(password)
+    except PasswordHashingBusy:
+        return _hashing_busy()
+
+    user = User(nickname=nickname, password_hash=password_hash)
     db.session.add(user)
+    db.session.flush()
+    # Read before the commit expires them; the profile row was inserted by
+    # the after_insert hook with known values, so nothing is reloaded.
+    user_id = user.id
+    profile = ProfileSnapshot.initial(user.created_at)
     db.session.commit()
 
-    token = generate_token(user.id)
-    profile = user.profile
-    return jsonify({
-        "token": token,
-        "nickname": user.nickname,
-        "profile": {
-            "nickname": user.nickname,
-            "coins": profile.coins,
-            "upgrades": json.loads(profile.upgrades_snapshot or "{}"),
-            "stats": json.loads(profile.stats_snapshot or "{}"),
-            "updatedAt": profile.updated_at.isoformat() if profile.updated_at else None,
-        },
-    })
+    token = generate_token(user_id, nickname)
+    get_rank_index().upsert(user_id, nickname, profile.coins, profile.updated_at)
+    return _session_response(token, nickname, profile)
 
 
 @api_bp.route("/login", methods=["POST"])
+@idempotent("login")
+@admission_control("auth")
 def login():
     """Authenticate an existing user.
 
@@ -129,60 +474,221 @@ def login():
     Status Codes:
         200: Authenticated.
         401: Invalid credentials.
+        409 / 422: ``Idempotency-Key`` in use or reused (see ``POST /register``).
+        429: Too many auth requests from this address (``Retry-After`` is set).
+        503: Password hashing pool or admission limits saturated
+            (``Retry-After`` is set).
+
+    Side Effects:
+        Schedules a background rehash when the stored hash is outdated.
     """
     payload = _parse_payload()
     nickname = (payload.get("nickname") or "").strip()
     password = payload.get("password") or ""
 
-    user = User.query.filter_by(nickname=nickname).first()
-    if not user or not check_password(user.password_hash, password):
+    # Credentials and profile in one round trip.
+    row = db.session.execute(
+        db.select(User.id, User.nickname, User.password_hash, *PROFILE_COLUMNS)
+        .join(Profile, Profile.user_id == User.id)
+        .where(User.nickname == nickname)
+    ).first()
+    try:
+        valid = bool(row) and check_password(row.password_hash, password)
+    except PasswordHashingBusy:
+        return _hashing_busy()
+    if not valid:
         return jsonify({"message": "Invalid credentials"}), 401
+    rehash_password_if_needed(row.id, row.password_hash, password)
+    profile = row
+    if _flush_pending(row.id):
+        profile = db.session.execute(
+            db.select(*PROFILE_COLUMNS).where(Profile.user_id == row.id)
+        ).one()
 
-    token = generate_token(user.id)
-    profile = user.profile
-    return jsonify({
-        "token": token,
-        "nickname": user.nickname,
-        "profile": {
-            "nickname": user.nickname,
-            "coins": profile.coins,
-            "upgrades": json.loads(profile.upgrades_snapshot or "{}"),
-            "stats": json.loads(profile.stats_snapshot or "{}"),
-            "updatedAt": profile.updated_at.isoformat() if profile.updated_at else None,
-        },
-    })
+    token = generate_token(row.id, row.nickname)
+    return _session_response(token, row.nickname, profile)
 
 
 @api_bp.route("/profile", methods=["GET"])
 @token_required
-def profile(user: User):
+def profile(user: AuthenticatedUser):
     """Get the authenticated user's profile snapshot.
 
     Args:
         user: Injected by :func:`server.auth.token_required`.
 
     Returns:
-        flask.Response: JSON profile snapshot.
+        flask.Response: Profile snapshot (JSON or binary, see
+        :func:`_profile_response`).
+
+    Status Codes:
+        200: Profile snapshot, with ``ETag`` and ``Last-Modified``.
+        304: ``If-None-Match`` / ``If-Modified-Since`` match the current
+            profile; answered from ``(version, updated_at)`` alone, without
+            loading the snapshot columns.
+
+    Notes:
+        Reads through :func:`server.database.get_read_session`, i.e. from
+        the read replica when one is configured. JSON bodies are compressed
+        when large enough (see :mod:`server.compression`). A queued
+        write-behind snapshot of the caller is written first.
     """
-    profile = user.profile
-    return jsonify({
-        "nickname": user.nickname,
-        "coins": profile.coins,
-        "upgrades": json.loads(profile.upgrades_snapshot or "{}"),
-        "stats": json.loads(profile.stats_snapshot or "{}"),
-        "updatedAt": profile.updated_at.isoformat() if profile.updated_at else None,
-    })
+    _flush_pending(user.id)
+    session = get_read_session()
+    if request.if_none_match or request.if_modified_since is not None:
+        version, updated_at = session.execute(
+            db.select(Profile.version, Profile.updated_at).where(Profile.user_id == user.id)
+        ).one()
+        etag = _profile_etag(user.id, version)
+        if _not_modified(etag, updated_at):
+            return _set_validators(Response(status=304), etag, updated_at)
+    profile = session.execute(
+        db.select(*PROFILE_COLUMNS).where(Profile.user_id == user.id)
+    ).one()
+    response = _profile_response(user.nickname, profile)
+    _set_validators(response, _profile_etag(user.id, profile.version), profile.updated_at)
+    return compress_response(response)
 
 
 @api_bp.route("/sync", methods=["POST"])
 @token_required
-def sync(user: User):
+@idempotent("sync")
+@admission_control("sync")
+def sync(user: AuthenticatedUser):
     """Upload and persist a profile snapshot.
 
     Request JSON:
         - ``coins`` (number): Will be coerced to ``int`` and clamped to ``>= 0``.
-        - ``upgrades`` (object): JSON object.
-        - ``stats`` (object): JSON object.
+        - ``upgrades`` (object): Upgrade id to level.
+        - ``stats`` (object): Stat name to counter value.
+        - ``replay`` (object, optional): ``baseVersion`` (int) and ``moves``
+          played since that profile version (see :mod:`server.replay`).
+
+    Request Binary:
+        With ``Content-Type: application/x-match3-profile`` the body is a
+        :func:`server.wire.encode_sync` payload carrying the same fields
+        (without ``replay``). Like ``/sync/batch``, a binary sync is
+        therefore never capped in ``"optional"`` replay mode and cannot
+        raise the balance in ``"required"`` mode.
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: Profile snapshot after persistence (JSON or binary,
+        see :func:`_profile_response`).
+
+    Status Codes:
+        202: Snapshot queued for the write-behind flusher
+            (``WRITE_BEHIND_ENABLED``); the body echoes it with ``version``
+            ``null``.
+        200: Snapshot saved. With ``REPLAY_VALIDATION`` enabled the coin
+            gain is capped at what the replay earned (at 0 for an illegal or
+            already credited replay, or a missing one in ``"required"``
+            mode); the response carries the stored balance.
+        400: Invalid payload (coins or upgrade/stat values that are not
+            finite numbers within the column range, more than
+            ``PROFILE_MAX_KEYS`` upgrades or stats), malformed ``replay`` or
+            an over-long ``Idempotency-Key``.
+        409: A request with the same ``Idempotency-Key`` is still running
+            (``Retry-After`` is set).
+        422: ``Idempotency-Key`` reused with a different body.
+        429: Per-user sync rate exceeded (``Retry-After`` is set).
+        503: Server-wide sync limits saturated (``Retry-After`` is set).
+
+    Side Effects:
+        Writes to the database, or queues the snapshot in write-behind mode.
+        Syncs whose coin gain is capped are always written synchronously.
+    """
+    try:
+        if request.mimetype == BINARY_MIMETYPE:
+            coins, upgrades, stats = decode_sync(request.get_data())
+            replay = None
+        else:
+            payload = _parse_payload()
+            coins = payload.get("coins", 0)
+            upgrades = payload.get("upgrades")
+            stats = payload.get("stats")
+            replay = payload.get("replay")
+        coins = _parse_int(coins)
+        upgrades = _parse_counters(upgrades, MAX_INT)
+        stats = _parse_counters(stats)
+    except (TypeError, ValueError):
+        return jsonify({"message": "Invalid payload"}), 400
+    base_version = replay.get("baseVersion") if isinstance(replay, dict) else None
+    try:
+        allowance = _coin_allowance(user, replay, base_version)
+    except ValueError:
+        return jsonify({"message": "Invalid replay"}), 400
+
+    queue = get_write_behind()
+    if queue is not None and allowance is None:
+        pending = queue.submit(user, coins, upgrades, stats)
+        if pending is not None:
+            response = _profile_response(user.nickname, pending)
+            response.status_code = 202
+            return response
+    _flush_pending(user.id)
+    profile = upsert_profile(user, coins, upgrades, stats, allowance, base_version)
+    return _profile_response(user.nickname, profile)
+
+
+def _resolve_snapshots(snapshots: List[Any]) -> Tuple[Optional[int], Dict[str, Any], Dict[str, Any]]:
+    """Fold an ordered list of client snapshots into the changes to apply.
+
+    Snapshots are applied in ``clientTs`` order (ties and missing timestamps
+    keep their position in the list). The last ``coins`` value wins, while
+    ``upgrades`` and ``stats`` are merged key by key so that a later partial
+    snapshot does not drop keys sent earlier.
+
+    Args:
+        snapshots: Items of the ``snapshots`` request field.
+
+    Returns:
+        Tuple[Optional[int], Dict[str, int], Dict[str, int]]: Final coins
+        (``None`` when no snapshot carries ``coins``), and the upgrades and
+        stats to merge into the stored profile.
+
+    Raises:
+        ValueError: If an item is not an object or has malformed fields.
+    """
+    ordered = []
+    last_ts = 0.0
+    for position, item in enumerate(snapshots):
+        if not isinstance(item, dict):
+            raise ValueError("snapshot must be an object")
+        client_ts = item.get("clientTs")
+        if client_ts is not None:
+            if isinstance(client_ts, bool) or not isinstance(client_ts, (int, float)):
+                raise ValueError("clientTs must be a number")
+            last_ts = float(client_ts)
+        ordered.append((last_ts, position, item))
+    ordered.sort(key=lambda entry: (entry[0], entry[1]))
+
+    coins = None
+    upgrades: Dict[str, int] = {}
+    stats: Dict[str, int] = {}
+    for _, _, item in ordered:
+        if "coins" in item:
+            coins = _parse_int(item["coins"])
+        upgrades.update(_parse_counters(item.get("upgrades"), MAX_INT))
+        stats.update(_parse_counters(item.get("stats")))
+    if max(len(upgrades), len(stats)) > current_app.config["PROFILE_MAX_KEYS"]:
+        raise ValueError("too many keys")
+    return coins, upgrades, stats
+
+
+@api_bp.route("/sync/batch", methods=["POST"])
+@token_required
+@idempotent("sync_batch")
+@admission_control("sync")
+def sync_batch(user: AuthenticatedUser):
+    """Persist a queue of offline snapshots in a single transaction.
+
+    Request JSON:
+        - ``snapshots`` (array): Ordered snapshots, each an object with
+          optional ``coins`` (number), ``upgrades`` (object), ``stats``
+          (object) and ``clientTs`` (number, client time in ms).
 
     Args:
         user: Injected by :func:`server.auth.token_required`.
@@ -191,63 +697,514 @@ def sync(user: User):
         flask.Response: JSON profile snapshot after persistence.
 
     Status Codes:
-        200: Snapshot saved.
-        400: Invalid JSON payload (non-serializable upgrades/stats).
+        200: Snapshots resolved and saved.
+        400: Empty or malformed ``snapshots``.
+        413: More than ``SYNC_BATCH_MAX_SNAPSHOTS`` snapshots.
+        409 / 422: ``Idempotency-Key`` in use or reused (see ``POST /sync``).
+        429 / 503: Rejected by admission control (see ``POST /sync``).
 
     Side Effects:
-        Writes to the database.
+        Writes to the database once (single commit), no matter how many
+        snapshots were queued.
+
+    Notes:
+        The folded snapshots are merged into the stored profile (pending
+        write-behind snapshots are flushed first): the balance only changes
+        when a snapshot carries ``coins``, and upgrades and stats missing
+        from every snapshot keep their stored values.
+
+        Batches carry no replay: with ``REPLAY_VALIDATION="required"`` they
+        cannot raise the coin balance.
     """
     payload = _parse_payload()
-    coins = payload.get("coins", 0)
-    upgrades = payload.get("upgrades", {})
-    stats = payload.get("stats", {})
+    snapshots = payload.get("snapshots")
+    if not isinstance(snapshots, list) or not snapshots:
+        return jsonify({"message": "Invalid payload"}), 400
+    if len(snapshots) > current_app.config["SYNC_BATCH_MAX_SNAPSHOTS"]:
+        return jsonify({"message": "Too many snapshots"}), 413
 
     try:
-        upgrades_json = json.dumps(upgrades or {})
-        stats_json = json.dumps(stats or {})
+        coins, upgrades, stats = _resolve_snapshots(snapshots)
     except (TypeError, ValueError):
         return jsonify({"message": "Invalid payload"}), 400
 
-    profile = upsert_profile(user, coins, upgrades_json, stats_json)
-    return jsonify({
-        "nickname": user.nickname,
-        "coins": profile.coins,
-        "upgrades": json.loads(profile.upgrades_snapshot or "{}"),
-        "stats": json.loads(profile.stats_snapshot or "{}"),
-        "updatedAt": profile.updated_at.isoformat() if profile.updated_at else None,
-    })
+    allowance = 0 if current_app.config["REPLAY_VALIDATION"] == "required" else None
+    _flush_pending(user.id)
+    profile = upsert_profile(user, coins, upgrades, stats, allowance, replace=False)
+    return _json_response(_profile_json(user.nickname, profile))
+
+
+@api_bp.route("/sync/delta", methods=["POST"])
+@token_required
+@idempotent("sync_delta")
+@admission_control("sync")
+def sync_delta(user: AuthenticatedUser):
+    """Persist only the changed parts of a profile.
+
+    Request JSON:
+        - ``baseVersion`` (int): Profile ``version`` the changes are based on.
+        - ``coins`` (number, optional): New coin balance.
+        - ``upgrades`` (object, optional): Changed upgrade levels only.
+        - ``stats`` (object, optional): Changed stat counters only.
+        - ``replay`` (object, optional): ``moves`` played since
+          ``baseVersion`` (see ``POST /sync``).
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: JSON profile snapshot after persistence.
+
+    Status Codes:
+        200: Delta merged; ``version`` is incremented.
+        400: Missing ``baseVersion`` or malformed fields (or ``replay``).
+        409: ``baseVersion`` is stale. The body carries the current state
+            under ``profile`` so the client can rebase. Also answered while
+            a request with the same ``Idempotency-Key`` is still running.
+        422: ``Idempotency-Key`` reused with a different body.
+        429 / 503: Rejected by admission control (see ``POST /sync``).
+
+    Side Effects:
+        Writes to the database (only the changed columns).
+    """
+    payload = _parse_payload()
+    base_version = payload.get("baseVersion")
+    if isinstance(base_version, bool) or not isinstance(base_version, int):
+        return jsonify({"message": "Invalid payload"}), 400
+    try:
+        coins = payload.get("coins")
+        if coins is not None:
+            coins = _parse_int(coins)
+        upgrades = _parse_counters(payload.get("upgrades"), MAX_INT)
+        stats = _parse_counters(payload.get("stats"))
+    except ValueError:
+        return jsonify({"message": "Invalid payload"}), 400
+
+    try:
+        allowance = _coin_allowance(user, payload.get("replay"), base_version)
+    except ValueError:
+        return jsonify({"message": "Invalid replay"}), 400
+
+    _flush_pending(user.id)
+    try:
+        profile = apply_profile_delta(user, base_version, coins, upgrades, stats, allowance)
+    except ProfileVersionConflict as conflict:
+        return _json_response(
+            f'{{"message":"Profile version conflict","profile":{_profile_json(user.nickname, conflict.profile)}}}',
+            status=409,
+        )
+
+    return _json_response(_profile_json(user.nickname, profile))
 
 
 @api_bp.route("/leaderboard", methods=["GET"])
 @token_required
-def leaderboard(user: User):
-    """Return the leaderboard.
+def leaderboard(user: AuthenticatedUser):
+    """Return a page of the leaderboard.
 
     Query Params:
-        limit: Max number of entries to return (default 25, max 100).
+        limit: Page size (default 25, max 100).
+        cursor: ``nextCursor`` of the previous page; the page starts right
+            after it (keyset pagination, no depth limit).
+        around: ``"me"`` returns the page with the caller in the middle.
+        window: ``"day"``, ``"week"`` or ``"season"`` ranks the coins earned
+            in the current window instead of the balance.
 
     Args:
         user: Injected by :func:`server.auth.token_required`.
 
     Returns:
-        flask.Response: JSON ``{"entries": [...]}`` sorted by coins desc.
+        flask.Response: JSON ``{"entries": [...], "nextCursor": <str|null>}``
+        sorted by ``(coins, updatedAt, id)`` desc. ``around=me`` adds the
+        caller's ``rank``. ``nextCursor`` is ``null`` once a page comes back
+        short. ``window`` adds ``window``, ``windowStart`` and ``windowEnd``.
 
-    Side Effects:
-        Performs a database query.
-    """
-    limit = min(int(request.args.get("limit", 25)), 100)
-    rows = (
-        Profile.query.join(User)
-        .order_by(Profile.coins.desc(), Profile.updated_at.desc())
-        .limit(limit)
-        .all()
-    )
-    payload = [
-        {
-            "nickname": row.user.nickname,
-            "coins": row.coins,
-            "updatedAt": row.updated_at.isoformat() if row.updated_at else None,
+    Status Codes:
+        200: Leaderboard page.
+        304: ``If-None-Match`` matches the current ETag (first lifetime page
+            only, weak comparison).
+        400: Malformed ``cursor``, ``around`` or ``window``.
+
+    Notes:
+        The first page is served from the in-memory rank index (see
+        :mod:`server.leaderboard`) with no database query; its serialized
+        body is cached per ``limit`` until a write changes the top of the
+        table. With ``LEADERBOARD_SNAPSHOT_PATH`` set it is sliced from the
+        snapshot shared by all workers instead (see
+        :func:`_first_leaderboard_page`). Other pages come from
+        :func:`_leaderboard_source`. Windowed pages are keyset queries over
+        the current window's counters only (see
+        :mod:`server.leaderboard_windows`). Bodies above
+        ``RESPONSE_COMPRESSION_MIN_SIZE`` are gzip/deflate encoded when the
+        client accepts it (see :mod:`server.compression`).
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit", 25)), 100))
+    except ValueError:
+        return jsonify({"message": "Invalid limit"}), 400
+    cursor = request.args.get("cursor")
+    around = request.args.get("around")
+    window = request.args.get("window")
+    if window is not None and window not in WINDOWS:
+        return jsonify({"message": "Invalid window"}), 400
+    if around is not None and around != "me":
+        return jsonify({"message": "Invalid around"}), 400
+
+    if window is None and cursor is None and around is None:
+        etag, body = _first_leaderboard_page(limit)
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        if etag is not None:
+            response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return compress_response(response, shared=True)
+
+    extra: Dict[str, Any] = {}
+    if window is None:
+        source = _leaderboard_source()
+    else:
+        start = window_start(datetime.utcnow(), window)
+        source = WindowLeaderboard(get_read_session(), window, start)
+        extra = {
+            "window": window,
+            "windowStart": start.isoformat(),
+            "windowEnd": window_end(start, window).isoformat(),
         }
-        for row in rows
-    ]
-    return jsonify({"entries": payload})
+    if around == "me":
+        rank, entries = source.window(user.id, limit)
+        return compress_response(
+            Response(_render_leaderboard(entries, limit, rank=rank, **extra), mimetype="application/json")
+        )
+    try:
+        after = decode_cursor(cursor) if cursor is not None else None
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    return compress_response(
+        Response(_render_leaderboard(source.page_after(after, limit), limit, **extra), mimetype="application/json")
+    )
+
+
+def _first_leaderboard_page(limit: int) -> Tuple[Optional[str], bytes]:
+    """Return the ETag and body of the first leaderboard page.
+
+    With a shared snapshot configured (``LEADERBOARD_SNAPSHOT_PATH``) the
+    page is sliced from the memory-mapped snapshot file, or queried from the
+    database when the snapshot is stale or missing. Otherwise it comes from
+    the per-process cache over the rank index.
+
+    Args:
+        limit: Page size.
+
+    Returns:
+        Tuple[Optional[str], bytes]: ETag (``None`` for the SQL fallback),
+        distinct per ``limit``, and JSON body.
+    """
+    snapshot = get_leaderboard_snapshot()
+    if snapshot is None:
+        version, body = get_leaderboard_cache().get(limit, lambda entries: _render_leaderboard(entries, limit))
+        # The cache version is shared by every page size: the limit keeps the
+        # ETag (and the compressed-body cache keyed on it) per page.
+        return f"lb-{get_rank_index().epoch}-{version}-{limit}", body
+    page = snapshot.page(limit)
+    if page is not None:
+        return page
+    entries = DatabaseLeaderboard(get_read_session()).page_after(None, limit)
+    return None, _render_leaderboard(entries, limit)
+
+
+def _leaderboard_source():
+    """Pick where cursor and ``around`` pages are read from.
+
+    Returns:
+        RankIndex | DatabaseLeaderboard: The in-memory rank index, or the
+        database (read replica when configured) when
+        ``LEADERBOARD_PAGE_SOURCE`` is ``"database"``.
+    """
+    if current_app.config["LEADERBOARD_PAGE_SOURCE"] == "database":
+        return DatabaseLeaderboard(get_read_session())
+    return get_rank_index()
+
+
+def _render_leaderboard(entries, limit: int, **extra: Any) -> bytes:
+    """Serialize ranked entries into a ``/leaderboard`` response body.
+
+    Args:
+        entries: Ranked :class:`server.leaderboard.LeaderboardEntry` items.
+        limit: Requested page size; a full page gets a ``nextCursor``.
+        **extra: Additional top-level keys (e.g. ``rank``).
+
+    Returns:
+        bytes: UTF-8 JSON ``{"entries": [...], "nextCursor": ..., **extra}``.
+    """
+    payload = {
+        "entries": [entry.to_dict() for entry in entries],
+        "nextCursor": encode_cursor(entries[-1]) if entries and len(entries) >= limit else None,
+        **extra,
+    }
+    return current_app.json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+@api_bp.route("/leaderboard/me", methods=["GET"])
+@token_required
+def leaderboard_me(user: AuthenticatedUser):
+    """Return the caller's absolute rank and the players around it.
+
+    Query Params:
+        radius: Number of neighbours on each side (default 5, max 50).
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: JSON ``{"rank": <int|null>, "total": <int>, "entries": [...]}``.
+
+    Status Codes:
+        200: Rank and neighbours.
+        400: Malformed ``radius``.
+
+    Notes:
+        Served from the in-memory rank index; the rank lookup is a binary
+        search and no database query is performed.
+    """
+    try:
+        radius = max(0, min(int(request.args.get("radius", 5)), 50))
+    except ValueError:
+        return jsonify({"message": "Invalid radius"}), 400
+    index = get_rank_index()
+    rank, entries = index.around(user.id, radius)
+    return jsonify({
+        "rank": rank,
+        "total": len(index),
+        "entries": [entry.to_dict() for entry in entries],
+    })
+
+
+@api_bp.route("/players/search", methods=["GET"])
+@token_required
+def players_search(user: AuthenticatedUser):
+    """Find players whose nickname starts with a prefix, ignoring case.
+
+    Query Params:
+        q: Nickname prefix (1-40 characters).
+        limit: Page size (default 20, max 50).
+        cursor: ``nextCursor`` of the previous page.
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: JSON ``{"entries": [...], "nextCursor": <str|null>}``
+        with ``nickname``, ``coins``, ``rank`` and ``updatedAt`` per player,
+        ordered by lowercased nickname.
+
+    Status Codes:
+        200: Page of matches (possibly empty).
+        400: Missing or over-long ``q``, malformed ``limit`` or ``cursor``.
+
+    Notes:
+        One indexed range query (see :mod:`server.players`); ranks, and the
+        coins they are based on, come from the in-memory rank index. A
+        player missing from it (e.g. registered in another worker) is
+        listed with the stored coins and ``rank`` ``null``.
+    """
+    query = request.args.get("q", "").strip()
+    if not query or len(query) > players.MAX_QUERY_LENGTH:
+        return jsonify({"message": "Invalid q"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 50))
+    except ValueError:
+        return jsonify({"message": "Invalid limit"}), 400
+    cursor = request.args.get("cursor")
+    try:
+        after = players.decode_cursor(cursor) if cursor is not None else None
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+
+    matches = players.search(get_read_session(), query, limit, after)
+    ranked = get_rank_index().entries_of(match.user_id for match in matches)
+    entries = []
+    for match in matches:
+        entry = ranked.get(match.user_id)
+        coins, updated_at = (entry.coins, entry.updated_at) if entry else (match.coins, match.updated_at)
+        entries.append({
+            "nickname": match.nickname,
+            "coins": coins,
+            "rank": entry.rank if entry else None,
+            "updatedAt": updated_at.isoformat() if updated_at else None,
+        })
+    return jsonify({
+        "entries": entries,
+        "nextCursor": players.encode_cursor(matches[-1]) if len(matches) >= limit else None,
+    })
+
+
+STATS_BUCKETS = {"hour": (24, 24 * 30), "day": (7, 366)}
+
+
+def _stats_since() -> Tuple[str, datetime]:
+    """Parse ``period``/``buckets`` query params of the ``/stats`` routes.
+
+    Returns:
+        Tuple[str, datetime]: Period and start of the earliest bucket
+        requested (the current bucket counts as one).
+
+    Raises:
+        ValueError: Unknown period or non-integer ``buckets``.
+    """
+    period = request.args.get("period", "day")
+    if period not in STATS_BUCKETS:
+        raise ValueError("Invalid period")
+    default, maximum = STATS_BUCKETS[period]
+    count = max(1, min(int(request.args.get("buckets", default)), maximum))
+    step = timedelta(hours=1) if period == "hour" else timedelta(days=1)
+    return period, bucket_start(datetime.utcnow(), period) - step * (count - 1)
+
+
+def _rolled_up_at() -> Optional[str]:
+    moment = rolled_up_at()
+    return moment.isoformat() if moment else None
+
+
+@api_bp.route("/stats/me", methods=["GET"])
+@token_required
+def stats_me(user: AuthenticatedUser):
+    """Return the caller's score buckets.
+
+    Query Params:
+        period: ``"hour"`` or ``"day"`` (default).
+        buckets: Number of most recent buckets (default 24 hours / 7 days,
+            max 720 / 366).
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: JSON ``{"period", "buckets": [...], "totals":
+        {"coinsEarned", "coinsSpent", "syncs"}, "rolledUpAt"}``. Buckets
+        without writes are omitted.
+
+    Status Codes:
+        200: Buckets.
+        400: Invalid ``period`` or ``buckets``.
+
+    Notes:
+        Read from the rollups of :mod:`server.score_events`, which lag the
+        latest writes by up to ``SCORE_ROLLUP_INTERVAL`` seconds.
+    """
+    try:
+        period, since = _stats_since()
+    except ValueError:
+        return jsonify({"message": "Invalid period or buckets"}), 400
+    buckets = player_buckets(user.id, period, since)
+    return jsonify({
+        "period": period,
+        "buckets": buckets,
+        "totals": {key: sum(bucket[key] for bucket in buckets) for key in ("coinsEarned", "coinsSpent", "syncs")},
+        "rolledUpAt": _rolled_up_at(),
+    })
+
+
+@api_bp.route("/stats/global", methods=["GET"])
+@token_required
+def stats_global(user: AuthenticatedUser):
+    """Return active players and coin totals per bucket.
+
+    Query Params:
+        period: ``"hour"`` or ``"day"`` (default).
+        buckets: Number of most recent buckets (see :func:`stats_me`).
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: JSON ``{"period", "buckets": [...], "rolledUpAt"}``;
+        each bucket has ``start``, ``players``, ``coinsEarned``,
+        ``coinsSpent`` and ``syncs``.
+
+    Status Codes:
+        200: Buckets.
+        400: Invalid ``period`` or ``buckets``.
+    """
+    try:
+        period, since = _stats_since()
+    except ValueError:
+        return jsonify({"message": "Invalid period or buckets"}), 400
+    return jsonify({"period": period, "buckets": global_buckets(period, since), "rolledUpAt": _rolled_up_at()})
+
+
+@api_bp.route("/stats/earners", methods=["GET"])
+@token_required
+def stats_earners(user: AuthenticatedUser):
+    """Rank players by coins earned over the most recent buckets.
+
+    Query Params:
+        period: ``"hour"`` or ``"day"`` (default).
+        buckets: Number of most recent buckets (see :func:`stats_me`).
+        limit: Number of players (default 25, max 100).
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: JSON ``{"period", "entries": [{"rank", "nickname",
+        "coinsEarned"}], "rolledUpAt"}``.
+
+    Status Codes:
+        200: Ranking.
+        400: Invalid ``period``, ``buckets`` or ``limit``.
+    """
+    try:
+        period, since = _stats_since()
+        limit = max(1, min(int(request.args.get("limit", 25)), 100))
+    except ValueError:
+        return jsonify({"message": "Invalid period, buckets or limit"}), 400
+    return jsonify({"period": period, "entries": top_earners(period, since, limit), "rolledUpAt": _rolled_up_at()})
+
+
+@api_bp.route("/admin/export", methods=["GET"])
+@token_required
+@admin_required
+def admin_export(user: AuthenticatedUser):
+    """Stream every profile, or the full leaderboard, for analytics.
+
+    Query Params:
+        dataset: ``"profiles"`` (default) or ``"leaderboard"``.
+        format: ``"ndjson"`` (default) or ``"csv"``.
+        since: ISO 8601 timestamp; only profiles updated at or after it are
+            exported (``profiles`` only).
+
+    Args:
+        user: Injected by :func:`server.auth.token_required`.
+
+    Returns:
+        flask.Response: Streamed ``application/x-ndjson`` or ``text/csv``
+        attachment (see :mod:`server.export` for the fields).
+
+    Status Codes:
+        200: Export stream.
+        400: Unknown dataset/format, malformed ``since`` or ``since`` with
+            the leaderboard.
+        403: Caller is not in ``ADMIN_NICKNAMES``.
+
+    Notes:
+        Rows are read in ``EXPORT_BATCH_SIZE`` batches from the read replica
+        when one is configured, so memory use does not grow with the table.
+    """
+    dataset = request.args.get("dataset", "profiles")
+    fmt = request.args.get("format", "ndjson")
+    try:
+        chunks = export(
+            get_read_session(),
+            dataset,
+            fmt,
+            since=parse_since(request.args.get("since")),
+            batch_size=current_app.config["EXPORT_BATCH_SIZE"],
+        )
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+    response = Response(stream_with_context(chunks), mimetype=FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
@@ -0,0 +1,436 @@
+"""Append-only score event log and its time-bucketed rollups.
+
+A :class:`server.models.Profile` row only holds the latest state, so
+"coins earned this week" or "daily active players" cannot be answered from
+it. Every profile write therefore appends a :class:`server.models.ScoreEvent`
+(see :func:`record_score_event`), and an incremental job keeps hourly and
+daily aggregates:
+
+- :func:`roll_up` folds the events after the watermark
+  (:class:`server.models.RollupWatermark`) into
+  :class:`server.models.PlayerScoreRollup` rows, then recomputes the touched
+  :class:`server.models.GlobalScoreRollup` buckets from the player rows (so
+  ``players`` is an exact distinct count);
+- :func:`compact` deletes rolled-up events older than
+  ``SCORE_EVENT_RETENTION_DAYS`` and hourly player buckets older than
+  ``SCORE_HOURLY_RETENTION_DAYS``, which keeps raw storage bounded;
+- :func:`player_buckets`, :func:`global_buckets` and :func:`top_earners`
+  read the rollups only, never the raw events.
+
+The job runs in a background thread of each process every
+``SCORE_ROLLUP_INTERVAL`` seconds, or from cron with
+``python -m server.rollups``. The same job rotates ended leaderboard
+windows (see :mod:`server.leaderboard_windows`).
+
+Notes:
+    The watermark is advanced with a compare-and-set update in the same
+    transaction as the rollup writes, so concurrent runs (several workers,
+    or a worker and cron) never fold an event twice: the loser rolls back.
+
+    Events younger than ``SCORE_ROLLUP_SETTLE`` seconds are left for the
+    next run. On databases that allocate ids before commit, an event with a
+    lower id may become visible after a higher one; the settle delay keeps
+    such events from being skipped by the watermark.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from flask import Flask, current_app
+from sqlalchemy.exc import IntegrityError
+
+from .database import db
+from .leaderboard_windows import record_window_gain, rotate_windows
+from .models import GlobalScoreRollup, PlayerScoreRollup, RollupWatermark, ScoreEvent, User
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("hour", "day")
+WATERMARK = "score_rollups"
+
+BucketKey = Tuple[str, datetime]
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    """Return the start of the bucket containing ``moment``.
+
+    Args:
+        moment: Naive UTC timestamp.
+        period: ``"hour"`` or ``"day"``.
+
+    Returns:
+        datetime: ``moment`` truncated to the hour or the day.
+    """
+    if period == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_score_event(user_id: int, coins_delta: int, coins: int, earned: Optional[int] = None) -> None:
+    """Append a score event to the current session.
+
+    Call before committing a profile write, so the event is stored in the
+    same transaction (and dropped with it on rollback).
+
+    Args:
+        user_id: Owner of the profile.
+        coins_delta: Balance change made by the write.
+        coins: Balance after the write.
+        earned: Coins the write verifiably earned, i.e. its gain after the
+            replay cap (see :mod:`server.replay`); ``None`` when the gain was
+            not validated. Windowed leaderboards count the positive part of
+            ``coins_delta``, or only ``earned`` with
+            ``LEADERBOARD_WINDOW_VERIFIED_ONLY``.
+
+    Side Effects:
+        Adds a :class:`server.models.ScoreEvent` to ``db.session``, queues
+        the earned coins for the windowed leaderboards (see
+        :func:`server.leaderboard_windows.record_window_gain`) and makes sure
+        the rollup thread of this process is running.
+    """
+    db.session.add(ScoreEvent(user_id=user_id, coins_delta=coins_delta, coins=coins, created_at=datetime.utcnow()))
+    if not current_app.config["LEADERBOARD_WINDOW_VERIFIED_ONLY"]:
+        earned = coins_delta
+    record_window_gain(user_id, earned or 0)
+    rollups = current_app.extensions.get("score_rollups")
+    if rollups is not None:
+        rollups.ensure_worker()
+
+
+def _watermark() -> RollupWatermark:
+    watermark = db.session.get(RollupWatermark, WATERMARK)
+    if watermark is not None:
+        return watermark
+    try:
+        db.session.add(RollupWatermark(name=WATERMARK, last_event_id=0))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+    return db.session.get(RollupWatermark, WATERMARK)
+
+
+def roll_up(batch_size: Optional[int] = None, settle: Optional[float] = None) -> int:
+    """Fold one batch of new score events into the rollups.
+
+    Args:
+        batch_size: Maximum events read (default ``SCORE_ROLLUP_BATCH_SIZE``).
+        settle: Minimum event age in seconds (default ``SCORE_ROLLUP_SETTLE``).
+
+    Returns:
+        int: Number of events folded; ``0`` when there was nothing to do or
+        another run advanced the watermark first.
+
+    Side Effects:
+        Upserts rollup rows and advances the watermark in one transaction.
+    """
+    config = current_app.config
+    batch_size = batch_size or config["SCORE_ROLLUP_BATCH_SIZE"]
+    settle = config["SCORE_ROLLUP_SETTLE"] if settle is None else settle
+    last_id = _watermark().last_event_id
+    cutoff = datetime.utcnow() - timedelta(seconds=settle)
+
+    rows = db.session.execute(
+        db.select(ScoreEvent.id, ScoreEvent.user_id, ScoreEvent.created_at, ScoreEvent.coins_delta, ScoreEvent.coins)
+        .where(ScoreEvent.id > last_id)
+        .order_by(ScoreEvent.id)
+        .limit(batch_size)
+    ).all()
+    events = []
+    for row in rows:
+        if row.created_at > cutoff:
+            break
+        events.append(row)
+    if not events:
+        db.session.rollback()
+        return 0
+
+    advanced = db.session.execute(
+        db.update(RollupWatermark)
+        .where(RollupWatermark.name == WATERMARK, RollupWatermark.last_event_id == last_id)
+        .values(last_event_id=events[-1].id, updated_at=datetime.utcnow())
+    ).rowcount
+    if advanced != 1:
+        db.session.rollback()
+        return 0
+
+    # (period, bucket, user) -> [earned, spent, syncs, coins]; events are in
+    # id order, so the last one seen sets the closing balance.
+    totals: Dict[Tuple[str, datetime, int], List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    for event in events:
+        for period in PERIODS:
+            entry = totals[(period, bucket_start(event.created_at, period), event.user_id)]
+            if event.coins_delta > 0:
+                entry[0] += event.coins_delta
+            else:
+                entry[1] -= event.coins_delta
+            entry[2] += 1
+            entry[3] = event.coins
+
+    touched: Set[BucketKey] = {(period, start) for period, start, _ in totals}
+    users = {user_id for _, _, user_id in totals}
+    existing = {
+        (row.period, row.bucket_start, row.user_id): row
+        for row in db.session.scalars(
+            db.select(PlayerScoreRollup).where(
+                PlayerScoreRollup.user_id.in_(users),
+                db.tuple_(PlayerScoreRollup.period, PlayerScoreRollup.bucket_start).in_(touched),
+            )
+        )
+    }
+    for key, (earned, spent, syncs, coins) in totals.items():
+        row = existing.get(key)
+        if row is None:
+            period, start, user_id = key
+            db.session.add(PlayerScoreRollup(
+                user_id=user_id, period=period, bucket_start=start,
+                coins_earned=earned, coins_spent=spent, syncs=syncs, coins=coins,
+            ))
+        else:
+            row.coins_earned += earned
+            row.coins_spent += spent
+            row.syncs += syncs
+            row.coins = coins
+    db.session.flush()
+    _refresh_global(touched)
+    db.session.commit()
+    return len(events)
+
+
+def _refresh_global(buckets: Set[BucketKey]) -> None:
+    """Recompute global buckets from the player rollups of the same buckets."""
+    aggregates = db.session.execute(
+        db.select(
+            PlayerScoreRollup.period,
+            PlayerScoreRollup.bucket_start,
+            db.func.count(),
+            db.func.sum(PlayerScoreRollup.coins_earned),
+            db.func.sum(PlayerScoreRollup.coins_spent),
+            db.func.sum(PlayerScoreRollup.syncs),
+        )
+        .where(db.tuple_(PlayerScoreRollup.period, PlayerScoreRollup.bucket_start).in_(buckets))
+        .group_by(PlayerScoreRollup.period, PlayerScoreRollup.bucket_start)
+    ).all()
+    for period, start, players, earned, spent, syncs in aggregates:
+        row = db.session.get(GlobalScoreRollup, (period, start))
+        if row is None:
+            row = GlobalScoreRollup(period=period, bucket_start=start)
+            db.session.add(row)
+        row.players = players
+        row.coins_earned = earned
+        row.coins_spent = spent
+        row.syncs = syncs
+
+
+def roll_up_all(batch_size: Optional[int] = None, settle: Optional[float] = None) -> int:
+    """Run :func:`roll_up` until no settled event is left.
+
+    Returns:
+        int: Total number of events folded.
+    """
+    total = 0
+    while True:
+        folded = roll_up(batch_size, settle)
+        if not folded:
+            return total
+        total += folded
+
+
+def compact(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Delete raw events and hourly player buckets past their retention.
+
+    Only events at or below the watermark are deleted, so nothing is lost
+    before it has been rolled up. Daily player buckets and all global
+    buckets are kept.
+
+    Args:
+        now: Reference UTC time (defaults to now).
+
+    Returns:
+        Dict[str, int]: ``events`` and ``hourlyBuckets`` deleted.
+
+    Side Effects:
+        Deletes rows and commits.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    last_id = _watermark().last_event_id
+    events = db.session.execute(
+        db.delete(ScoreEvent).where(
+            ScoreEvent.id <= last_id,
+            ScoreEvent.created_at < now - timedelta(days=config["SCORE_EVENT_RETENTION_DAYS"]),
+        )
+    ).rowcount
+    hourly = db.session.execute(
+        db.delete(PlayerScoreRollup).where(
+            PlayerScoreRollup.period == "hour",
+            PlayerScoreRollup.bucket_start < now - timedelta(days=config["SCORE_HOURLY_RETENTION_DAYS"]),
+        )
+    ).rowcount
+    db.session.commit()
+    return {"events": events, "hourlyBuckets": hourly}
+
+
+def _bucket_dict(row: Any, **extra: Any) -> Dict[str, Any]:
+    return {
+        "start": row.bucket_start.isoformat(),
+        **extra,
+        "coinsEarned": row.coins_earned,
+        "coinsSpent": row.coins_spent,
+        "syncs": row.syncs,
+    }
+
+
+def player_buckets(user_id: int, period: str, since: datetime) -> List[Dict[str, Any]]:
+    """Return a player's buckets starting at or after ``since``.
+
+    Args:
+        user_id: Player.
+        period: ``"hour"`` or ``"day"``.
+        since: Earliest bucket start (UTC).
+
+    Returns:
+        List[Dict[str, Any]]: Buckets in chronological order, each with
+        ``start``, ``coinsEarned``, ``coinsSpent``, ``syncs`` and ``coins``
+        (closing balance). Buckets without writes are omitted.
+    """
+    rows = db.session.scalars(
+        db.select(PlayerScoreRollup)
+        .where(
+            PlayerScoreRollup.user_id == user_id,
+            PlayerScoreRollup.period == period,
+            PlayerScoreRollup.bucket_start >= since,
+        )
+        .order_by(PlayerScoreRollup.bucket_start)
+    )
+    return [{**_bucket_dict(row), "coins": row.coins} for row in rows]
+
+
+def global_buckets(period: str, since: datetime) -> List[Dict[str, Any]]:
+    """Return global buckets starting at or after ``since``.
+
+    Args:
+        period: ``"hour"`` or ``"day"``.
+        since: Earliest bucket start (UTC).
+
+    Returns:
+        List[Dict[str, Any]]: Buckets in chronological order, each with
+        ``start``, ``players`` (active players), ``coinsEarned``,
+        ``coinsSpent`` and ``syncs``.
+    """
+    rows = db.session.scalars(
+        db.select(GlobalScoreRollup)
+        .where(GlobalScoreRollup.period == period, GlobalScoreRollup.bucket_start >= since)
+        .order_by(GlobalScoreRollup.bucket_start)
+    )
+    return [_bucket_dict(row, players=row.players) for row in rows]
+
+
+def top_earners(period: str, since: datetime, limit: int) -> List[Dict[str, Any]]:
+    """Rank players by coins earned in the buckets starting at or after ``since``.
+
+    Args:
+        period: Granularity of the buckets summed (``"hour"`` or ``"day"``).
+        since: Earliest bucket start (UTC).
+        limit: Maximum number of players.
+
+    Returns:
+        List[Dict[str, Any]]: Entries with ``rank``, ``nickname`` and
+        ``coinsEarned``, highest first (ties by user id).
+    """
+    earned = db.func.sum(PlayerScoreRollup.coins_earned).label("earned")
+    totals = (
+        db.select(PlayerScoreRollup.user_id, earned)
+        .where(PlayerScoreRollup.period == period, PlayerScoreRollup.bucket_start >= since)
+        .group_by(PlayerScoreRollup.user_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(User.nickname, totals.c.earned)
+        .join(totals, totals.c.user_id == User.id)
+        .where(totals.c.earned > 0)
+        .order_by(totals.c.earned.desc(), User.id)
+        .limit(limit)
+    ).all()
+    return [
+        {"rank": rank, "nickname": nickname, "coinsEarned": int(coins)}
+        for rank, (nickname, coins) in enumerate(rows, start=1)
+    ]
+
+
+def rolled_up_at() -> Optional[datetime]:
+    """Return when the rollups last advanced (``None`` before the first run)."""
+    watermark = db.session.get(RollupWatermark, WATERMARK)
+    return watermark.updated_at if watermark is not None and watermark.last_event_id else None
+
+
+class ScoreRollups:
+    """Background runner of :func:`roll_up_all` and :func:`compact`.
+
+    Args:
+        app: Flask application; the thread works inside its app context.
+        interval: Seconds between two runs.
+    """
+
+    def __init__(self, app: Flask, interval: float):
+        self.app = app
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread_pid: Optional[int] = None
+
+    def run_once(self) -> Tuple[int, Dict[str, int]]:
+        """Roll up every settled event, compact, then rotate ended leaderboard windows.
+
+        Returns:
+            Tuple[int, Dict[str, int]]: Events folded, and rows compacted and
+            rotated.
+        """
+        with self.app.app_context():
+            try:
+                return roll_up_all(), {**compact(), **rotate_windows()}
+            finally:
+                db.session.remove()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Score rollup failed")
+
+    def ensure_worker(self) -> None:
+        """Start the rollup thread in the current process if needed.
+
+        Started lazily, like the leaderboard snapshot refresher, so it lives
+        in each forked worker.
+        """
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            threading.Thread(target=self._run, name="score-rollups", daemon=True).start()
+            self._thread_pid = pid
+
+
+def init_score_rollups(app: Flask) -> Optional[ScoreRollups]:
+    """Configure the in-process rollup thread unless ``SCORE_ROLLUP_INTERVAL`` is ``0``.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        Optional[ScoreRollups]: Runner stored in
+        ``app.extensions["score_rollups"]``, or ``None`` when rollups are
+        left to an external scheduler.
+    """
+    interval = float(app.config["SCORE_ROLLUP_INTERVAL"])
+    rollups = ScoreRollups(app, interval) if interval > 0 else None
+    app.extensions["score_rollups"] = rollups
+    return rollups
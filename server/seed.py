@@ -1,22 +1,81 @@
-"""Utility script to populate the database with a demo user.
+"""Populate the database with users and profiles.
 
-This script prompts for a nickname/password and inserts a new user.
+Without arguments the script prompts for a nickname/password and inserts a
+single user, as before. The ``generate`` and ``import`` commands build large
+databases for capacity testing:
+
+- rows are inserted with SQLAlchemy Core ``executemany`` in batches of
+  ``--batch-size`` (one transaction per batch);
+- ids are assigned up front, so profiles and their typed upgrade/stat rows
+  are inserted set-wise instead of by the per-row
+  ``create_profile_after_user_insert`` ORM hook (which Core inserts do not
+  fire); ``nickname_lower`` is filled in the same way;
+- with ``--test-data`` every user gets the same password hash, computed
+  once with a cheap method, instead of hashing each password.
+
+Input files for ``import`` are CSV (header row) or NDJSON (one object per
+line) with the fields ``nickname``, ``password`` or ``password_hash``,
+``coins``, ``upgrades``, ``stats`` and ``updatedAt`` (ISO 8601, UTC). In CSV,
+``upgrades`` and ``stats`` are JSON object strings.
 
 Examples:
     Run from repository root:
 
     >>> # python -m server.seed
+    >>> # python -m server.seed generate --users 1000000 --test-data
+    >>> # python -m server.seed import players.ndjson --test-data --password secret123
 """
 
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
 from getpass import getpass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional
+
+from werkzeug.security import generate_password_hash
 
 from .app import create_app
 from .auth import hash_password
 from .database import db
-from .models import User
+from .models import Profile, ProfileStat, ProfileUpgrade, User, normalize_nickname, render_counters
+from .wire import STAT_KEYS, UPGRADE_KEYS
+
+TEST_HASH_METHOD = "pbkdf2:sha256:1000"
+
+
+class SeedReport(NamedTuple):
+    """Outcome of a bulk insert.
 
+    Attributes:
+        users: Inserted users (one profile each).
+        typed_rows: Inserted upgrade and stat rows.
+        seconds: Wall-clock duration.
+    """
+    users: int
+    typed_rows: int
+    seconds: float
+
+    @property
+    def rows(self) -> int:
+        """Total inserted rows (users, profiles and typed rows)."""
+        return self.users * 2 + self.typed_rows
+
+    def summary(self) -> str:
+        """Return a one-line human-readable summary."""
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        return (
+            f"Inserted {self.users} users, {self.users} profiles and {self.typed_rows} "
+            f"upgrade/stat rows in {self.seconds:.1f}s ({rate:,.0f} rows/s)"
+        )
 
-def main():
+
+def create_user_interactive():
     """Create a single user from interactive input.
 
     Side Effects:
@@ -34,5 +93,237 @@ def main():
         print(f"Created user {nickname}")
 
 
+def _counters(value: Any) -> Dict[str, int]:
+    if value in (None, ""):
+        return {}
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, dict):
+        raise ValueError("expected an object")
+    return {str(key)[:64]: int(level) for key, level in value.items()}
+
+
+def generate_records(count: int, rng: random.Random, prefix: str = "player") -> Iterator[Dict[str, Any]]:
+    """Yield synthetic players with plausible progress.
+
+    Coins follow a long-tailed distribution, upgrade levels and stat
+    counters are random, and ``updatedAt`` falls within the last 30 days.
+
+    Args:
+        count: Number of players.
+        rng: Random generator (seeded for reproducibility).
+        prefix: Nickname prefix; a sequence number is appended.
+
+    Yields:
+        Dict[str, Any]: Records accepted by :func:`bulk_insert`.
+    """
+    now = datetime.utcnow()
+    for number in range(count):
+        upgrades = {key: rng.randint(1, 5) for key in UPGRADE_KEYS if rng.random() < 0.6}
+        stats = {key: rng.randint(0, 5000) for key in STAT_KEYS}
+        yield {
+            "nickname": f"{prefix}{number:07d}",
+            "coins": int(rng.paretovariate(1.2) * 100),
+            "upgrades": upgrades,
+            "stats": stats,
+            "updated_at": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+        }
+
+
+def read_records(path: Path, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream player records from a CSV or NDJSON file.
+
+    Args:
+        path: Input file.
+        fmt: ``"csv"`` or ``"ndjson"``; guessed from the suffix when omitted.
+
+    Yields:
+        Dict[str, Any]: Records accepted by :func:`bulk_insert`.
+
+    Raises:
+        ValueError: On malformed lines (the line number is included).
+    """
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+    with path.open(encoding="utf-8", newline="") as handle:
+        if fmt == "csv":
+            rows: Iterable[Mapping[str, Any]] = csv.DictReader(handle)
+        else:
+            rows = (json.loads(line) for line in handle if line.strip())
+        for line, row in enumerate(rows, start=1):
+            try:
+                updated_at = row.get("updatedAt") or row.get("updated_at")
+                yield {
+                    "nickname": str(row["nickname"]).strip(),
+                    "password": row.get("password") or None,
+                    "password_hash": row.get("password_hash") or None,
+                    "coins": max(0, int(row.get("coins") or 0)),
+                    "upgrades": _counters(row.get("upgrades")),
+                    "stats": _counters(row.get("stats")),
+                    "updated_at": datetime.fromisoformat(updated_at) if updated_at else None,
+                }
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"{path}:{line}: {exc}") from exc
+
+
+def _next_id(table) -> int:
+    return db.session.execute(db.select(db.func.coalesce(db.func.max(table.c.id), 0))).scalar_one() + 1
+
+
+def _sync_sequences() -> None:
+    """Move PostgreSQL id sequences past explicitly inserted ids."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for table in (User.__table__, Profile.__table__):
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+    db.session.commit()
+
+
+def bulk_insert(
+    records: Iterable[Dict[str, Any]],
+    batch_size: int = 5000,
+    shared_hash: Optional[str] = None,
+    progress=None,
+) -> SeedReport:
+    """Insert users, profiles and typed rows in Core ``executemany`` batches.
+
+    Args:
+        records: Player records with ``nickname``, ``coins``, ``upgrades``,
+            ``stats``, ``updated_at`` and either ``password_hash`` or
+            ``password``.
+        batch_size: Users per transaction.
+        shared_hash: Password hash used for every user (test data); when
+            ``None``, ``password_hash`` is stored verbatim or ``password`` is
+            hashed with the configured hasher.
+        progress: Optional callback receiving the running :class:`SeedReport`
+            after every batch.
+
+    Returns:
+        SeedReport: Counts and duration.
+
+    Raises:
+        ValueError: If a record has neither a password nor a hash and no
+            ``shared_hash`` is given.
+
+    Side Effects:
+        Writes to the database (one commit per batch). Must run inside an
+        app context. Running servers merge the new players into their rank
+        index on the next refresh (see
+        :class:`server.leaderboard.RankIndexRefresher`).
+    """
+    users_table = User.__table__
+    profiles_table = Profile.__table__
+    user_id = _next_id(users_table)
+    profile_id = _next_id(profiles_table)
+    started = time.perf_counter()
+    users = typed = 0
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        now = datetime.utcnow()
+        user_rows: List[Dict[str, Any]] = []
+        profile_rows: List[Dict[str, Any]] = []
+        upgrade_rows: List[Dict[str, Any]] = []
+        stat_rows: List[Dict[str, Any]] = []
+        for record in batch:
+            password_hash = shared_hash or record.get("password_hash")
+            if not password_hash:
+                if not record.get("password"):
+                    raise ValueError(f"no password for {record['nickname']!r}")
+                password_hash = hash_password(record["password"])
+            user_rows.append({
+                "id": user_id,
+                "nickname": record["nickname"],
+                "nickname_lower": normalize_nickname(record["nickname"]),
+                "password_hash": password_hash,
+                "created_at": now,
+            })
+            profile_rows.append({
+                "id": profile_id,
+                "user_id": user_id,
+                "coins": record["coins"],
+                "upgrades_snapshot": render_counters(record["upgrades"]),
+                "stats_snapshot": render_counters(record["stats"]),
+                "updated_at": record.get("updated_at") or now,
+                "version": 1,
+            })
+            upgrade_rows.extend(
+                {"profile_id": profile_id, "upgrade_id": key, "level": level}
+                for key, level in record["upgrades"].items()
+            )
+            stat_rows.extend(
+                {"profile_id": profile_id, "name": key, "value": value, "updated_at": now}
+                for key, value in record["stats"].items()
+            )
+            user_id += 1
+            profile_id += 1
+        db.session.execute(users_table.insert(), user_rows)
+        db.session.execute(profiles_table.insert(), profile_rows)
+        if upgrade_rows:
+            db.session.execute(ProfileUpgrade.__table__.insert(), upgrade_rows)
+        if stat_rows:
+            db.session.execute(ProfileStat.__table__.insert(), stat_rows)
+        db.session.commit()
+        users += len(user_rows)
+        typed += len(upgrade_rows) + len(stat_rows)
+        if progress is not None:
+            progress(SeedReport(users, typed, time.perf_counter() - started))
+    _sync_sequences()
+    return SeedReport(users, typed, time.perf_counter() - started)
+
+
+def main(argv=None):
+    """Command line entry point.
+
+    Args:
+        argv: Arguments (defaults to ``sys.argv[1:]``). Without a command the
+            interactive single-user mode runs.
+    """
+    parser = argparse.ArgumentParser(description="Create users and profiles.")
+    commands = parser.add_subparsers(dest="command")
+    generate = commands.add_parser("generate", help="insert synthetic players")
+    generate.add_argument("--users", type=int, required=True, help="number of players")
+    generate.add_argument("--prefix", default="player", help="nickname prefix")
+    generate.add_argument("--seed", type=int, default=1, help="random seed")
+    load = commands.add_parser("import", help="insert players from a CSV/NDJSON file")
+    load.add_argument("path", type=Path)
+    load.add_argument("--format", choices=("csv", "ndjson"), help="input format (default: by suffix)")
+    for command in (generate, load):
+        command.add_argument("--batch-size", type=int, default=5000, help="users per transaction")
+        command.add_argument("--database-url", help="override DATABASE_URL")
+        command.add_argument(
+            "--test-data",
+            action="store_true",
+            help=f"give every user one shared password hash ({TEST_HASH_METHOD})",
+        )
+        command.add_argument("--password", default="password123", help="password behind the shared hash")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        create_user_interactive()
+        return
+    if args.command == "generate" and not args.test_data:
+        parser.error("generate requires --test-data")
+
+    overrides = {"SQLALCHEMY_DATABASE_URI": args.database_url} if args.database_url else None
+    app = create_app(overrides)
+    shared_hash = generate_password_hash(args.password, TEST_HASH_METHOD) if args.test_data else None
+    if args.command == "generate":
+        records = generate_records(args.users, random.Random(args.seed), args.prefix)
+    else:
+        records = read_records(args.path, args.format)
+
+    def progress(report: SeedReport) -> None:
+        print(report.summary(), file=sys.stderr)
+
+    with app.app_context():
+        report = bulk_insert(records, args.batch_size, shared_hash, progress)
+    print(report.summary())
+
+
 if __name__ == "__main__":
     main()
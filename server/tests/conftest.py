@@ -0,0 +1,62 @@
+"""Shared fixtures of the backend test suite.
+
+Every test gets apps built by :func:`server.app.create_app` on its own
+temporary SQLite database, with admission control and background threads
+disabled and a cheap password hash, so requests run inline and fast.
+
+Run from the repository root:
+
+    >>> # pip install -r server/requirements-dev.txt
+    >>> # python -m pytest server/tests
+"""
+
+import pytest
+
+from server.app import create_app
+
+PASSWORD = "secret123"
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Return a factory of apps sharing the test's database.
+
+    Several apps on the same database stand in for several gunicorn
+    workers. Keyword arguments override the test configuration.
+    """
+    def build(**overrides):
+        config = {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+            "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1",
+            "PASSWORD_HASH_WORKERS": 0,
+            "ADMISSION_ENABLED": False,
+            "SCORE_ROLLUP_INTERVAL": 0,
+            "RANK_INDEX_REFRESH_INTERVAL": 0,
+        }
+        config.update(overrides)
+        return create_app(config)
+
+    return build
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register_with(client, nickname, password=PASSWORD):
+    """Register ``nickname`` through ``client`` and return its auth headers."""
+    response = client.post("/api/register", json={"nickname": nickname, "password": password})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def register(client):
+    """Register a player on the default app; returns its auth headers."""
+    return lambda nickname, password=PASSWORD: register_with(client, nickname, password)
@@ -0,0 +1,75 @@
+from server.tests.conftest import register_with
+
+SNAPSHOT = {"coins": 1, "upgrades": {}, "stats": {}}
+
+
+def _admitting_app(make_app, **overrides):
+    config = {"ADMISSION_ENABLED": True, "ADMISSION_AUTH_CLIENT_BURST": 100}
+    config.update(overrides)
+    return make_app(**config)
+
+
+def test_client_over_its_rate_gets_429_with_retry_after(make_app):
+    app = _admitting_app(make_app, ADMISSION_SYNC_CLIENT_RATE=0.1, ADMISSION_SYNC_CLIENT_BURST=2)
+    client = app.test_client()
+    alice, bobby = register_with(client, "alice"), register_with(client, "bobby")
+
+    statuses = [client.post("/api/sync", json=SNAPSHOT, headers=alice).status_code for _ in range(2)]
+    rejected = client.post("/api/sync", json=SNAPSHOT, headers=alice)
+
+    assert statuses == [200, 200]
+    assert rejected.status_code == 429
+    assert 1 <= int(rejected.headers["Retry-After"]) <= 10
+    assert client.post("/api/sync", json=SNAPSHOT, headers=bobby).status_code == 200
+    assert app.extensions["admission"].stats()["rejectedClient"] == 1
+
+
+def test_server_over_its_rate_gets_503(make_app):
+    app = _admitting_app(make_app, ADMISSION_SYNC_RATE=0.01, ADMISSION_SYNC_BURST=1)
+    client = app.test_client()
+    alice, bobby = register_with(client, "alice"), register_with(client, "bobby")
+
+    assert client.post("/api/sync", json=SNAPSHOT, headers=alice).status_code == 200
+    rejected = client.post("/api/sync", json=SNAPSHOT, headers=bobby)
+
+    assert rejected.status_code == 503
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert app.extensions["admission"].stats()["rejectedGlobal"] == 1
+
+
+def test_full_concurrency_gate_gets_503(make_app):
+    app = _admitting_app(make_app, ADMISSION_MAX_CONCURRENT=1)
+    client = app.test_client()
+    alice = register_with(client, "alice")
+    gate = app.extensions["admission"].gate
+
+    assert gate.try_enter()
+    try:
+        rejected = client.post("/api/sync", json=SNAPSHOT, headers=alice)
+    finally:
+        gate.leave()
+
+    assert (rejected.status_code, rejected.headers["Retry-After"]) == (503, "1")
+    assert app.extensions["admission"].stats()["rejectedConcurrency"] == 1
+    assert client.post("/api/sync", json=SNAPSHOT, headers=alice).status_code == 200
+
+
+def test_disabled_admission_lets_everything_through(client, register):
+    alice = register("alice")
+
+    assert all(client.post("/api/sync", json=SNAPSHOT, headers=alice).status_code == 200 for _ in range(30))
+
+
+def test_auth_limit_is_per_address_and_nickname(make_app):
+    app = make_app(ADMISSION_ENABLED=True, ADMISSION_AUTH_CLIENT_RATE=0.1, ADMISSION_AUTH_CLIENT_BURST=2)
+    client = app.test_client()
+    register_with(client, "alice")
+
+    def login(nickname):
+        return client.post("/api/login", json={"nickname": nickname, "password": "wrong"}).status_code
+
+    assert login("Alice") == 401
+    assert login("alice") == 429
+    # Another player behind the same address is not throttled.
+    register_with(client, "bobby")
+    assert login("bobby") == 401
@@ -0,0 +1,77 @@
+import threading
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from server.auth import _get_serializer, get_token_cache, verify_token
+from server.database import db
+from server.hashing import PasswordHasher
+from server.models import User
+from server.tests.conftest import PASSWORD
+
+
+def test_login_upgrades_outdated_hash_inline(app, client, register):
+    register("alice")
+    with app.app_context():
+        user = db.session.execute(db.select(User).filter_by(nickname="alice")).scalar_one()
+        user.password_hash = generate_password_hash(PASSWORD, "pbkdf2:sha256:2")
+        db.session.commit()
+
+    response = client.post("/api/login", json={"nickname": "alice", "password": PASSWORD})
+
+    assert response.status_code == 200
+    with app.app_context():
+        stored = db.session.execute(db.select(User.password_hash).filter_by(nickname="alice")).scalar_one()
+    assert stored.startswith("pbkdf2:sha256:1$")
+
+
+def test_pool_rehash_is_stored_by_writer_thread():
+    hasher = PasswordHasher("pbkdf2:sha256:1", workers=1, max_pending=4, timeout=30)
+    stored = threading.Event()
+    seen = {}
+
+    def on_done(new_hash):
+        seen["thread"] = threading.current_thread().name
+        seen["hash"] = new_hash
+        stored.set()
+
+    try:
+        hasher.rehash_in_background(PASSWORD, on_done)
+        assert stored.wait(30)
+    finally:
+        hasher._executor.shutdown(wait=False)
+    assert seen["thread"] == "password-rehash"
+    assert seen["hash"].startswith("pbkdf2:sha256:1$")
+
+
+def test_verified_token_is_served_from_cache(app, register):
+    token = register("alice")["Authorization"].split()[1]
+    statements = []
+
+    with app.app_context():
+        cache = get_token_cache()
+        cache.clear()
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        first = verify_token(token)
+        lookups = len(statements)
+        second = verify_token(token)
+
+        assert first == second
+        assert first.nickname == "alice"
+        assert lookups == 1
+        assert len(statements) == lookups
+        assert cache.stats()["hits"] >= 1
+
+
+def test_tampered_token_is_rejected(client, register):
+    token = register("alice")["Authorization"].split()[1]
+
+    response = client.get("/api/profile", headers={"Authorization": f"Bearer {token[:-2]}xx"})
+
+    assert response.status_code == 401
+
+
+def test_serializer_is_built_once_per_app(app):
+    with app.app_context():
+        assert _get_serializer() is _get_serializer()
@@ -0,0 +1,34 @@
+from server.database import READ_BIND, db, get_read_session
+from server.models import User
+from server.tests.conftest import register_with
+
+
+def test_sqlite_connections_get_the_configured_pragmas(make_app):
+    app = make_app(DB_SQLITE_BUSY_TIMEOUT_MS=1234, DB_SQLITE_SYNCHRONOUS="FULL")
+
+    with app.app_context():
+        connection = db.session.connection()
+        values = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout")
+        }
+
+    assert values == {"journal_mode": "wal", "synchronous": 2, "busy_timeout": 1234}
+
+
+def test_read_session_falls_back_to_the_primary(app):
+    with app.test_request_context():
+        assert get_read_session() is db.session
+
+
+def test_read_session_uses_the_read_bind(make_app, tmp_path):
+    app = make_app(DATABASE_READ_URL=f"sqlite:///{tmp_path / 'test.db'}")
+    client = app.test_client()
+    register_with(client, "alice")
+
+    with app.test_request_context():
+        session = get_read_session()
+        assert session is not db.session
+        assert session.get_bind() is db.engines[READ_BIND]
+        assert session is get_read_session()
+        assert session.execute(db.select(User.nickname)).scalars().all() == ["alice"]
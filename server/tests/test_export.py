@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from server.database import db
+from server.models import Profile, User
+from server.tests.conftest import register_with
+
+
+def _backdate(app, nickname, moment):
+    with app.app_context():
+        profile = db.session.execute(
+            db.select(Profile).join(User, User.id == Profile.user_id).where(User.nickname == nickname)
+        ).scalar_one()
+        profile.updated_at = moment
+        db.session.commit()
+
+
+@pytest.fixture
+def admin_client(make_app):
+    """Client of an app where ``admin`` may export, with three synced players."""
+    app = make_app(ADMIN_NICKNAMES=frozenset({"admin"}), EXPORT_BATCH_SIZE=1)
+    client = app.test_client()
+    client.admin = register_with(client, "admin")
+    _backdate(app, "admin", datetime(2024, 4, 1))
+    for day, (nickname, coins) in enumerate((("alice", 30), ("bobby", 10), ("carol", 20)), start=1):
+        headers = register_with(client, nickname)
+        client.post("/api/sync", json={"coins": coins, "upgrades": {"a": day}, "stats": {}}, headers=headers)
+        _backdate(app, nickname, datetime(2024, 5, day))
+    return client
+
+
+def test_export_requires_an_admin(admin_client):
+    headers = register_with(admin_client, "mallory")
+
+    assert admin_client.get("/api/admin/export", headers=headers).status_code == 403
+
+
+def test_profiles_since_stream_only_later_updates(admin_client):
+    response = admin_client.get("/api/admin/export?since=2024-05-02T00:00:00", headers=admin_client.admin)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row["nickname"], row["coins"], row["upgrades"]) for row in rows] == [
+        ("bobby", 10, {"a": 2}),
+        ("carol", 20, {"a": 3}),
+    ]
+    assert rows[0]["updatedAt"] == "2024-05-02T00:00:00"
+
+
+def test_since_with_an_offset_is_converted_to_utc(admin_client):
+    response = admin_client.get("/api/admin/export?since=2024-05-03T02:00:00%2B02:00", headers=admin_client.admin)
+
+    assert [json.loads(line)["nickname"] for line in response.get_data(as_text=True).splitlines()] == ["carol"]
+
+
+def test_leaderboard_csv_is_ranked(admin_client):
+    response = admin_client.get("/api/admin/export?dataset=leaderboard&format=csv", headers=admin_client.admin)
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert response.headers["Content-Disposition"] == 'attachment; filename="leaderboard.csv"'
+    assert [(row["rank"], row["nickname"]) for row in rows[:3]] == [("1", "alice"), ("2", "carol"), ("3", "bobby")]
+
+
+@pytest.mark.parametrize("query", [
+    "dataset=players",
+    "format=xml",
+    "since=yesterday",
+    "dataset=leaderboard&since=2024-05-01T00:00:00",
+])
+def test_bad_export_parameters_are_rejected(admin_client, query):
+    assert admin_client.get(f"/api/admin/export?{query}", headers=admin_client.admin).status_code == 400
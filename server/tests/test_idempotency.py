@@ -0,0 +1,53 @@
+from server.idempotency import HEADER, MAX_KEY_LENGTH, REPLAYED_HEADER
+
+SNAPSHOT = {"coins": 10, "upgrades": {}, "stats": {}}
+
+
+def test_sync_retry_replays_first_response(client, register):
+    headers = {**register("alice"), HEADER: "retry-1"}
+
+    first = client.post("/api/sync", json=SNAPSHOT, headers=headers)
+    again = client.post("/api/sync", json=SNAPSHOT, headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert REPLAYED_HEADER not in first.headers
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert again.get_json() == first.get_json()
+    # The replay did not write: the stored version is still the first one.
+    profile = client.get("/api/profile", headers={"Authorization": headers["Authorization"]}).get_json()
+    assert profile["version"] == first.get_json()["version"]
+
+
+def test_sync_key_reused_with_other_body_is_rejected(client, register):
+    headers = {**register("alice"), HEADER: "retry-1"}
+    client.post("/api/sync", json=SNAPSHOT, headers=headers)
+
+    response = client.post("/api/sync", json={**SNAPSHOT, "coins": 11}, headers=headers)
+
+    assert response.status_code == 422
+    assert REPLAYED_HEADER not in response.headers
+
+
+def test_sync_keys_are_scoped_per_user(client, register):
+    alice = {**register("alice"), HEADER: "shared"}
+    bobby = {**register("bobby"), HEADER: "shared"}
+    client.post("/api/sync", json=SNAPSHOT, headers=alice)
+
+    response = client.post("/api/sync", json={**SNAPSHOT, "coins": 20}, headers=bobby)
+
+    assert response.status_code == 200
+    assert REPLAYED_HEADER not in response.headers
+    assert response.get_json()["coins"] == 20
+
+
+def test_register_retry_replays_and_over_long_key_is_rejected(client):
+    body = {"nickname": "alice", "password": "secret123"}
+
+    first = client.post("/api/register", json=body, headers={HEADER: "signup"})
+    again = client.post("/api/register", json=body, headers={HEADER: "signup"})
+    too_long = client.post("/api/register", json=body, headers={HEADER: "k" * (MAX_KEY_LENGTH + 1)})
+
+    assert first.status_code == again.status_code == 200
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert again.get_json()["token"] == first.get_json()["token"]
+    assert too_long.status_code == 400
@@ -0,0 +1,108 @@
+import gzip
+import json
+
+import pytest
+
+from server.tests.conftest import register_with
+
+
+def test_leaderboard_me_rejects_malformed_radius(client, register):
+    headers = register("alice")
+
+    assert client.get("/api/leaderboard/me?radius=x", headers=headers).status_code == 400
+    assert client.get("/api/leaderboard/me?radius=2", headers=headers).status_code == 200
+
+
+def test_rank_index_merges_writes_of_other_workers(make_app):
+    first = make_app(RANK_INDEX_REFRESH_INTERVAL=3600)
+    second = make_app(RANK_INDEX_REFRESH_INTERVAL=3600)
+    first_client, second_client = first.test_client(), second.test_client()
+    bobby = register_with(second_client, "bobby")
+    alice = register_with(first_client, "alice")
+    first_client.post("/api/sync", json={"coins": 100, "upgrades": {}, "stats": {}}, headers=alice)
+
+    before = second_client.get("/api/leaderboard/me", headers=bobby).get_json()
+    assert before["total"] == 1
+
+    assert second.extensions["rank_index_refresher"].refresh() == 1
+    after = second_client.get("/api/leaderboard/me", headers=bobby).get_json()
+    assert (after["rank"], after["total"]) == (2, 2)
+    top = second_client.get("/api/leaderboard", headers=bobby).get_json()["entries"][0]
+    assert (top["nickname"], top["coins"]) == ("alice", 100)
+
+    # Nothing new: a second run moves nobody and keeps cached pages valid.
+    assert second.extensions["rank_index_refresher"].refresh() == 0
+
+
+def test_first_page_etag_and_compressed_body_are_per_limit(make_app):
+    client = make_app(RESPONSE_COMPRESSION_MIN_SIZE=0).test_client()
+    headers = {}
+    for nickname in ("alice", "bobby", "carol"):
+        headers = register_with(client, nickname)
+    headers["Accept-Encoding"] = "gzip"
+
+    one = client.get("/api/leaderboard?limit=1", headers=headers)
+    two = client.get("/api/leaderboard?limit=2", headers=headers)
+
+    assert one.headers["Content-Encoding"] == two.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(one.data))["entries"]) == 1
+    assert len(json.loads(gzip.decompress(two.data))["entries"]) == 2
+    assert one.headers["ETag"] != two.headers["ETag"]
+    stale = client.get("/api/leaderboard?limit=2", headers={**headers, "If-None-Match": one.headers["ETag"]})
+    assert stale.status_code == 200
+
+
+def test_first_page_answers_304_until_the_top_changes(client, register):
+    headers = register("alice")
+    etag = client.get("/api/leaderboard", headers=headers).headers["ETag"]
+
+    cached = client.get("/api/leaderboard", headers={**headers, "If-None-Match": etag})
+    assert (cached.status_code, cached.data) == (304, b"")
+
+    client.post("/api/sync", json={"coins": 50, "upgrades": {}, "stats": {}}, headers=headers)
+    changed = client.get("/api/leaderboard", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["entries"][0]["coins"] == 50
+
+
+def _seed_players(client, count):
+    """Register ``count`` players with distinct balances; returns their headers."""
+    players = {}
+    for index in range(count):
+        nickname = f"player{index}"
+        players[nickname] = register_with(client, nickname)
+        client.post("/api/sync", json={"coins": 10 * (index + 1), "upgrades": {}, "stats": {}}, headers=players[nickname])
+    return players
+
+
+@pytest.mark.parametrize("source", ["index", "database"])
+def test_cursor_pages_walk_the_whole_table_once(make_app, source):
+    client = make_app(LEADERBOARD_PAGE_SOURCE=source).test_client()
+    headers = _seed_players(client, 7)["player0"]
+
+    seen, url = [], "/api/leaderboard?limit=3"
+    while url:
+        body = client.get(url, headers=headers).get_json()
+        seen.extend((entry["rank"], entry["coins"]) for entry in body["entries"])
+        url = body["nextCursor"] and f"/api/leaderboard?limit=3&cursor={body['nextCursor']}"
+
+    assert seen == [(rank, 10 * (8 - rank)) for rank in range(1, 8)]
+
+
+@pytest.mark.parametrize("source", ["index", "database"])
+def test_around_me_centres_the_caller(make_app, source):
+    client = make_app(LEADERBOARD_PAGE_SOURCE=source).test_client()
+    players = _seed_players(client, 7)
+
+    body = client.get("/api/leaderboard?around=me&limit=3", headers=players["player3"]).get_json()
+
+    assert body["rank"] == 4
+    assert [entry["nickname"] for entry in body["entries"]] == ["player4", "player3", "player2"]
+
+
+def test_malformed_cursor_and_around_are_rejected(client, register):
+    headers = register("alice")
+
+    assert client.get("/api/leaderboard?cursor=not-a-cursor", headers=headers).status_code == 400
+    assert client.get("/api/leaderboard?around=you", headers=headers).status_code == 400
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from server.leaderboard_snapshot import LeaderboardSnapshot, fcntl
+from server.tests.conftest import register_with
+
+
+def _seed(client):
+    headers = {}
+    for coins, nickname in enumerate(("alice", "bobby", "carol"), start=1):
+        headers = register_with(client, nickname)
+        client.post("/api/sync", json={"coins": coins * 10, "upgrades": {}, "stats": {}}, headers=headers)
+    return headers
+
+
+def _wait_for(path):
+    deadline = time.monotonic() + 10
+    while not path.exists():
+        assert time.monotonic() < deadline, "snapshot was never written"
+        time.sleep(0.01)
+
+
+def test_first_page_is_sliced_from_the_snapshot(make_app, tmp_path):
+    path = tmp_path / "snapshot" / "leaderboard.bin"
+    shared = make_app(LEADERBOARD_SNAPSHOT_PATH=str(path), LEADERBOARD_SNAPSHOT_INTERVAL=3600).test_client()
+    headers = _seed(shared)
+    shared.get("/api/leaderboard?limit=2", headers=headers)
+    _wait_for(path)
+    local = make_app().test_client()
+
+    for limit in (2, 3):
+        response = shared.get(f"/api/leaderboard?limit={limit}", headers=headers)
+        assert response.headers["ETag"].startswith('"lbs-')
+        assert response.data == local.get(f"/api/leaderboard?limit={limit}", headers=headers).data
+    other_page = shared.get("/api/leaderboard?limit=2", headers={**headers, "If-None-Match": response.headers["ETag"]})
+    assert other_page.status_code == 200
+    etag = shared.get("/api/leaderboard?limit=2", headers=headers).headers["ETag"]
+    assert shared.get("/api/leaderboard?limit=2", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+
+def test_stale_snapshot_falls_back_to_the_database(make_app, tmp_path):
+    path = tmp_path / "leaderboard.bin"
+    client = make_app(
+        LEADERBOARD_SNAPSHOT_PATH=str(path), LEADERBOARD_SNAPSHOT_INTERVAL=3600, LEADERBOARD_SNAPSHOT_MAX_AGE=-1
+    ).test_client()
+    headers = _seed(client)
+    client.get("/api/leaderboard", headers=headers)
+    _wait_for(path)
+
+    response = client.get("/api/leaderboard", headers=headers)
+
+    assert "ETag" not in response.headers
+    assert [entry["coins"] for entry in response.get_json()["entries"]] == [30, 20, 10]
+
+
+@pytest.mark.skipif(fcntl is None, reason="flock is POSIX-only")
+def test_one_process_is_elected_until_it_lets_go(app, tmp_path):
+    path = tmp_path / "leaderboard.bin"
+    first = LeaderboardSnapshot(app, str(path), interval=3600, top_n=10, max_age=30)
+    second = LeaderboardSnapshot(app, str(path), interval=3600, top_n=10, max_age=30)
+
+    assert first._try_elect()
+    assert not second._try_elect()
+    first._lock_file.close()
+    assert second._try_elect()
@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session
+
+from server.auth import AuthenticatedUser, upsert_profile
+from server.database import db
+from server.leaderboard_windows import PENDING_GAINS
+from server.models import User
+from server.write_behind import get_write_behind
+from server.tests.conftest import register_with
+
+
+def _sync(client, headers, coins):
+    response = client.post("/api/sync", json={"coins": coins, "upgrades": {}, "stats": {}}, headers=headers)
+    assert response.status_code == 200
+
+
+def _day(client, headers):
+    return [(entry["nickname"], entry["coins"]) for entry in client.get("/api/leaderboard?window=day", headers=headers).get_json()["entries"]]
+
+
+def test_every_balance_gain_counts_by_default(client, register):
+    alice, bobby = register("alice"), register("bobby")
+    _sync(client, alice, 100)
+    _sync(client, alice, 40)
+    _sync(client, alice, 70)
+    _sync(client, bobby, 120)
+
+    assert _day(client, alice) == [("alice", 130), ("bobby", 120)]
+
+
+def test_write_behind_flush_records_gains(make_app):
+    app = make_app(WRITE_BEHIND_ENABLED=True, WRITE_BEHIND_INTERVAL_MS=3_600_000)
+    client = app.test_client()
+    alice, bobby = register_with(client, "alice"), register_with(client, "bobby")
+    for headers, coins in ((alice, 50), (bobby, 80)):
+        response = client.post("/api/sync", json={"coins": coins, "upgrades": {}, "stats": {}}, headers=headers)
+        assert response.status_code == 202
+    with app.app_context():
+        assert get_write_behind().flush() == 2
+
+    assert _day(client, alice) == [("bobby", 80), ("alice", 50)]
+
+
+def test_verified_only_counts_replay_capped_gains(make_app):
+    app = make_app(LEADERBOARD_WINDOW_VERIFIED_ONLY=True)
+    client = app.test_client()
+    headers = register_with(client, "alice")
+    _sync(client, headers, 100)
+    assert _day(client, headers) == []
+
+    with app.app_context():
+        user_id = db.session.execute(db.select(User.id).filter_by(nickname="alice")).scalar_one()
+        user = AuthenticatedUser(user_id, "alice")
+        upsert_profile(user, 0, {}, {})
+        upsert_profile(user, 100, {}, {}, max_coin_gain=30)
+        # Restoring the balance without earning anything adds nothing.
+        upsert_profile(user, 0, {}, {})
+        upsert_profile(user, 30, {}, {}, max_coin_gain=0)
+
+    assert _day(client, headers) == [("alice", 30)]
+
+
+def test_gain_hook_is_bound_to_db_session_only(app):
+    with app.app_context():
+        session = Session(db.engine)
+        session.info[PENDING_GAINS] = [(1, 5, None, ())]
+        session.commit()
+        assert PENDING_GAINS in session.info
+        session.close()
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from server.benchmarks.load import compare, main, parse_mix, percentile
+
+
+def test_small_mixed_run_reports_every_endpoint_without_errors(tmp_path):
+    output = tmp_path / "report.json"
+
+    status = main([
+        "--users", "20", "--requests", "60", "--concurrency", "2",
+        "--hash-method", "pbkdf2:sha256:1", "--output", str(output),
+    ])
+
+    assert status == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert set(report["endpoints"]) == {"sync", "leaderboard", "profile", "login", "register"}
+    assert sum(entry["requests"] for entry in report["endpoints"].values()) == 60
+    assert all(entry["errors"] == 0 for entry in report["endpoints"].values())
+
+
+def test_write_behind_run_reports_its_counters(tmp_path):
+    output = tmp_path / "report.json"
+
+    status = main([
+        "--users", "10", "--requests", "30", "--concurrency", "2", "--mix", "sync",
+        "--hash-method", "pbkdf2:sha256:1", "--write-behind", "--output", str(output),
+    ])
+
+    assert status == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["endpoints"]["sync"]["errors"] == 0
+    assert report["writeBehind"]["pending"] == 0
+
+
+def test_baseline_comparison_flags_regressions():
+    baseline = {"endpoints": {"sync": {"p95Ms": 10.0, "throughputRps": 100.0, "errors": 0}}}
+    within = {"endpoints": {"sync": {"p95Ms": 11.0, "throughputRps": 90.0, "errors": 0}}}
+    slower = {"endpoints": {"sync": {"p95Ms": 13.0, "throughputRps": 70.0, "errors": 1}}}
+
+    assert compare(within, baseline, 0.2) == []
+    assert len(compare(slower, baseline, 0.2)) == 3
+
+
+def test_mix_and_percentile_helpers():
+    assert parse_mix("sync=3,profile") == {"sync": 3, "profile": 1}
+    with pytest.raises(ValueError):
+        parse_mix("teleport=1")
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+    assert percentile([], 0.95) == 0.0
@@ -0,0 +1,42 @@
+import os
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def test_metrics_count_requests_statements_and_cache_hits(client, register):
+    headers = register("alice")
+    client.get("/api/profile", headers=headers)
+    client.get("/api/profile", headers=headers)
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    samples = _samples(response.get_data(as_text=True))
+    assert samples['match3_http_requests_total{endpoint="api.profile",method="GET",status="200"}'] == "2"
+    assert samples['match3_http_request_duration_seconds_count{endpoint="api.profile",method="GET"}'] == "2"
+    assert int(samples['match3_db_statements_per_request_sum{endpoint="api.register",method="POST"}']) >= 1
+    assert int(samples["match3_token_cache_hits_total"]) >= 2
+    assert samples["match3_leaderboard_players"] == "1"
+
+
+def test_error_statuses_are_labelled(client):
+    client.get("/api/profile")
+
+    samples = _samples(client.get("/api/metrics").get_data(as_text=True))
+
+    assert samples['match3_http_requests_total{endpoint="api.profile",method="GET",status="401"}'] == "1"
+
+
+def test_scrape_writes_a_per_process_snapshot(make_app, tmp_path):
+    directory = tmp_path / "metrics"
+    directory.mkdir()
+    client = make_app(METRICS_MULTIPROC_DIR=str(directory)).test_client()
+    client.get("/api/health")
+
+    samples = _samples(client.get("/api/metrics").get_data(as_text=True))
+
+    assert (directory / f"metrics-{os.getpid()}.json").exists()
+    assert samples['match3_http_requests_total{endpoint="api.healthcheck",method="GET",status="200"}'] == "1"
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from server.database import db
+from server.models import ProfileStat, ProfileUpgrade
+
+
+def _sync(client, headers, upgrades, stats):
+    response = client.post("/api/sync", json={"coins": 0, "upgrades": upgrades, "stats": stats}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_upgrade_counts_and_stat_totals(app, client, register):
+    _sync(client, register("alice"), {"dragon": 3}, {"match5": 7, "match3": 1})
+    _sync(client, register("bobby"), {"dragon": 1}, {"match5": 5})
+
+    with app.app_context():
+        assert ProfileUpgrade.count_at_least("dragon", 2) == 1
+        assert ProfileUpgrade.count_at_least("dragon", 1) == 2
+        assert ProfileStat.total("match5") == 12
+        assert ProfileStat.total("missing") == 0
+
+
+def test_stat_total_since_sums_lifetime_values_of_touched_counters(app, client, register):
+    alice = register("alice")
+    _sync(client, alice, {}, {"match5": 100})
+    with app.app_context():
+        db.session.execute(db.update(ProfileStat).values(updated_at=datetime.utcnow() - timedelta(days=2)))
+        db.session.commit()
+    cutoff = datetime.utcnow() - timedelta(days=1)
+    _sync(client, register("bobby"), {}, {"match5": 5})
+
+    with app.app_context():
+        assert ProfileStat.total("match5", touched_since=cutoff) == 5
+    # Touching alice's counter again brings back its whole value, not the gain.
+    _sync(client, alice, {}, {"match5": 101})
+    with app.app_context():
+        assert ProfileStat.total("match5", touched_since=cutoff) == 106
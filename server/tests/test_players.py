@@ -0,0 +1,16 @@
+import random
+
+from werkzeug.security import generate_password_hash
+
+from server.seed import bulk_insert, generate_records
+
+
+def test_search_finds_bulk_seeded_players(app, client, register):
+    headers = register("searcher")
+    with app.app_context():
+        bulk_insert(generate_records(3, random.Random(1), prefix="Seeded"), shared_hash=generate_password_hash("x", "pbkdf2:sha256:1"))
+
+    response = client.get("/api/players/search?q=seeded", headers=headers)
+
+    assert response.status_code == 200
+    assert [entry["nickname"] for entry in response.get_json()["entries"]] == ["Seeded0000000", "Seeded0000001", "Seeded0000002"]
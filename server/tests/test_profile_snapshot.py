@@ -0,0 +1,43 @@
+from server.database import db
+from server.models import Profile, User, migrate_snapshot_columns, render_counters
+
+
+def _profile(nickname):
+    return db.session.execute(
+        db.select(Profile).join(User, User.id == Profile.user_id).where(User.nickname == nickname)
+    ).scalar_one()
+
+
+def test_profile_body_matches_the_typed_rows(app, client, register):
+    headers = register("alice")
+    client.post("/api/sync", json={"coins": 7, "upgrades": {"b": 2, "a": 1}, "stats": {"y": 3}}, headers=headers)
+    version = client.get("/api/profile", headers=headers).get_json()["version"]
+    client.post("/api/sync/delta", json={"baseVersion": version, "upgrades": {"a": 4}, "stats": {"z": 1}}, headers=headers)
+
+    body = client.get("/api/profile", headers=headers).get_json()
+
+    with app.app_context():
+        profile = _profile("alice")
+        assert profile.upgrades_snapshot == render_counters(profile.upgrade_levels())
+        assert profile.stats_snapshot == render_counters(profile.stat_counters())
+        assert body["upgrades"] == profile.upgrade_levels() == {"a": 4, "b": 2}
+        assert body["stats"] == profile.stat_counters() == {"y": 3, "z": 1}
+    assert body["nickname"] == "alice"
+    assert body["coins"] == 7
+
+
+def test_legacy_json_snapshot_is_moved_into_typed_rows(app, client, register):
+    headers = register("alice")
+    with app.app_context():
+        profile = _profile("alice")
+        profile.stats_snapshot = '{"red": 12, "match3": 4.0, "note": "x"}'
+        db.session.commit()
+
+        assert migrate_snapshot_columns() == 1
+        db.session.expire_all()
+        profile = _profile("alice")
+        assert profile.stat_counters() == {"red": 12, "match3": 4}
+        assert profile.stats_snapshot == '{"match3":4,"red":12}'
+        assert migrate_snapshot_columns() == 0
+
+    assert client.get("/api/profile", headers=headers).get_json()["stats"] == {"match3": 4, "red": 12}
@@ -0,0 +1,18 @@
+import pytest
+
+from server.benchmarks.queries import BUDGETS, measure
+
+
+@pytest.fixture(scope="module")
+def report():
+    # Scenarios build on each other's state, so they run once, in order.
+    return measure(users=50, hash_method="pbkdf2:sha256:1", verbose=True)
+
+
+@pytest.mark.parametrize("scenario", list(BUDGETS))
+def test_route_stays_within_query_budget(report, scenario):
+    result = report["scenarios"][scenario]
+    budget, status = BUDGETS[scenario]
+
+    assert result["status"] == status
+    assert result["statements"] <= budget, "\n".join(result["sql"])
@@ -0,0 +1,56 @@
+import random
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+import pytest
+
+from server.leaderboard import RankIndex, SortedKeyList
+
+
+@pytest.mark.parametrize("load", [4, 7, 64])
+def test_sorted_key_list_matches_a_plain_sorted_list(load):
+    rng = random.Random(load)
+    keys, plain = SortedKeyList(load=load), []
+
+    for step in range(5000):
+        if plain and rng.random() < 0.45:
+            key = rng.choice(plain)
+            assert keys.remove(key) == plain.index(key)
+            plain.remove(key)
+        else:
+            key = (rng.randint(0, 50), rng.random(), rng.randint(0, 10**6))
+            position = bisect_right(plain, key)
+            plain.insert(position, key)
+            assert keys.add(key) == position
+        if step % 50 == 0:
+            start, size = rng.randint(0, len(plain) + 2), rng.randint(0, 40)
+            probe = (rng.randint(0, 50), 0.5, 0)
+            assert keys[start:start + size] == plain[start:start + size]
+            assert keys.bisect_left(probe) == bisect_left(plain, probe)
+            assert keys.bisect_right(probe) == bisect_right(plain, probe)
+
+    assert len(keys) == len(plain)
+    assert keys[0:len(plain)] == plain
+
+
+def test_removing_a_missing_key_raises():
+    keys = SortedKeyList([(1, 0.0, 1)])
+
+    with pytest.raises(ValueError):
+        keys.remove((2, 0.0, 2))
+    keys.remove((1, 0.0, 1))
+    with pytest.raises(ValueError):
+        keys.remove((1, 0.0, 1))
+    assert (len(keys), keys[0:5]) == (0, [])
+
+
+def test_upsert_reports_old_and_new_ranks():
+    index = RankIndex()
+    moment = datetime(2024, 1, 1)
+    index.load((user_id, f"p{user_id}", user_id * 10, moment) for user_id in range(1, 2001))
+
+    assert index.upsert(1, "p1", 100_000, moment + timedelta(seconds=1)) == (2000, 1)
+    assert index.upsert(2000, "p2000", 0, moment + timedelta(seconds=1)) == (2, 2000)
+    assert index.upsert(5000, "new", 15, moment) == (None, 2000)
+    assert [entry.user_id for entry in index.top(3)] == [1, 1999, 1998]
+    assert index.rank_of(2000) == 2001
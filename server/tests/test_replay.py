@@ -0,0 +1,204 @@
+import numpy as np
+import pytest
+
+from server.benchmarks.replay import SWAPS, legal_swaps
+from server.database import db
+from server.models import User
+from server.replay import COLS, BoardBatch, draw, parse_moves, replay_seed, replay_sessions
+
+# Scores and final boards were produced by game/match3/logic.ts with
+# Math.random replaced by the draw() stream and tile ids left out of it.
+# Boards are row-major: color indices into COLORS, then special kinds
+# (1 rocketH, 2 rocketV, 3 lightning, 4 bomb). Ids name the combined
+# activation or tapped special each log ends with.
+GOLDEN = [
+    pytest.param(
+        412554831, [
+            [5, 2, 5, 3], [0, 1, 1, 1], [1, 1, 2, 1], [4, 3, 5, 3], [0, 1, 1, 1], [6, 2, 7, 2],
+            [0, 2, 1, 2], [3, 7, 4, 7], [2, 6, 2, 7], [7, 2, 7, 3], [3, 2, 3, 3], [2, 1, 3, 1],
+        ], 2360,
+        "1124240100210013221224220330424130412412014004011031423043133024",
+        "0000000000000000000000000001000000000000000000000000000000000000",
+        id="swaps",
+    ),
+    pytest.param(
+        2997777878, [[1, 0, 2, 0], [5, 0, 5, 1]], 1730,
+        "3142241033212302023104102210113320223321004130144401013310420211",
+        "0310000000000020000000000000000000000000000000000000000000000000",
+        id="bomb+bomb",
+    ),
+    pytest.param(
+        1240825416, [[2, 6, 2, 7], [3, 3, 4, 3]], 1440,
+        "3440110321402004303244241421243202312310301001032013302221323323",
+        "1000000000000000000000000000000000000000000000000000000000000000",
+        id="bomb+lightning",
+    ),
+    pytest.param(
+        2390958905, [
+            [6, 4, 6, 5], [7, 4], [3, 0, 3, 1], [0, 6, 1, 6], [3, 6, 4, 6], [2, 7, 3, 7],
+            [3, 0, 4, 0], [2, 1, 2, 2], [3, 3, 4, 3], [3, 1, 3, 2],
+        ], 2660,
+        "1220040123121132104022111213040020033042420221040140032404103213",
+        "0000000000000000000000000000000000000000000000000030000000000000",
+        id="bomb+rocketH",
+    ),
+    pytest.param(
+        2075190836, [
+            [1, 3, 2, 3], [1, 3, 1, 4], [2, 2], [2, 2, 3, 2], [1, 5, 1, 6], [4, 2, 5, 2],
+            [0, 7], [4, 2, 5, 2], [4, 4, 5, 4], [1, 5, 2, 5], [4, 3, 5, 3], [5, 0, 6, 0],
+            [7, 3, 7, 4], [2, 0, 3, 0], [2, 4, 3, 4], [2, 5, 3, 5],
+        ], 3670,
+        "0102332424220012221433440312413102032023314414044023411244320010",
+        "0000000000000000000000000000000000000000000000000000000000000000",
+        id="bomb+rocketV",
+    ),
+    pytest.param(
+        3491399689, [[0, 6, 0, 7], [5, 6, 5, 7]], 1950,
+        "3024334313322410410343430434241304114334400341414214131114413314",
+        "0000000000000000000000000000000000000000300000030000020000000000",
+        id="lightning+lightning",
+    ),
+    pytest.param(
+        3998568, [[0, 5, 1, 5], [2, 4, 3, 4]], 750,
+        "4213231304040121043003343234220204003132341032003302141120130331",
+        "0000000000000000000000100000000000000020000000000000000000000000",
+        id="lightning+rocketH",
+    ),
+    pytest.param(
+        2232265807, [[6, 4, 7, 4], [6, 6, 6, 7]], 410,
+        "1140244313031011441343423011010231434424200201423421313322143414",
+        "0000000000000000000000000000000000000000000000000000000000000000",
+        id="lightning+rocketV",
+    ),
+    pytest.param(
+        1738091823, [[7, 4, 7, 5], [4, 2, 5, 2], [0, 4, 1, 4]], 750,
+        "0202014430342042342103011003014213134303404024212014344123302124",
+        "0000000000000000000000000000000000000000000000000000000000000000",
+        id="rocketH+rocketH",
+    ),
+    pytest.param(
+        4236224739, [[3, 6, 3, 7], [2, 7, 3, 7]], 2040,
+        "2143133112124421012302344244002132143032140012040230243341142412",
+        "0000000000000000000000000003000400000000000003000000000000003000",
+        id="rocketH+rocketV",
+    ),
+    pytest.param(
+        2663795445, [
+            [2, 0, 3, 0], [3, 3, 4, 3], [6, 6, 6, 7], [2, 2, 2, 3], [5, 0, 5, 1], [2, 1, 3, 1],
+            [2, 2, 2, 3],
+        ], 2280,
+        "2412020021141144124202313234140220200311041213121143012042132411",
+        "0000000000000000000000000000000000000000010000000000000000000000",
+        id="rocketV+rocketV",
+    ),
+    pytest.param(
+        2246698399, [[5, 3, 5, 4], [4, 1]], 770,
+        "1122412004210114143204312234223414031202223034413432334442441131",
+        "0000000000000000000000000000000000000000000010000000003000000000",
+        id="tap-bomb",
+    ),
+    pytest.param(
+        3378209377, [[2, 0, 3, 0], [1, 2]], 1250,
+        "2212033111041133204134004214431220122040110120214332342112434002",
+        "0000000000000000000000000002000000000000000000000000000000000000",
+        id="tap-lightning",
+    ),
+    pytest.param(
+        1038579422, [[6, 5, 7, 5], [7, 7]], 260,
+        "0330232431214212244023314112432003022114320320334031041433432240",
+        "0000000000000000000030000000000000000000000000000000000000000000",
+        id="tap-rocketH",
+    ),
+    pytest.param(
+        184559597, [[3, 0, 4, 0], [0, 0]], 180,
+        "1303420243314233202334222342302302130304431012423430300420421122",
+        "0000000000000000000000000000000000000000000000000000000000000000",
+        id="tap-rocketV",
+    ),
+]
+
+SWAPS_SEED = 412554831
+
+
+def _board(seed, moves):
+    batch = BoardBatch([seed])
+    batch.init()
+    log = parse_moves(moves, 1000)
+    batch.play(log[None], np.array([len(log)]))
+    digits = lambda array: "".join(str(value) for value in array[0].reshape(-1))
+    return digits(batch.colors), digits(batch.special)
+
+
+def test_draw_matches_typescript_reference():
+    assert draw(0, 0) == 0
+    assert draw(0, 1) == 33350994
+    assert draw(1234, 5) == 1294908487
+    assert draw(2**32 - 1, 10**6) == 1061703002
+
+
+@pytest.mark.parametrize("seed, moves, score, colors, special", GOLDEN)
+def test_replay_matches_logic_ts(seed, moves, score, colors, special):
+    assert replay_sessions([seed], [parse_moves(moves, 1000)])[0] == (True, score, len(moves))
+    assert _board(seed, moves) == (colors, special)
+
+
+def test_batched_replays_match_single_ones():
+    seeds = [param.values[0] for param in GOLDEN]
+    logs = [parse_moves(param.values[1], 1000) for param in GOLDEN]
+
+    assert [result.score for result in replay_sessions(seeds, logs)] == [param.values[2] for param in GOLDEN]
+
+
+@pytest.mark.parametrize("illegal", [
+    [0, 0, 0, 1],  # adjacent, but forms no match
+    [0, 0, 5, 5],  # not adjacent
+    [7, 0, 8, 0],  # off the board
+    [3, 3],  # taps a plain tile
+])
+def test_illegal_move_invalidates_replay(illegal):
+    assert replay_sessions([SWAPS_SEED], [parse_moves([illegal], 1000)])[0] == (False, 0, 0)
+
+
+def test_illegal_move_keeps_score_of_earlier_moves():
+    legal = GOLDEN[0].values[1][:3]
+    before = replay_sessions([SWAPS_SEED], [parse_moves(legal, 1000)])[0]
+
+    result = replay_sessions([SWAPS_SEED], [parse_moves(legal + [[0, 0, 5, 5]] + legal, 1000)])[0]
+    assert result == (False, before.score, 3)
+
+
+@pytest.mark.parametrize("value", [
+    [[0, 0, 0]],
+    [[0, True]],
+    [[0, 0.5]],
+    "moves",
+    [[0, 0]] * 4,
+])
+def test_parse_moves_rejects_malformed_logs(value):
+    with pytest.raises(ValueError):
+        parse_moves(value, 3)
+
+
+def _first_legal_swap(seed):
+    batch = BoardBatch([seed])
+    batch.init()
+    first, second = SWAPS[np.nonzero(legal_swaps(batch.colors)[0])[0][0]]
+    return [int(first // COLS), int(first % COLS), int(second // COLS), int(second % COLS)]
+
+
+def test_replay_is_credited_once(app, client, register):
+    headers = register("alice")
+    profile = client.get("/api/profile", headers=headers).get_json()
+    with app.app_context():
+        user_id = db.session.execute(db.select(User.id).filter_by(nickname="alice")).scalar_one()
+    seed = replay_seed(user_id, profile["version"])
+    moves = [_first_legal_swap(seed)]
+    earned = replay_sessions([seed], [parse_moves(moves, 1000)])[0].score // app.config["REPLAY_SCORE_PER_COIN"]
+    sync = {"coins": 10_000, "upgrades": {}, "stats": {}, "replay": {"baseVersion": profile["version"], "moves": moves}}
+
+    first = client.post("/api/sync", json=sync, headers=headers).get_json()
+    # The profile version moved on, so the same replay earns nothing again.
+    again = client.post("/api/sync", json=sync, headers=headers).get_json()
+
+    assert 0 < earned == first["coins"]
+    assert again["coins"] == earned
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import server.score_events as score_events
+from server.database import db
+from server.models import RollupWatermark, ScoreEvent
+from server.score_events import WATERMARK, compact, roll_up, roll_up_all
+
+
+def _sync(client, headers, coins):
+    response = client.post("/api/sync", json={"coins": coins, "upgrades": {}, "stats": {}}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_rollups_feed_the_stats_routes(app, client, register):
+    alice, bobby = register("alice"), register("bobby")
+    for coins in (100, 40, 70):
+        _sync(client, alice, coins)
+    _sync(client, bobby, 120)
+
+    with app.app_context():
+        assert roll_up_all(settle=0) == 4
+        assert roll_up_all(settle=0) == 0
+
+    me = client.get("/api/stats/me?period=hour", headers=alice).get_json()
+    assert me["totals"] == {"coinsEarned": 130, "coinsSpent": 60, "syncs": 3}
+    assert me["buckets"][-1]["coins"] == 70
+    assert me["rolledUpAt"] is not None
+    overall = client.get("/api/stats/global", headers=alice).get_json()["buckets"][-1]
+    assert (overall["players"], overall["coinsEarned"], overall["syncs"]) == (2, 250, 4)
+    earners = client.get("/api/stats/earners", headers=alice).get_json()["entries"]
+    assert [(entry["nickname"], entry["coinsEarned"]) for entry in earners] == [("alice", 130), ("bobby", 120)]
+
+
+def test_a_run_with_a_stale_watermark_folds_nothing(app, client, register, monkeypatch):
+    alice = register("alice")
+    _sync(client, alice, 100)
+    with app.app_context():
+        roll_up_all(settle=0)
+    _sync(client, alice, 150)
+
+    with app.app_context():
+        # Another worker advanced the watermark after this run read it.
+        monkeypatch.setattr(score_events, "_watermark", lambda: SimpleNamespace(last_event_id=0))
+        assert roll_up(settle=0) == 0
+        monkeypatch.undo()
+        assert roll_up(settle=0) == 1
+        last_id = db.session.get(RollupWatermark, WATERMARK).last_event_id
+        assert last_id == db.session.execute(db.select(db.func.max(ScoreEvent.id))).scalar_one()
+
+    totals = client.get("/api/stats/me?period=hour", headers=alice).get_json()["totals"]
+    assert totals == {"coinsEarned": 150, "coinsSpent": 0, "syncs": 2}
+
+
+def test_unsettled_events_wait_and_compaction_keeps_them(app, client, register):
+    alice = register("alice")
+    _sync(client, alice, 100)
+
+    with app.app_context():
+        assert roll_up(settle=3600) == 0
+        later = datetime.utcnow() + timedelta(days=365)
+        assert compact(now=later)["events"] == 0
+        assert roll_up(settle=0) == 1
+        assert compact(now=later)["events"] == 1
@@ -0,0 +1,66 @@
+import json
+import random
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from server.database import db
+from server.models import Profile, ProfileStat, User
+from server.seed import bulk_insert, generate_records, read_records
+from server.tests.conftest import PASSWORD, register_with
+
+
+def test_imported_players_can_log_in_and_keep_their_progress(app, client, tmp_path):
+    register_with(client, "existing")
+    csv_file = tmp_path / "players.csv"
+    csv_file.write_text(
+        "nickname,password,coins,upgrades,stats,updatedAt\n"
+        f'alice,{PASSWORD},30,"{{""a"": 2}}","{{""x"": 5}}",2024-01-02T03:04:05\n',
+        encoding="utf-8",
+    )
+    ndjson_file = tmp_path / "players.ndjson"
+    ndjson_file.write_text(
+        json.dumps({"nickname": "bobby", "password_hash": generate_password_hash(PASSWORD, "pbkdf2:sha256:1"),
+                    "coins": 20, "stats": {"y": 1}}) + "\n\n"
+        + json.dumps({"nickname": "carol", "password": PASSWORD}) + "\n",
+        encoding="utf-8",
+    )
+
+    with app.app_context():
+        first = bulk_insert(read_records(csv_file), batch_size=1)
+        second = bulk_insert(read_records(ndjson_file), batch_size=1)
+
+    assert (first.users, first.typed_rows) == (1, 2)
+    assert (second.users, second.typed_rows) == (2, 1)
+    response = client.post("/api/login", json={"nickname": "alice", "password": PASSWORD})
+    assert response.status_code == 200
+    profile = client.get("/api/profile", headers={"Authorization": f"Bearer {response.get_json()['token']}"}).get_json()
+    assert (profile["coins"], profile["upgrades"], profile["stats"]) == (30, {"a": 2}, {"x": 5})
+    assert profile["updatedAt"] == "2024-01-02T03:04:05"
+    assert client.post("/api/login", json={"nickname": "bobby", "password": PASSWORD}).status_code == 200
+    assert client.post("/api/login", json={"nickname": "carol", "password": PASSWORD}).status_code == 200
+    # Explicit ids must not collide with later ORM inserts.
+    register_with(client, "dave")
+
+
+def test_generated_players_share_one_hash_and_get_typed_rows(app):
+    shared_hash = generate_password_hash(PASSWORD, "pbkdf2:sha256:1")
+
+    with app.app_context():
+        report = bulk_insert(generate_records(5, random.Random(1), prefix="gen"), batch_size=2, shared_hash=shared_hash)
+        hashes = db.session.execute(db.select(User.password_hash)).scalars().all()
+        profiles = db.session.execute(db.select(db.func.count(Profile.id))).scalar_one()
+        stats = db.session.execute(db.select(db.func.count()).select_from(ProfileStat)).scalar_one()
+
+    assert report.users == profiles == 5
+    assert set(hashes) == {shared_hash}
+    assert stats > 0
+    assert report.typed_rows >= stats
+
+
+def test_malformed_record_names_the_line(tmp_path):
+    source = tmp_path / "players.ndjson"
+    source.write_text('{"nickname": "alice"}\n{"coins": 1}\n', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="players.ndjson:2"):
+        list(read_records(source))
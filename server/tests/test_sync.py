@@ -0,0 +1,110 @@
+import pytest
+
+from server.tests.conftest import register_with
+
+
+@pytest.mark.parametrize("body", [
+    '{"coins": 1e400, "upgrades": {}, "stats": {}}',
+    '{"coins": Infinity, "upgrades": {}, "stats": {}}',
+    '{"coins": true, "upgrades": {}, "stats": {}}',
+    '{"coins": 4294967296, "upgrades": {}, "stats": {}}',
+    '{"coins": 1, "upgrades": {}, "stats": {"x": Infinity}}',
+    '{"coins": 1, "upgrades": {}, "stats": {"x": NaN}}',
+    '{"coins": 1, "upgrades": {"x": 1e12}, "stats": {}}',
+])
+def test_sync_rejects_non_finite_and_out_of_range_numbers(client, register, body):
+    headers = {**register("alice"), "Content-Type": "application/json"}
+
+    assert client.post("/api/sync", data=body, headers=headers).status_code == 400
+
+
+def test_sync_accepts_stat_values_in_bigint_range(client, register):
+    headers = register("alice")
+    body = {"coins": 1, "upgrades": {}, "stats": {"score": 2**40}}
+
+    response = client.post("/api/sync", json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["stats"] == {"score": 2**40}
+
+
+def test_sync_limits_the_number_of_keys(make_app):
+    client = make_app(PROFILE_MAX_KEYS=3).test_client()
+    headers = register_with(client, "alice")
+    stats = {f"s{i}": i for i in range(4)}
+
+    assert client.post("/api/sync", json={"coins": 1, "stats": stats}, headers=headers).status_code == 400
+    assert client.post(
+        "/api/sync/batch", json={"snapshots": [{"stats": {"a": 1, "b": 2}}, {"stats": {"c": 3, "d": 4}}]}, headers=headers
+    ).status_code == 400
+
+
+@pytest.mark.parametrize("body", [
+    '{"baseVersion": 1, "coins": 1e400}',
+    '{"baseVersion": 1, "stats": {"x": -Infinity}}',
+])
+def test_sync_delta_rejects_non_finite_numbers(client, register, body):
+    headers = {**register("alice"), "Content-Type": "application/json"}
+
+    assert client.post("/api/sync/delta", data=body, headers=headers).status_code == 400
+
+
+def test_sync_batch_without_coins_keeps_the_stored_profile(client, register):
+    headers = register("alice")
+    client.post("/api/sync", json={"coins": 40, "upgrades": {"magnet": 2}, "stats": {"moves": 5}}, headers=headers)
+
+    response = client.post("/api/sync/batch", json={"snapshots": [{"stats": {"match3": 1}}]}, headers=headers)
+
+    assert response.status_code == 200
+    profile = response.get_json()
+    assert profile["coins"] == 40
+    assert profile["upgrades"] == {"magnet": 2}
+    assert profile["stats"] == {"moves": 5, "match3": 1}
+
+
+def test_sync_batch_applies_the_last_coins_in_client_order(client, register):
+    headers = register("alice")
+    snapshots = [
+        {"coins": 30, "upgrades": {"magnet": 1}, "clientTs": 2000},
+        {"coins": 10, "upgrades": {"magnet": 3}, "stats": {"moves": 1}, "clientTs": 1000},
+        {"stats": {"moves": 2}, "clientTs": 3000},
+    ]
+
+    profile = client.post("/api/sync/batch", json={"snapshots": snapshots}, headers=headers).get_json()
+
+    assert (profile["coins"], profile["upgrades"], profile["stats"]) == (30, {"magnet": 1}, {"moves": 2})
+
+
+@pytest.mark.parametrize("coins", ["true", "1e400", "Infinity", '"10"'])
+def test_sync_batch_rejects_malformed_coins(client, register, coins):
+    headers = {**register("alice"), "Content-Type": "application/json"}
+    body = f'{{"snapshots": [{{"coins": {coins}}}]}}'
+
+    assert client.post("/api/sync/batch", data=body, headers=headers).status_code == 400
+
+
+def test_delta_merges_only_the_changed_counters(client, register):
+    headers = register("alice")
+    base = client.post("/api/sync", json={"coins": 10, "upgrades": {"a": 1}, "stats": {"x": 1, "y": 2}}, headers=headers)
+    version = base.get_json()["version"]
+
+    response = client.post("/api/sync/delta", json={"baseVersion": version, "stats": {"y": 5}}, headers=headers)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["version"] == version + 1
+    assert body["coins"] == 10
+    assert body["upgrades"] == {"a": 1}
+    assert body["stats"] == {"x": 1, "y": 5}
+
+
+def test_delta_on_a_stale_version_returns_the_current_profile(client, register):
+    headers = register("alice")
+    version = client.post("/api/sync", json={"coins": 10, "stats": {"x": 1}}, headers=headers).get_json()["version"]
+    client.post("/api/sync/delta", json={"baseVersion": version, "coins": 20}, headers=headers)
+
+    response = client.post("/api/sync/delta", json={"baseVersion": version, "coins": 30}, headers=headers)
+
+    assert response.status_code == 409
+    current = response.get_json()["profile"]
+    assert current["version"] == version + 1
+    assert current["coins"] == 20
@@ -0,0 +1,46 @@
+import pytest
+
+from server.wire import BINARY_MIMETYPE, FORMAT_VERSION, WireFormatError, _write_varint, decode_sync, encode_sync
+
+
+def _sync_with_raw_coins(raw: bytes) -> bytes:
+    # Empty upgrade and stat maps follow the coins varint.
+    return bytes([FORMAT_VERSION]) + raw + b"\x00\x00"
+
+
+def test_decode_accepts_full_64_bit_varints():
+    out = bytearray()
+    _write_varint(out, 2**64 - 1)
+
+    coins, _, _ = decode_sync(_sync_with_raw_coins(bytes(out)))
+    assert coins == -(2**63)
+
+
+@pytest.mark.parametrize("raw", [
+    b"\xff" * 9 + b"\x02",
+    b"\xff" * 9 + b"\x7f",
+    b"\xff" * 10 + b"\x01",
+])
+def test_decode_rejects_varints_over_64_bits(raw):
+    with pytest.raises(WireFormatError):
+        decode_sync(_sync_with_raw_coins(raw))
+
+
+@pytest.mark.parametrize("body", [
+    _sync_with_raw_coins(b"\xff" * 9 + b"\x7f"),
+    encode_sync(2**40, {}, {}),
+    encode_sync(1, {"royal-ledger": 2**40}, {}),
+    bytes([FORMAT_VERSION]) + b"\x02",
+])
+def test_binary_sync_rejects_malformed_and_out_of_range_values(client, register, body):
+    headers = {**register("alice"), "Content-Type": BINARY_MIMETYPE}
+
+    assert client.post("/api/sync", data=body, headers=headers).status_code == 400
+
+
+def test_binary_sync_saves_snapshot(client, register):
+    headers = {**register("alice"), "Content-Type": BINARY_MIMETYPE}
+
+    response = client.post("/api/sync", data=encode_sync(5, {"royal-ledger": 2}, {"blue": 7}), headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["coins"] == 5
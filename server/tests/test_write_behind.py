@@ -0,0 +1,55 @@
+import pytest
+
+from server.tests.conftest import register_with
+from server.write_behind import get_write_behind
+
+
+@pytest.fixture
+def queued_app(make_app):
+    """App whose write-behind flusher never fires on its own."""
+    return make_app(WRITE_BEHIND_ENABLED=True, WRITE_BEHIND_INTERVAL_MS=3_600_000)
+
+
+def _sync(client, headers, coins):
+    return client.post("/api/sync", json={"coins": coins, "upgrades": {"a": 1}, "stats": {"x": coins}}, headers=headers)
+
+
+def test_syncs_of_one_player_coalesce_into_one_row(queued_app):
+    client = queued_app.test_client()
+    alice, bobby = register_with(client, "alice"), register_with(client, "bobby")
+    version = client.get("/api/profile", headers=alice).get_json()["version"]
+
+    assert [_sync(client, alice, coins).status_code for coins in (10, 20, 30)] == [202, 202, 202]
+    queue = queued_app.extensions["write_behind"]
+    assert (queue.stats()["pending"], queue.stats()["syncs"]) == (1, 3)
+    assert client.get("/api/leaderboard", headers=bobby).get_json()["entries"][0]["coins"] == 0
+
+    with queued_app.app_context():
+        assert get_write_behind().flush() == 1
+
+    stats = queue.stats()
+    assert (stats["pending"], stats["rows"], stats["flushes"]) == (0, 1, 1)
+    profile = client.get("/api/profile", headers=alice).get_json()
+    assert (profile["coins"], profile["stats"], profile["version"]) == (30, {"x": 30}, version + 1)
+    assert client.get("/api/leaderboard", headers=bobby).get_json()["entries"][0]["nickname"] == "alice"
+
+
+def test_player_reads_their_own_pending_write(queued_app):
+    client = queued_app.test_client()
+    alice = register_with(client, "alice")
+    _sync(client, alice, 40)
+
+    assert client.get("/api/profile", headers=alice).get_json()["coins"] == 40
+    assert queued_app.extensions["write_behind"].stats()["pending"] == 0
+
+
+def test_drain_flushes_and_later_syncs_are_written_inline(queued_app):
+    client = queued_app.test_client()
+    alice = register_with(client, "alice")
+    _sync(client, alice, 10)
+    queue = queued_app.extensions["write_behind"]
+
+    assert queue.drain() == 1
+    assert _sync(client, alice, 20).status_code == 200
+    assert queue.stats()["pending"] == 0
+    assert client.get("/api/profile", headers=alice).get_json()["coins"] == 20
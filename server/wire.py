@@ -0,0 +1,266 @@
+"""Compact binary wire format for ``/sync`` and ``/profile``.
+
+Upgrade and stat payloads are small maps of well-known keys to integers, so
+instead of JSON they can be sent as a key code from a fixed table followed by
+a varint value. JSON stays the default; the binary format is negotiated with
+the :data:`BINARY_MIMETYPE` media type (``Content-Type`` for requests,
+``Accept`` for responses).
+
+Layout (all integers are unsigned LEB128 varints of at most 64 bits, signed
+values are zigzag-encoded first)::
+
+    counters  := count (entry)*
+    entry     := code value                 ; code > 0: index in the key table + 1
+               | 0 len utf8-key value       ; code 0: key outside the table
+
+    sync      := FORMAT_VERSION coins counters(upgrades) counters(stats)
+    profile   := FORMAT_VERSION coins counters(upgrades) counters(stats)
+                 len utf8-nickname updated-at-us version
+
+``updated-at-us`` is microseconds since the Unix epoch (UTC), ``0`` meaning
+"unknown".
+
+Notes:
+    :data:`UPGRADE_KEYS` mirrors ``constants/Upgrades.ts`` and
+    :data:`STAT_KEYS` mirrors ``store/StatStore.ts``. Both tables are
+    append-only: existing codes must never be renumbered.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+BINARY_MIMETYPE = "application/x-match3-profile"
+
+FORMAT_VERSION = 1
+
+UPGRADE_KEYS: Tuple[str, ...] = (
+    "royal-ledger",
+    "guild-patrons",
+    "battle-horns",
+    "chronomancer-hourglass",
+    "dragon-siege",
+    "architects-council",
+)
+
+STAT_KEYS: Tuple[str, ...] = (
+    "blue",
+    "red",
+    "green",
+    "purple",
+    "amber",
+    "grey",
+    "match3",
+    "match4",
+    "match5",
+    "blueCount",
+    "redCount",
+    "greenCount",
+    "purpleCount",
+    "amberCount",
+    "greyCount",
+)
+
+_UPGRADE_CODES = {key: code for code, key in enumerate(UPGRADE_KEYS, start=1)}
+_STAT_CODES = {key: code for code, key in enumerate(STAT_KEYS, start=1)}
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class WireFormatError(ValueError):
+    """Raised when a binary payload is truncated or malformed."""
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise WireFormatError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        if shift == 63 and byte > 1:
+            # The tenth byte may only carry bit 63.
+            raise WireFormatError("varint exceeds 64 bits")
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_text(out: bytearray, text: str) -> None:
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_text(data: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise WireFormatError("truncated string")
+    try:
+        return data[pos:end].decode("utf-8"), end
+    except UnicodeDecodeError as exc:
+        raise WireFormatError("invalid utf-8") from exc
+
+
+def _write_counters(out: bytearray, counters: Mapping[str, int], codes: Mapping[str, int]) -> None:
+    _write_varint(out, len(counters))
+    for key, value in counters.items():
+        code = codes.get(key)
+        if code is None:
+            out.append(0)
+            _write_text(out, key)
+        else:
+            _write_varint(out, code)
+        _write_varint(out, _zigzag(int(value)))
+
+
+def _read_counters(data: bytes, pos: int, keys: Sequence[str]) -> Tuple[Dict[str, int], int]:
+    count, pos = _read_varint(data, pos)
+    counters = {}
+    size = len(data)
+    for _ in range(count):
+        # Single-byte varints are the common case (table codes, small
+        # levels); read them inline and fall back to _read_varint otherwise.
+        if pos < size and data[pos] < 0x80:
+            code = data[pos]
+            pos += 1
+        else:
+            code, pos = _read_varint(data, pos)
+        if code == 0:
+            key, pos = _read_text(data, pos)
+        elif code <= len(keys):
+            key = keys[code - 1]
+        else:
+            raise WireFormatError(f"unknown key code {code}")
+        if pos < size and data[pos] < 0x80:
+            value = data[pos]
+            pos += 1
+        else:
+            value, pos = _read_varint(data, pos)
+        counters[key] = value >> 1 if not value & 1 else -((value + 1) >> 1)
+    return counters, pos
+
+
+def _read_header(data: bytes) -> int:
+    if not data:
+        raise WireFormatError("empty payload")
+    if data[0] != FORMAT_VERSION:
+        raise WireFormatError(f"unsupported format version {data[0]}")
+    return 1
+
+
+def encode_sync(coins: int, upgrades: Mapping[str, int], stats: Mapping[str, int]) -> bytes:
+    """Encode a ``/sync`` request body.
+
+    Args:
+        coins: Coin balance.
+        upgrades: Upgrade id to level.
+        stats: Stat name to counter value.
+
+    Returns:
+        bytes: Binary payload.
+    """
+    out = bytearray([FORMAT_VERSION])
+    _write_varint(out, _zigzag(int(coins)))
+    _write_counters(out, upgrades, _UPGRADE_CODES)
+    _write_counters(out, stats, _STAT_CODES)
+    return bytes(out)
+
+
+def decode_sync(data: bytes) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+    """Decode a ``/sync`` request body.
+
+    Args:
+        data: Binary payload.
+
+    Returns:
+        Tuple[int, Dict[str, int], Dict[str, int]]: Coins, upgrades and stats.
+
+    Raises:
+        WireFormatError: If the payload is malformed.
+    """
+    pos = _read_header(data)
+    coins, pos = _read_varint(data, pos)
+    upgrades, pos = _read_counters(data, pos, UPGRADE_KEYS)
+    stats, pos = _read_counters(data, pos, STAT_KEYS)
+    if pos != len(data):
+        raise WireFormatError("trailing bytes")
+    return _unzigzag(coins), upgrades, stats
+
+
+def encode_profile(profile: Mapping[str, Any]) -> bytes:
+    """Encode a profile snapshot as returned by ``/profile`` and ``/sync``.
+
+    Args:
+        profile: Dictionary with the JSON response keys ``nickname``,
+            ``coins``, ``upgrades``, ``stats``, ``updatedAt`` (ISO string or
+            ``None``) and ``version``.
+
+    Returns:
+        bytes: Binary payload.
+    """
+    out = bytearray([FORMAT_VERSION])
+    _write_varint(out, _zigzag(int(profile["coins"] or 0)))
+    _write_counters(out, profile["upgrades"], _UPGRADE_CODES)
+    _write_counters(out, profile["stats"], _STAT_CODES)
+    _write_text(out, profile["nickname"])
+    updated_at = profile.get("updatedAt")
+    if updated_at:
+        delta = datetime.fromisoformat(updated_at) - _EPOCH
+        _write_varint(out, delta // _MICROSECOND)
+    else:
+        out.append(0)
+    _write_varint(out, int(profile.get("version") or 0))
+    return bytes(out)
+
+
+def decode_profile(data: bytes) -> Dict[str, Any]:
+    """Decode a profile snapshot produced by :func:`encode_profile`.
+
+    Args:
+        data: Binary payload.
+
+    Returns:
+        Dict[str, Any]: Dictionary with the same keys as the JSON response.
+
+    Raises:
+        WireFormatError: If the payload is malformed.
+    """
+    pos = _read_header(data)
+    coins, pos = _read_varint(data, pos)
+    upgrades, pos = _read_counters(data, pos, UPGRADE_KEYS)
+    stats, pos = _read_counters(data, pos, STAT_KEYS)
+    nickname, pos = _read_text(data, pos)
+    updated_us, pos = _read_varint(data, pos)
+    version, pos = _read_varint(data, pos)
+    if pos != len(data):
+        raise WireFormatError("trailing bytes")
+    updated_at: Optional[str] = None
+    if updated_us:
+        updated_at = (_EPOCH + updated_us * _MICROSECOND).isoformat()
+    return {
+        "nickname": nickname,
+        "coins": _unzigzag(coins),
+        "upgrades": upgrades,
+        "stats": stats,
+        "updatedAt": updated_at,
+        "version": version,
+    }
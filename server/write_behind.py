@@ -0,0 +1,331 @@
+"""Write-behind coalescing queue for ``POST /sync``.
+
+Active players sync every few seconds and only the latest full snapshot of
+each player matters. With ``WRITE_BEHIND_ENABLED`` a sync is not written
+right away: it replaces the player's entry in an in-memory latest-state map
+and the request returns ``202``. A background flusher writes the coalesced
+entries every ``WRITE_BEHIND_INTERVAL_MS`` milliseconds, or as soon as
+``WRITE_BEHIND_MAX_ENTRIES`` players are pending, with one batched
+transaction per ``WRITE_BEHIND_MAX_ENTRIES`` rows (see
+:func:`server.auth.upsert_profiles`). At peak this replaces one ``UPDATE``
+plus commit per sync with one commit per batch.
+
+Consistency:
+    - Reads and writes of the same player that need the stored row
+      (``/profile``, ``/sync/batch``, ``/sync/delta`` and syncs whose coin
+      gain is capped by :mod:`server.replay`) first call
+      :meth:`WriteBehindQueue.flush_user`, which also waits for an
+      in-flight flush, so a player always reads their own writes.
+    - The leaderboard and other players see a sync once it is flushed.
+    - Each process has its own queue; with several workers the usual
+      last-write-wins semantics of full snapshots apply across them.
+
+Shutdown:
+    :meth:`WriteBehindQueue.drain` is registered with :mod:`atexit`: it
+    stops accepting entries (later syncs are written synchronously) and
+    flushes until the queue is empty, retrying failed flushes. Only a
+    process killed without running exit handlers (``SIGKILL``, power loss)
+    loses its pending entries.
+
+Metrics:
+    :meth:`WriteBehindQueue.stats` (exported by :mod:`server.metrics`)
+    counts syncs, rows and transactions, and measures the flush lag: the
+    time between the first sync coalesced into a row and its commit.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+from flask import Flask, current_app
+
+from .auth import AuthenticatedUser, upsert_profiles
+from .database import db
+from .models import render_counters
+
+logger = logging.getLogger(__name__)
+
+DRAIN_ATTEMPTS = 5
+
+
+class PendingSnapshot:
+    """Latest unwritten snapshot of one player.
+
+    Exposes the attributes of a :class:`server.models.Profile` read by
+    :func:`server.routes._profile_response`; ``version`` is ``None`` until
+    the row is written.
+
+    Attributes:
+        user: Owner identity.
+        coins: Coin balance (clamped to ``>= 0``).
+        upgrades: Upgrade levels.
+        stats: Stat counters.
+        upgrades_snapshot: ``upgrades`` rendered as compact JSON.
+        stats_snapshot: ``stats`` rendered as compact JSON.
+        updated_at: UTC time of the latest sync, stored as ``updated_at``.
+        queued_at: Monotonic time of the first sync coalesced into the entry.
+        syncs: Number of syncs coalesced into the entry.
+    """
+
+    __slots__ = (
+        "user", "coins", "upgrades", "stats", "upgrades_snapshot", "stats_snapshot",
+        "updated_at", "queued_at", "syncs",
+    )
+    version = None
+
+    def __init__(self, user: AuthenticatedUser, coins: int, upgrades: Mapping[str, int], stats: Mapping[str, int]):
+        self.user = user
+        self.coins = max(0, int(coins))
+        self.upgrades = dict(upgrades)
+        self.stats = dict(stats)
+        self.upgrades_snapshot = render_counters(self.upgrades)
+        self.stats_snapshot = render_counters(self.stats)
+        self.updated_at = datetime.utcnow()
+        self.queued_at = time.monotonic()
+        self.syncs = 1
+
+
+class WriteBehindQueue:
+    """Per-process latest-state map and its flusher thread.
+
+    Args:
+        app: Flask application; flushes run inside its app context.
+        interval: Seconds between two flushes.
+        max_entries: Pending players that trigger an early flush, and rows
+            per transaction.
+    """
+
+    def __init__(self, app: Flask, interval: float, max_entries: int):
+        self.app = app
+        self.interval = interval
+        self.max_entries = max(1, int(max_entries))
+        self._pending: Dict[int, PendingSnapshot] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._inflight: frozenset = frozenset()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread_pid: Optional[int] = None
+        self.counters = {"syncs": 0, "rows": 0, "flushes": 0, "failures": 0}
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def submit(self, user: AuthenticatedUser, coins: int, upgrades: Mapping[str, int], stats: Mapping[str, int]) -> Optional[PendingSnapshot]:
+        """Replace the player's pending snapshot.
+
+        Args:
+            user: Authenticated user identity.
+            coins: Coin balance.
+            upgrades: Full snapshot of upgrade levels.
+            stats: Full snapshot of stat counters.
+
+        Returns:
+            Optional[PendingSnapshot]: The queued entry, or ``None`` once the
+            queue is draining (the caller must then write synchronously).
+        """
+        entry = PendingSnapshot(user, coins, upgrades, stats)
+        with self._lock:
+            if self._closed:
+                return None
+            previous = self._pending.get(user.id)
+            if previous is not None:
+                entry.queued_at = previous.queued_at
+                entry.syncs += previous.syncs
+            self._pending[user.id] = entry
+            self.counters["syncs"] += 1
+            full = len(self._pending) >= self.max_entries
+        self.ensure_flusher()
+        if full:
+            self._wake.set()
+        return entry
+
+    def flush_user(self, user_id: int) -> bool:
+        """Write the player's pending snapshot now, if any.
+
+        Waits for an in-flight flush first, so the stored row is current
+        when this returns. Must run inside an app context.
+
+        Args:
+            user_id: Player to flush.
+
+        Returns:
+            bool: ``True`` if the player's row was written (here or by the
+            awaited flush).
+        """
+        if user_id not in self._pending and user_id not in self._inflight:
+            return False
+        with self._flush_lock:
+            with self._lock:
+                entry = self._pending.pop(user_id, None)
+            if entry is None:
+                return True
+            try:
+                self._write([entry])
+            except Exception:
+                self._requeue([entry])
+                raise
+            return True
+
+    def flush(self) -> int:
+        """Write every pending snapshot, ``max_entries`` rows per transaction.
+
+        Must run inside an app context.
+
+        Returns:
+            int: Number of rows written.
+
+        Raises:
+            Exception: Whatever the database raised; the unwritten entries
+                are put back unless a newer sync replaced them meanwhile.
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._pending.values())
+                self._inflight = frozenset(self._pending)
+                self._pending = {}
+            written = 0
+            try:
+                for start in range(0, len(entries), self.max_entries):
+                    self._write(entries[start:start + self.max_entries])
+                    written = start + self.max_entries
+            except Exception:
+                self._requeue(entries[written:])
+                raise
+            finally:
+                self._inflight = frozenset()
+            return len(entries)
+
+    def _write(self, entries: List[PendingSnapshot]) -> None:
+        try:
+            upsert_profiles(entries)
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self.counters["failures"] += 1
+            raise
+        now = time.monotonic()
+        lag = max(now - entry.queued_at for entry in entries)
+        with self._lock:
+            self.counters["rows"] += len(entries)
+            self.counters["flushes"] += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def _requeue(self, entries: List[PendingSnapshot]) -> None:
+        with self._lock:
+            for entry in entries:
+                newer = self._pending.get(entry.user.id)
+                if newer is None:
+                    self._pending[entry.user.id] = entry
+                else:
+                    newer.queued_at = min(newer.queued_at, entry.queued_at)
+                    newer.syncs += entry.syncs
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._pending:
+                continue
+            with self.app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Write-behind flush failed")
+                finally:
+                    db.session.remove()
+
+    def ensure_flusher(self) -> None:
+        """Start the flusher thread in the current process if needed.
+
+        Started lazily so that it lives in each forked worker.
+        """
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            threading.Thread(target=self._run, name="write-behind", daemon=True).start()
+            self._thread_pid = pid
+
+    def drain(self) -> int:
+        """Stop queueing and flush until nothing is pending.
+
+        Failed flushes are retried up to :data:`DRAIN_ATTEMPTS` times with a
+        growing pause; entries still unwritten after that are logged as lost.
+
+        Returns:
+            int: Number of rows written.
+        """
+        with self._lock:
+            self._closed = True
+        written = 0
+        for attempt in range(DRAIN_ATTEMPTS):
+            if not self._pending:
+                break
+            with self.app.app_context():
+                try:
+                    written += self.flush()
+                except Exception:
+                    logger.exception("Write-behind drain flush failed (attempt %d)", attempt + 1)
+                    time.sleep(0.1 * 2 ** attempt)
+                finally:
+                    db.session.remove()
+        if self._pending:
+            logger.error("Write-behind drain gave up; %d pending snapshots lost", len(self._pending))
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue counters and flush lag.
+
+        Returns:
+            Dict[str, Any]: ``pending``, ``syncs`` (accepted), ``rows``
+            (written), ``flushes`` (transactions), ``failures``, ``lastLag``
+            and ``maxLag`` (seconds).
+        """
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                **self.counters,
+                "lastLag": self.last_lag,
+                "maxLag": self.max_lag,
+            }
+
+
+def init_write_behind(app: Flask) -> Optional[WriteBehindQueue]:
+    """Create the write-behind queue when ``WRITE_BEHIND_ENABLED`` is set.
+
+    Args:
+        app: Flask application instance.
+
+    Returns:
+        Optional[WriteBehindQueue]: Queue stored in
+        ``app.extensions["write_behind"]``, or ``None`` when disabled.
+
+    Side Effects:
+        Registers :meth:`WriteBehindQueue.drain` with :mod:`atexit`.
+    """
+    queue = None
+    if app.config["WRITE_BEHIND_ENABLED"]:
+        queue = WriteBehindQueue(
+            app,
+            interval=app.config["WRITE_BEHIND_INTERVAL_MS"] / 1000,
+            max_entries=app.config["WRITE_BEHIND_MAX_ENTRIES"],
+        )
+        atexit.register(queue.drain)
+    app.extensions["write_behind"] = queue
+    return queue
+
+
+def get_write_behind() -> Optional[WriteBehindQueue]:
+    """Return the write-behind queue of the current Flask app.
+
+    Returns:
+        Optional[WriteBehindQueue]: Queue, or ``None`` when disabled.
+    """
+    return current_app.extensions.get("write_behind")
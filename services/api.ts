@@ -4,6 +4,7 @@ export interface ProfileSnapshotResponse {
   upgrades: Record<string, number>;
   stats: Record<string, number>;
   updatedAt?: string | null;
+  version?: number;
 }
 
 export interface AuthResponse {
@@ -12,13 +13,35 @@ export interface AuthResponse {
   profile: ProfileSnapshotResponse;
 }
 
+/** Match-3 move: `[row1, col1, row2, col2]` swaps two tiles, `[row, col]` taps a special. */
+export type ReplayMove = [number, number, number, number] | [number, number];
+
+export interface SyncReplay {
+  baseVersion: number;
+  moves: ReplayMove[];
+}
+
 export interface SyncPayload {
   coins: number;
   upgrades: Record<string, number>;
   stats: Record<string, number>;
+  replay?: SyncReplay;
+}
+
+export interface SyncDeltaPayload {
+  baseVersion: number;
+  coins?: number;
+  upgrades?: Record<string, number>;
+  stats?: Record<string, number>;
+  replay?: Pick<SyncReplay, 'moves'>;
+}
+
+export interface QueuedSyncSnapshot extends Partial<SyncPayload> {
+  clientTs?: number;
 }
 
 export interface LeaderboardEntryResponse {
+  rank?: number;
   nickname: string;
   coins: number;
   updatedAt?: string | null;
@@ -26,6 +49,45 @@ export interface LeaderboardEntryResponse {
 
 export interface LeaderboardResponse {
   entries: LeaderboardEntryResponse[];
+  nextCursor?: string | null;
+}
+
+export type LeaderboardWindow = 'day' | 'week' | 'season';
+
+export interface LeaderboardPageResponse extends LeaderboardResponse {
+  rank?: number | null;
+  window?: LeaderboardWindow;
+  windowStart?: string;
+  windowEnd?: string;
+}
+
+export interface LeaderboardPageOptions {
+  limit?: number;
+  cursor?: string;
+  aroundMe?: boolean;
+  window?: LeaderboardWindow;
+}
+
+export interface LeaderboardMeResponse extends LeaderboardResponse {
+  rank: number | null;
+  total: number;
+}
+
+export interface PlayerSearchEntry {
+  nickname: string;
+  coins: number;
+  rank: number | null;
+  updatedAt?: string | null;
+}
+
+export interface PlayerSearchResponse {
+  entries: PlayerSearchEntry[];
+  nextCursor: string | null;
+}
+
+export interface PlayerSearchOptions {
+  limit?: number;
+  cursor?: string;
 }
 
 const DEFAULT_BASE_URL = 'http://localhost:5000/api';
@@ -85,17 +147,64 @@ export function loginRequest(payload: { nickname: string; password: string }): P
   });
 }
 
-export function profileRequest(token: string): Promise<ProfileSnapshotResponse> {
-  return apiRequest<ProfileSnapshotResponse>('/profile', {
+let profileCache: { token: string; etag: string; data: ProfileSnapshotResponse } | null = null;
+
+export async function profileRequest(token: string): Promise<ProfileSnapshotResponse> {
+  const cached = profileCache?.token === token ? profileCache : null;
+  const response = await fetch(buildUrl('/profile'), {
     method: 'GET',
     headers: {
+      Accept: 'application/json',
       Authorization: `Bearer ${token}`,
+      ...(cached ? { 'If-None-Match': cached.etag } : {}),
     },
   });
+
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
+  const data = await parseJson<ProfileSnapshotResponse>(response);
+  if (!response.ok) {
+    const message = (data as Record<string, unknown> | null)?.message;
+    throw new Error(message && typeof message === 'string' ? message : `Запрос к API завершился ошибкой ${response.status}`);
+  }
+  if (!data) {
+    throw new Error('Ответ API не содержит данных.');
+  }
+
+  const etag = response.headers.get('ETag');
+  profileCache = etag ? { token, etag, data } : null;
+  return data;
 }
 
-export function syncRequest(token: string, payload: SyncPayload): Promise<ProfileSnapshotResponse> {
+export function syncRequest(
+  token: string,
+  payload: SyncPayload,
+  idempotencyKey?: string
+): Promise<ProfileSnapshotResponse> {
   return apiRequest<ProfileSnapshotResponse>('/sync', {
+    method: 'POST',
+    headers: {
+      Authorization: `Bearer ${token}`,
+      ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
+    },
+    body: JSON.stringify(payload),
+  });
+}
+
+export function syncBatchRequest(token: string, snapshots: QueuedSyncSnapshot[]): Promise<ProfileSnapshotResponse> {
+  return apiRequest<ProfileSnapshotResponse>('/sync/batch', {
+    method: 'POST',
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+    body: JSON.stringify({ snapshots }),
+  });
+}
+
+export function syncDeltaRequest(token: string, payload: SyncDeltaPayload): Promise<ProfileSnapshotResponse> {
+  return apiRequest<ProfileSnapshotResponse>('/sync/delta', {
     method: 'POST',
     headers: {
       Authorization: `Bearer ${token}`,
@@ -104,10 +213,84 @@ export function syncRequest(token: string, payload: SyncPayload): Promise<Profil
   });
 }
 
-export function leaderboardRequest(token: string, limit: number = 25): Promise<LeaderboardResponse> {
+const leaderboardCache = new Map<number, { etag: string; data: LeaderboardResponse }>();
+
+export async function leaderboardRequest(token: string, limit: number = 25): Promise<LeaderboardResponse> {
   const safeLimit = Math.min(100, Math.max(1, limit));
   const params = new URLSearchParams({ limit: String(safeLimit) });
-  return apiRequest<LeaderboardResponse>(`/leaderboard?${params.toString()}`, {
+  const cached = leaderboardCache.get(safeLimit);
+  const response = await fetch(buildUrl(`/leaderboard?${params.toString()}`), {
+    method: 'GET',
+    headers: {
+      Accept: 'application/json',
+      Authorization: `Bearer ${token}`,
+      ...(cached ? { 'If-None-Match': cached.etag } : {}),
+    },
+  });
+
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
+  const data = await parseJson<LeaderboardResponse>(response);
+  if (!response.ok) {
+    const message = (data as Record<string, unknown> | null)?.message;
+    throw new Error(message && typeof message === 'string' ? message : `Запрос к API завершился ошибкой ${response.status}`);
+  }
+  if (!data) {
+    throw new Error('Ответ API не содержит данных.');
+  }
+
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    leaderboardCache.set(safeLimit, { etag, data });
+  }
+  return data;
+}
+
+export function leaderboardPageRequest(
+  token: string,
+  { limit = 25, cursor, aroundMe = false, window }: LeaderboardPageOptions = {},
+): Promise<LeaderboardPageResponse> {
+  const params = new URLSearchParams({ limit: String(Math.min(100, Math.max(1, limit))) });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  if (aroundMe) {
+    params.set('around', 'me');
+  }
+  if (window) {
+    params.set('window', window);
+  }
+  return apiRequest<LeaderboardPageResponse>(`/leaderboard?${params.toString()}`, {
+    method: 'GET',
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+}
+
+export function leaderboardMeRequest(token: string, radius: number = 5): Promise<LeaderboardMeResponse> {
+  const safeRadius = Math.min(50, Math.max(0, radius));
+  const params = new URLSearchParams({ radius: String(safeRadius) });
+  return apiRequest<LeaderboardMeResponse>(`/leaderboard/me?${params.toString()}`, {
+    method: 'GET',
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  });
+}
+
+export function searchPlayersRequest(
+  token: string,
+  query: string,
+  { limit = 20, cursor }: PlayerSearchOptions = {},
+): Promise<PlayerSearchResponse> {
+  const params = new URLSearchParams({ q: query, limit: String(Math.min(50, Math.max(1, limit))) });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  return apiRequest<PlayerSearchResponse>(`/players/search?${params.toString()}`, {
     method: 'GET',
     headers: {
       Authorization: `Bearer ${token}`,
@@ -10,6 +10,7 @@ import {
     registerRequest,
     syncRequest,
 } from '@/services/api';
+import { makeId } from '@/utils/IdUtils';
 import type { RootStore } from './RootStore';
 
 const TOKEN_KEY = 'auth_token_v1';
@@ -35,6 +36,9 @@ export default class AuthStore {
   lastSyncReason: string | null = null;
   private pendingReasons: Set<string> = new Set();
   private syncTimer: ReturnType<typeof setTimeout> | null = null;
+  // Key of the last failed sync; reused while the payload is unchanged so the
+  // server can answer a retry of an already applied sync without rewriting it.
+  private unconfirmedSync: { body: string; key: string } | null = null;
 
   constructor(rootStore: RootStore) {
     this.rootStore = rootStore;
@@ -183,7 +187,12 @@ export default class AuthStore {
     try {
       await this.ensureLocalSnapshotsReady();
       const payload = this.buildSyncPayload();
-      const profile = await syncRequest(token, payload);
+      const body = JSON.stringify(payload);
+      if (this.unconfirmedSync?.body !== body) {
+        this.unconfirmedSync = { body, key: makeId(24) };
+      }
+      const profile = await syncRequest(token, payload, this.unconfirmedSync.key);
+      this.unconfirmedSync = null;
       runInAction(() => {
         this.applyProfile(profile);
         this.lastSyncedAt = Date.now();